@@ -6,6 +6,8 @@ import time
 from datetime import datetime
 from solders.pubkey import Pubkey
 
+from http_client import HttpClient
+
 # -----------------------------------------------------
 # CONFIGURATION
 # -----------------------------------------------------
@@ -74,6 +76,11 @@ if "ledger_pda" not in st.session_state:
 # HELPER FUNCTIONS
 # -----------------------------------------------------
 
+@st.cache_resource
+def get_http_client():
+    """One pooled keep-alive client per Streamlit process, reused across reruns."""
+    return HttpClient(timeouts={"createLedger": 10, "verify": 5, "sse": 30})
+
 def initialize_ledger():
     import numpy as np
     seed_int = np.random.randint(1, 65535)
@@ -81,7 +88,7 @@ def initialize_ledger():
     pda, _ = Pubkey.find_program_address([b"state", seed_bytes], PROGRAM_ID)
 
     try:
-        requests.post(f"{BACKEND_URL}/createLedger", json={"seed": str(seed_int)}, timeout=5)
+        get_http_client().post(f"{BACKEND_URL}/createLedger", endpoint="createLedger", json={"seed": str(seed_int)})
         st.session_state.ledger_pda = str(pda)
         st.sidebar.success(f"✅ Ledger Init: {str(pda)[:8]}...")
     except requests.exceptions.RequestException as e:
@@ -100,7 +107,7 @@ def verify_event(index):
     }
 
     try:
-        response = requests.post(VERIFY_URL, json=payload, timeout=5)
+        response = get_http_client().post(VERIFY_URL, endpoint="verify", json=payload)
         if response.status_code == 200:
             data = response.json()
             if data.get("success") and data.get("verified"):
@@ -118,7 +125,7 @@ def verify_event(index):
 def get_event_stream():
     headers = {'Accept': 'text/event-stream'}
     try:
-        with requests.get(SSE_URL, stream=True, headers=headers, timeout=30) as response:
+        with get_http_client().get(SSE_URL, endpoint="sse", stream=True, headers=headers) as response:
             response.raise_for_status()
             for line in response.iter_lines():
                 if line:
@@ -150,6 +157,9 @@ with st.sidebar:
     else:
         st.warning("No Ledger Initialized")
 
+    http_stats = get_http_client().stats()
+    st.caption(f"🔌 Backend connections: {http_stats['handshakes']} opened, {http_stats['pool_hits']} reused")
+
     if st.button("Clear History"):
         st.session_state.events = []
         st.session_state.total_threats = 0
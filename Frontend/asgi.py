@@ -0,0 +1,230 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import main
+from log_aggregator import LogAggregator
+from state_store import SqliteBanList
+
+# ---------------------------------------------------------
+# ASYNC SERVING MODE (ASGI)
+# ---------------------------------------------------------
+# The /predict contract of main.py on an event loop (uvicorn asgi:app).
+# Inference runs on a bounded thread pool and outbound calls are httpx
+# coroutines; worker sizing is in README.md.
+
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", 2))
+INFERENCE_QUEUE = int(os.environ.get("INFERENCE_QUEUE", 64))
+OUTBOUND_CONCURRENCY = int(os.environ.get("OUTBOUND_CONCURRENCY", 64))
+OUTBOUND_MAX_PENDING = int(os.environ.get("OUTBOUND_MAX_PENDING", 10000))
+
+INFERENCE_POOL = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix="inference")
+# In-memory ban checks take microseconds; a SQLite query may wait on the file lock
+BLOCKING_BANS = isinstance(main.BANNED_USERS, SqliteBanList)
+
+async def post_with_retry(client, policy, slots, url, timeout, **kwargs):
+    """
+    POST following http_client.RetryPolicy: connect errors, and 429/503 where
+    the policy allows. A slot of `slots` is held per attempt, not across the
+    backoff sleeps.
+    """
+    attempt = 0
+    while True:
+        try:
+            async with slots:
+                response = await client.post(url, timeout=timeout, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if attempt >= policy.retries:
+                raise
+        else:
+            if attempt >= policy.retries or not policy.retries_status("POST", response.status_code):
+                return response
+        attempt += 1
+        await asyncio.sleep(policy.backoff(attempt))
+
+class AsyncOutbound:
+    """
+    main.Outbound for the event loop. Safe to call from any thread: work is
+    handed to the loop with call_soon_threadsafe. Calls for one ledger run
+    one after another (createLedger before its logs, batches in order) by
+    chaining each task on the previous one for that key. Everything else
+    runs concurrently, up to OUTBOUND_CONCURRENCY.
+    """
+
+    def __init__(self, client, concurrency=OUTBOUND_CONCURRENCY, max_pending=OUTBOUND_MAX_PENDING):
+        self.client = client
+        self.loop = asyncio.get_running_loop()
+        self.max_pending = max_pending
+        self.retry = main.HTTP.retry_policy
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self._tails = {}  # key -> last task queued for it
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "dropped": 0}
+        # Same per-ledger coalescing as the Flask server; full batches and the
+        # timer thread's flushes both come back through _post_logs
+        self.logs = LogAggregator(self._post_logs, max_batch=main.LOG_BATCH_SIZE, max_wait=main.LOG_BATCH_WAIT)
+
+    def create_ledger(self, seed_int, ledger_pda):
+        # Never dropped: every later addLogs of this ledger needs it on-chain
+        self._submit(ledger_pda, "createLedger", f"{main.BACKEND_URL}/createLedger", json={"seed": str(seed_int)},
+                     essential=True)
+
+    def add_log(self, payload):
+        self.logs.add(payload)
+
+    def sms(self, ip, threat_type):
+        url, payload, headers = main.sms_request(ip, threat_type)
+        self._submit(None, "sms", url, json=payload, headers=headers)
+
+    def _post_logs(self, ledger, entries):
+        self._submit(ledger, "addLog", f"{main.BACKEND_URL}/addLogs", json={"ledger": ledger, "logs": entries})
+
+    def _submit(self, key, endpoint, url, json=None, headers=None, essential=False):
+        self.loop.call_soon_threadsafe(self._spawn, key, endpoint, url, json, headers, essential)
+
+    def _spawn(self, key, endpoint, url, json, headers, essential):
+        if len(self._tasks) >= self.max_pending and not essential:
+            self._stats["dropped"] += 1
+            return
+        self._stats["submitted"] += 1
+        previous = self._tails.get(key) if key else None
+        task = self.loop.create_task(self._post(previous, endpoint, url, json, headers))
+        self._tasks.add(task)
+        if key:
+            self._tails[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+
+    def _done(self, key, task):
+        self._tasks.discard(task)
+        if key and self._tails.get(key) is task:
+            del self._tails[key]
+
+    async def _post(self, previous, endpoint, url, json, headers):
+        if previous is not None:
+            await asyncio.wait([previous])  # ordering only; its outcome doesn't matter
+        try:
+            timeout = main.HTTP.timeouts.get(endpoint, main.HTTP.default_timeout)
+            response = await post_with_retry(self.client, self.retry, self._slots, url, timeout,
+                                             json=json, headers=headers)
+            response.raise_for_status()
+            self._stats["completed"] += 1
+        except Exception as e:
+            self._stats["failed"] += 1
+            print(f"Outbound {endpoint} Error: {e}")
+
+    async def close(self):
+        """Flushes buffered logs and waits for every queued call."""
+        self.logs.close()
+        await asyncio.sleep(0)  # let the flushed batches reach _spawn
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self):
+        snapshot = dict(self._stats)
+        snapshot.update({"pending": len(self._tasks), "log_batches": self.logs.stats()})
+        return snapshot
+
+class InferenceGate:
+    """Bounds the requests waiting for or running on INFERENCE_POOL."""
+
+    def __init__(self, limit=INFERENCE_QUEUE):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        """fn(*args) on the pool, or None when the pool is already full."""
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return None
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(INFERENCE_POOL, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {"threads": INFERENCE_THREADS, "in_flight": self.in_flight,
+                "limit": self.limit, "rejected": self.rejected}
+
+INFERENCE = InferenceGate()
+
+def classify_and_act(ip_address, record, outbound, explain_as=None):
+    """Runs on an inference thread: vectorizer buffers are per thread, and
+    apply_verdict may block on the ledger/ban stores."""
+    serving = main.SERVING
+    features = main.preprocess_input(record, ip_address, serving)
+    threats = main.classify(features, serving)
+    threat_type, score, tier = threats[0]
+    response_body, status = main.apply_verdict(ip_address, threat_type, outbound=outbound)
+    response_body = {**response_body, "score": score, "tier": tier}
+    if explain_as:
+        response_body["explanation"] = main.explain(features, threats, explain_as, serving)[0]
+    return response_body, status
+
+def unavailable():
+    return JSONResponse({"message": "SERVICE UNAVAILABLE"}, status_code=503)
+
+async def is_banned(ip_address):
+    if BLOCKING_BANS:
+        return await asyncio.get_running_loop().run_in_executor(None, main.BAN_GATE.is_banned, ip_address)
+    return main.BAN_GATE.is_banned(ip_address)
+
+async def predict(request):
+    if main.SERVING.model is None:
+        return JSONResponse({"error": "Model not loaded"}, status_code=500)
+
+    ip_address = request.headers.get("ip", request.client.host if request.client else None)
+    if not ip_address:
+        # No header and no peer address (e.g. a Unix socket): nothing to ban or keep a ledger for
+        return JSONResponse({"error": "No source address"}, status_code=400)
+    # DOS Logic: Early Rejection, before the body is read
+    if await is_banned(ip_address):
+        main.BAN_GATE.count_rejected()
+        return unavailable()
+
+    try:
+        body = await request.json()
+        result = await INFERENCE.run(classify_and_act, ip_address, body, request.app.state.outbound,
+                                     main.explain_mode(request.query_params.get("explain")))
+        if result is None:
+            return unavailable()
+        response_body, status = result
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    response = JSONResponse(response_body, status_code=status)
+    if response_body.get("action") == "logout_force":
+        response.delete_cookie("session")  # the Flask server's session.clear()
+    return response
+
+async def metrics(request):
+    snapshot = main.collect_metrics()
+    snapshot["outbound"] = request.app.state.outbound.stats()
+    snapshot["inference"] = INFERENCE.stats()
+    return JSONResponse(snapshot)
+
+@asynccontextmanager
+async def lifespan(app):
+    main.start()
+    limits = httpx.Limits(max_connections=OUTBOUND_CONCURRENCY, max_keepalive_connections=OUTBOUND_CONCURRENCY)
+    async with httpx.AsyncClient(limits=limits) as client:
+        app.state.outbound = AsyncOutbound(client)
+        print(f"🚀 Security ML API Active (ASGI, {INFERENCE_THREADS} inference threads)...")
+        yield
+        await app.state.outbound.close()
+    INFERENCE_POOL.shutdown(wait=False)
+
+app = Starlette(
+    routes=[
+        Route("/predict", predict, methods=["POST"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,47 @@
+import json
+import threading
+
+from state_store import CidrSet
+
+# ---------------------------------------------------------
+# BAN MIDDLEWARE (WSGI)
+# ---------------------------------------------------------
+# Answers 503 to banned sources on protected paths straight from the WSGI
+# environ, before Flask routes the request or reads its body.
+
+UNAVAILABLE_BODY = json.dumps({"message": "SERVICE UNAVAILABLE"}).encode()
+UNAVAILABLE_HEADERS = [
+    ("Content-Type", "application/json"),
+    ("Content-Length", str(len(UNAVAILABLE_BODY))),
+]
+# No "Connection: close": hop-by-hop headers are the server's to set (PEP 3333).
+# The WSGI server drains or drops the unread request body itself.
+
+class BanMiddleware:
+    def __init__(self, app, bans, cidrs=(), paths=("/predict",)):
+        self.app = app
+        self.bans = bans
+        self.networks = cidrs if isinstance(cidrs, CidrSet) else CidrSet(cidrs)
+        self.paths = frozenset(paths)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def source_ip(self, environ):
+        return environ.get("HTTP_IP") or environ.get("REMOTE_ADDR", "")
+
+    def is_banned(self, ip):
+        return ip in self.bans or (len(self.networks) > 0 and ip in self.networks)
+
+    def count_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") in self.paths and self.is_banned(self.source_ip(environ)):
+            self.count_rejected()
+            start_response("503 SERVICE UNAVAILABLE", UNAVAILABLE_HEADERS)
+            return [UNAVAILABLE_BODY]
+        return self.app(environ, start_response)
+
+    def stats(self):
+        return {"rejected": self.rejected, "networks": len(self.networks)}
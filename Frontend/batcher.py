@@ -0,0 +1,188 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# ---------------------------------------------------------
+# DYNAMIC BATCHER
+# ---------------------------------------------------------
+# Request threads hand their rows to a scheduler that runs one model call per
+# batch. The wait for more rows adapts to the arrival rate and is 0 when
+# traffic is sparse; only requests with the same context share a batch.
+
+class _Request:
+    __slots__ = ("rows", "context", "arrived", "done", "result", "error")
+
+    def __init__(self, rows, context, arrived):
+        self.rows = rows
+        self.context = context
+        self.arrived = arrived
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class DynamicBatcher:
+    def __init__(self, predict_fn, max_rows=32, max_wait=0.002, smoothing=0.1, concurrency=1, name="batcher"):
+        self.predict_fn = predict_fn
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        self.concurrency = max(1, concurrency)
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._pending_rows = 0
+        self._last_arrival = None
+        self._gap = None  # moving average of seconds between arrivals
+        self._closed = False
+        self._thread = None
+        self._slots = threading.Semaphore(self.concurrency)  # batches in flight
+        self._executor = None  # runs the batches when concurrency > 1
+        self._in_flight = 0
+        self._histogram = {}  # "1", "2", "3-4", "5-8", ... -> batches of that many rows
+        self._stats = {"requests": 0, "batches": 0, "rows": 0, "bypassed": 0, "errors": 0,
+                       "max_in_flight": 0}
+
+    def window(self):
+        """Seconds the oldest waiting row may be held for more to arrive."""
+        gap = self._gap
+        if gap is None or gap >= self.max_wait:
+            return 0.0
+        return min(self.max_wait, gap * (self.max_rows - 1))
+
+    def _call(self, X, context):
+        return self.predict_fn(X) if context is None else self.predict_fn(X, context)
+
+    def predict(self, X, context=None):
+        """predict_fn(X[, context]), possibly computed as part of a larger batch."""
+        if self.max_wait <= 0 or len(X) >= self.max_rows:
+            with self._cond:
+                self._stats["bypassed"] += 1
+            return self._call(X, context)
+
+        now = time.monotonic()
+        request = _Request(X, context, now)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            if self._thread is None:
+                if self.concurrency > 1:
+                    self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.name)
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            if self._last_arrival is not None:
+                gap = min(now - self._last_arrival, 1.0)
+                self._gap = gap if self._gap is None else self._gap + self.smoothing * (gap - self._gap)
+            self._last_arrival = now
+            self._stats["requests"] += 1
+            self._pending.append(request)
+            self._pending_rows += len(X)
+            self._cond.notify()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _take(self):
+        """Blocks until a batch is due and removes it from the queue."""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            deadline = self._pending[0].arrived + self.window()
+            while self._pending_rows < self.max_rows and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, n_rows = [], 0
+            context = self._pending[0].context
+            for request in self._pending:
+                if request.context is not context:
+                    continue  # waits for a batch of its own context
+                if n_rows + len(request.rows) > self.max_rows:
+                    break
+                batch.append(request)
+                n_rows += len(request.rows)
+            if len(batch) == len(self._pending):
+                self._pending.clear()
+            else:
+                taken = set(map(id, batch))
+                self._pending = [r for r in self._pending if id(r) not in taken]
+            self._pending_rows -= n_rows
+            return batch
+
+    def _run(self):
+        while True:
+            self._slots.acquire()
+            batch = self._take()
+            if batch is None:
+                self._slots.release()
+                return
+            with self._cond:
+                self._in_flight += 1
+                self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+            if self._executor is None:
+                self._dispatch(batch)
+            else:
+                self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        try:
+            if len(batch) == 1:
+                results = self._call(batch[0].rows, batch[0].context)
+            else:
+                results = self._call(np.concatenate([r.rows for r in batch]), batch[0].context)
+            start = 0
+            for request in batch:
+                request.result = results[start:start + len(request.rows)]
+                start += len(request.rows)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        finally:
+            for request in batch:
+                request.done.set()
+            self._slots.release()
+        self._record(batch)
+
+    def _record(self, batch):
+        n_rows = sum(len(r.rows) for r in batch)
+        bucket = (n_rows - 1).bit_length()
+        label = str(n_rows) if n_rows <= 2 else f"{2 ** (bucket - 1) + 1}-{2 ** bucket}"
+        with self._cond:
+            self._in_flight -= 1
+            self._stats["batches"] += 1
+            self._stats["rows"] += n_rows
+            if batch[0].error is not None:
+                self._stats["errors"] += 1
+            self._histogram[label] = self._histogram.get(label, 0) + 1
+
+    def close(self):
+        """Runs whatever is still queued, then stops the scheduler."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot["histogram"] = dict(sorted(self._histogram.items(), key=lambda kv: int(kv[0].split("-")[0])))
+            snapshot["pending"] = self._pending_rows
+            snapshot["in_flight"] = self._in_flight
+            gap = self._gap
+        snapshot["window_ms"] = round(self.window() * 1e3, 3)
+        snapshot["arrival_gap_ms"] = round(gap * 1e3, 3) if gap is not None else None
+        snapshot["max_rows"] = self.max_rows
+        snapshot["max_wait_ms"] = self.max_wait * 1e3
+        snapshot["concurrency"] = self.concurrency
+        return snapshot
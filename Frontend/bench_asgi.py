@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import csv
+import random
+import time
+
+import httpx
+
+# ---------------------------------------------------------
+# LOAD TEST: Flask server vs ASGI mode
+# ---------------------------------------------------------
+# Throughput and p50/p90/p99 latency of /predict with a fixed number of
+# requests in flight. Start both servers on the same model files, with
+# BACKEND_URL pointed at something fast, then:
+#
+#   python bench_asgi.py --requests 5000 --concurrency 64
+
+DATASET_PATH = "nsl_kdd_dataset.csv"
+
+def load_records(n):
+    with open(DATASET_PATH, "r") as f:
+        reader = csv.DictReader(f)
+        rows = [{k: float(v) for k, v in row.items() if k != "label"} for row in reader]
+    return [random.choice(rows) for _ in range(n)]
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+async def run(url, records, concurrency, ip_prefix):
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for i, record in enumerate(records):
+        queue.put_nowait((i, record))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def worker():
+            while not queue.empty():
+                i, record = queue.get_nowait()
+                ip = f"{ip_prefix}.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+                start = time.perf_counter()
+                try:
+                    response = await client.post(f"{url}/predict", json=record, headers={"ip": ip})
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = "error"
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(records) / elapsed,
+        "p50": percentile(latencies, 50) * 1e3,
+        "p90": percentile(latencies, 90) * 1e3,
+        "p99": percentile(latencies, 99) * 1e3,
+        "statuses": statuses,
+    }
+
+async def bench(targets, n_requests, concurrency, warmup):
+    records = load_records(n_requests)
+    print(f"📊 {n_requests} POST /predict, {concurrency} in flight")
+    print(f"   {'server':<8} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}  statuses")
+    for octet, (name, url) in enumerate(targets, start=10):
+        if warmup:
+            await run(url, records[:warmup], min(concurrency, warmup), ip_prefix=octet + 100)
+        r = await run(url, records, concurrency, ip_prefix=octet)
+        print(f"   {name:<8} {r['rps']:9.0f} {r['p50']:9.2f} {r['p90']:9.2f} {r['p99']:9.2f}  {r['statuses']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /predict latency of the Flask and ASGI servers.")
+    parser.add_argument("--flask", default="http://127.0.0.1:5000", help="Flask server base URL ('' to skip)")
+    parser.add_argument("--asgi", default="http://127.0.0.1:8000", help="ASGI server base URL ('' to skip)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=100, help="requests sent first and not measured")
+    args = parser.parse_args()
+
+    targets = [(name, url.rstrip("/")) for name, url in (("flask", args.flask), ("asgi", args.asgi)) if url]
+    asyncio.run(bench(targets, args.requests, args.concurrency, args.warmup))
+
+if __name__ == "__main__":
+    main()
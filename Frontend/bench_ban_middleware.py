@@ -0,0 +1,78 @@
+import io
+import json
+import sys
+import time
+
+from flask import Flask, jsonify, request
+
+from ban_middleware import BanMiddleware
+from state_store import BanList
+
+# ---------------------------------------------------------
+# BENCHMARK: flood of requests from banned sources
+# ---------------------------------------------------------
+# Replays POST /predict with a full 41-feature JSON body from banned IPs
+# through the WSGI app, in process (no sockets), and reports requests/s for:
+#   - the old path: Flask routing, get_json(), then the ban check
+#   - BanMiddleware in front of the same app
+#
+#   python bench_ban_middleware.py [requests] [banned_ips]
+
+FEATURES = 41
+
+def make_app(bans):
+    app = Flask(__name__)
+
+    @app.route("/predict", methods=["POST"])
+    def predict():
+        body = request.get_json()
+        ip_address = request.headers.get("ip", request.remote_addr)
+        if ip_address in bans:
+            return jsonify({"message": "SERVICE UNAVAILABLE"}), 503
+        return jsonify({"fields": len(body)}), 200
+
+    return app
+
+def make_environ(ip, body):
+    return {
+        "REQUEST_METHOD": "POST", "PATH_INFO": "/predict", "SCRIPT_NAME": "", "QUERY_STRING": "",
+        "SERVER_NAME": "localhost", "SERVER_PORT": "5000", "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1", "HTTP_IP": ip,
+        "CONTENT_TYPE": "application/json", "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body), "wsgi.url_scheme": "http", "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+
+def flood(wsgi_app, ips, body, n_requests):
+    statuses = {}
+
+    def start_response(status, headers, exc_info=None):
+        statuses[status[:3]] = statuses.get(status[:3], 0) + 1
+
+    start = time.perf_counter()
+    for i in range(n_requests):
+        for _ in wsgi_app(make_environ(ips[i % len(ips)], body), start_response):
+            pass
+    elapsed = time.perf_counter() - start
+    return n_requests / elapsed, statuses
+
+def bench(n_requests, n_banned):
+    bans = BanList(ttl=3600)
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(n_banned)]
+    for ip in ips:
+        bans.add(ip)
+    body = json.dumps({f"f{j}": 0.5 for j in range(FEATURES)}).encode()
+
+    app = make_app(bans)
+    flask_rps, flask_statuses = flood(app.wsgi_app, ips, body, n_requests)
+    gated_rps, gated_statuses = flood(BanMiddleware(app.wsgi_app, bans), ips, body, n_requests)
+    bans.close()
+
+    print(f"📊 {n_requests} requests from {n_banned} banned IPs ({len(body)}-byte bodies)")
+    print(f"   Flask route check: {flask_rps:10.0f} req/s  {flask_statuses}")
+    print(f"   BanMiddleware:     {gated_rps:10.0f} req/s  {gated_statuses}")
+    print(f"   Speedup: {gated_rps / flask_rps:.1f}x")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+          int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
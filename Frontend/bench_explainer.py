@@ -0,0 +1,54 @@
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from explainer import Explainer
+from forest import FlatForest
+
+# ---------------------------------------------------------
+# BENCHMARK: explanation cost per verdict
+# ---------------------------------------------------------
+# Time per explained row, one row per call and in batches, for every method
+# the model supports; path contributions are checked against predict_proba.
+#
+#   python bench_explainer.py [forest_dir|model.pkl] [rows]
+
+DATASET_PATH = "nsl_kdd_dataset.csv"
+
+def load_model(path):
+    return FlatForest.load(path) if not path.endswith(".pkl") else joblib.load(path)
+
+def per_row(fn, rows, batch):
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch):
+        fn(rows[i:i + batch])
+    return (time.perf_counter() - start) / len(rows)
+
+def bench(model_path, n_rows):
+    model = load_model(model_path)
+    frame = pd.read_csv(DATASET_PATH).drop(columns=["label"], errors="ignore")
+    rows = frame.to_numpy(dtype=np.float32)[:n_rows]
+
+    predict = per_row(model.predict_proba, rows, 64)
+    print(f"📊 {len(rows)} rows, predict_proba: {predict * 1e6:8.1f} µs/row (batches of 64)")
+    for method in ("path", "xgboost", "shap"):
+        try:
+            explainer = Explainer(model, frame.columns, method=method)
+        except Exception as e:
+            print(f"   {method:<8} unavailable: {type(e).__name__}: {e}")
+            continue
+        single = per_row(explainer.explain, rows[:200], 1)
+        batched = per_row(explainer.explain, rows, 64)
+        print(f"   {method:<8} single {single * 1e6:8.1f} µs/row   batch {batched * 1e6:8.1f} µs/row   "
+              f"(built in {explainer.stats()['build_ms']} ms)")
+        if method == "path":
+            base, contributions = explainer._contributions(rows[:256])
+            score = model.predict_proba(rows[:256]) @ explainer._weights
+            print(f"            max |base + sum - score|: {np.abs(base + contributions.sum(axis=1) - score).max():.2e}")
+
+if __name__ == "__main__":
+    bench(sys.argv[1] if len(sys.argv) > 1 else "forest",
+          int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
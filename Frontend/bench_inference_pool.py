@@ -0,0 +1,78 @@
+import sys
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from batcher import DynamicBatcher
+from forest import FlatForest
+from inference_pool import InferencePool
+
+# ---------------------------------------------------------
+# BENCHMARK: in-process model vs InferencePool
+# ---------------------------------------------------------
+# Single-row throughput from `threads` request threads: the model in process,
+# then pools of 1, 2, 4... workers, bare and behind a DynamicBatcher with one
+# batch or one per worker in flight.
+#
+#   python bench_inference_pool.py [forest_dir|model.pkl] [threads] [max_workers] [seconds]
+
+DATASET_PATH = "nsl_kdd_dataset.csv"
+
+def load_model(path):
+    return FlatForest.load(path) if not path.endswith(".pkl") else joblib.load(path)
+
+def hammer(predict, rows, threads, seconds):
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def run(i):
+        j = i
+        while time.perf_counter() < deadline:
+            predict(rows[j % len(rows)][None, :])
+            counts[i] += 1
+            j += threads
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return sum(counts) / seconds
+
+def bench(model_path, threads, max_workers, seconds):
+    model = load_model(model_path)
+    rows = pd.read_csv(DATASET_PATH).drop(columns=["label"], errors="ignore").to_numpy(dtype=np.float32)[:5000]
+
+    print(f"📊 {threads} threads, single-row requests, {seconds:.0f}s per run")
+    baseline = hammer(model.predict, rows, threads, seconds)
+    print(f"   in-process:           {baseline:9.0f} rows/s")
+
+    workers = 1
+    while workers <= max_workers:
+        pool = InferencePool(model, rows.shape[1], workers=workers)
+        try:
+            rate = hammer(pool.predict, rows, threads, seconds)
+            stats = pool.stats()
+            print(f"   pool, {workers:2d} processes:  {rate:9.0f} rows/s  ({rate / baseline:.1f}x, "
+                  f"{stats['rows'] / max(stats['batches'], 1):.1f} rows/batch)")
+            for concurrency in sorted({1, workers}):
+                batcher = DynamicBatcher(pool.predict, concurrency=concurrency)
+                try:
+                    rate = hammer(batcher.predict, rows, threads, seconds)
+                    stats = batcher.stats()
+                finally:
+                    batcher.close()
+                print(f"     + batcher, {concurrency:2d} in flight: {rate:9.0f} rows/s  ({rate / baseline:.1f}x, "
+                      f"{stats['rows'] / max(stats['batches'], 1):.1f} rows/batch)")
+        finally:
+            pool.close()
+        workers *= 2
+
+if __name__ == "__main__":
+    bench(sys.argv[1] if len(sys.argv) > 1 else "forest",
+          int(sys.argv[2]) if len(sys.argv) > 2 else 32,
+          int(sys.argv[3]) if len(sys.argv) > 3 else 4,
+          float(sys.argv[4]) if len(sys.argv) > 4 else 5)
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import time
+
+from anchorpy import Provider, Wallet, Program, Idl
+from solana.rpc.async_api import AsyncClient
+from solders.keypair import Keypair
+from solders.system_program import ID as SYS_PROGRAM_ID
+
+from solana_handler import (
+    IDL_PATH, PROGRAM_ID, RPC_URL, WALLET_PATH,
+    RayguardHandler, derive_ledger_pda, derive_log_pda,
+)
+
+# ---------------------------------------------------------
+# BENCHMARK: per-call setup overhead of solana_handler
+# ---------------------------------------------------------
+# Compares the old get_program() pattern (new AsyncClient, id.json and IDL
+# re-read and re-parsed, Program rebuilt on every call) with one long-lived
+# RayguardHandler. Only local work is timed - each iteration builds an add_log
+# instruction but never sends it, so no RPC traffic is needed.
+#
+#   python bench_solana_handler.py [iterations]
+
+async def legacy_get_program():
+    """The pre-handler setup path, reproduced as it ran on every call."""
+    client = AsyncClient(RPC_URL)
+    with open(WALLET_PATH, "r") as f:
+        secret = json.load(f)
+    provider = Provider(client, Wallet(Keypair.from_bytes(bytes(secret))))
+    with open(IDL_PATH, "r") as f:
+        idl = Idl.from_json(f.read())
+    return Program(idl, PROGRAM_ID, provider), provider, client
+
+def build_add_log_ix(program, provider):
+    ledger = derive_ledger_pda(105)
+    args = program.type["AddLogArgs"](ip_address="10.0.0.5", threat_type="DOS", action_taken="Blocked/Alerted")
+    return program.methods["add_log"].args([args]).accounts({
+        "ledger": ledger,
+        "log": derive_log_pda(ledger, 0),
+        "authority": provider.wallet.public_key,
+        "system_program": SYS_PROGRAM_ID
+    }).instruction()
+
+async def bench(iterations):
+    leaked = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        program, provider, client = await legacy_get_program()
+        build_add_log_ix(program, provider)
+        leaked.append(client)  # the old code never closed these
+    legacy = (time.perf_counter() - start) / iterations
+    for client in leaked:
+        await client.close()
+
+    start = time.perf_counter()
+    async with RayguardHandler() as handler:
+        opened = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(iterations):
+            build_add_log_ix(handler.program, handler.provider)
+        cached = (time.perf_counter() - start) / iterations
+
+    print(f"📊 {iterations} calls")
+    print(f"   get_program() per call:    {legacy * 1e6:9.1f} µs  ({iterations} RPC clients opened)")
+    print(f"   RayguardHandler per call:  {cached * 1e6:9.1f} µs  (1 RPC client, opened in {opened * 1e3:.2f} ms)")
+    print(f"   Speedup: {legacy / cached:.1f}x")
+
+if __name__ == "__main__":
+    import sys
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
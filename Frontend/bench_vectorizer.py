@@ -0,0 +1,64 @@
+import csv
+import sys
+import time
+
+import numpy as np
+
+from vectorizer import FeatureVectorizer
+
+# ---------------------------------------------------------
+# BENCHMARK: record -> model input
+# ---------------------------------------------------------
+# Compares the original preprocess_input (Python list per request, float64
+# array from np.array) with FeatureVectorizer on rows of the bundled dataset.
+#
+#   python bench_vectorizer.py [rows] [preprocessing.json]
+
+DATASET_PATH = "nsl_kdd_dataset.csv"
+
+def legacy_preprocess_input(data, features):
+    """The pre-vectorizer preprocess_input, reproduced as it ran per request."""
+    vector = []
+    for f in features:
+        if f not in data:
+            vector.append(0)
+        else:
+            vector.append(data[f])
+    return np.array(vector).reshape(1, -1)
+
+def load_records(n_rows):
+    with open(DATASET_PATH, "r") as f:
+        reader = csv.DictReader(f)
+        features = [name for name in reader.fieldnames if name != "label"]
+        records = []
+        for row in reader:
+            records.append({name: float(row[name]) for name in features})
+            if len(records) >= n_rows:
+                break
+    return features, records
+
+def timed(fn, records):
+    start = time.perf_counter()
+    for record in records:
+        fn(record)
+    return (time.perf_counter() - start) / len(records)
+
+def bench(n_rows, schema_path):
+    features, records = load_records(n_rows)
+    vectorizer = FeatureVectorizer.from_file(schema_path, features)
+
+    legacy = timed(lambda r: legacy_preprocess_input(r, features), records)
+    single = timed(vectorizer.transform, records)
+
+    start = time.perf_counter()
+    vectorizer.transform_batch(records)
+    batch = (time.perf_counter() - start) / len(records)
+
+    print(f"📊 {len(records)} records, {len(features)} features")
+    print(f"   legacy preprocess_input:   {legacy * 1e6:7.2f} µs/record")
+    print(f"   vectorizer.transform:      {single * 1e6:7.2f} µs/record  ({legacy / single:.1f}x)")
+    print(f"   vectorizer.transform_batch:{batch * 1e6:7.2f} µs/record  ({legacy / batch:.1f}x)")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+          sys.argv[2] if len(sys.argv) > 2 else "preprocessing.json")
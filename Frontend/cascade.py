@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from forest import FlatForest
+from labels import is_benign
+
+# ---------------------------------------------------------
+# CASCADE (FAST TIER)
+# ---------------------------------------------------------
+# A distilled one-tree fast tier (models/fast/, written by model/train.py).
+# Rows whose intrusion score is below `low` (or at least `high`) are answered
+# by it; the rest escalate to the full model.
+
+class Cascade:
+    def __init__(self, fast_model, full_classes, low, high=None, measured=None):
+        self.fast = fast_model
+        self.low = float(low)
+        self.measured = measured or {}
+
+        full_classes = [str(c) for c in full_classes]
+        benign = [c for c in full_classes if is_benign(c)]
+        attacks = [c for c in full_classes if not is_benign(c)]
+        if not benign:
+            raise ValueError("the full model has no benign class for the fast tier to answer with")
+        self.benign_label = benign[0]
+        self.attack_label = attacks[0] if len(attacks) == 1 else None
+        self.high = float(high) if high is not None and self.attack_label is not None else None
+        self._intrusion = np.array([not is_benign(c) for c in fast_model.classes_])
+
+        self._lock = threading.Lock()
+        self._stats = {"rows": 0, "fast_benign": 0, "fast_intrusion": 0, "escalated": 0}
+
+    @classmethod
+    def load(cls, path, full_classes):
+        """The fast tier exported by train.py into `path`, or None if there is none."""
+        config_path = os.path.join(path, "cascade.json")
+        if not os.path.exists(config_path):
+            return None
+        with open(config_path, "r") as f:
+            measured = json.load(f)
+        return cls(FlatForest.load(path), full_classes, measured["low"], measured.get("high"), measured)
+
+    def decide(self, rows, full):
+        """
+        [(threat_type, score, tier)] per row. full(rows) -> [(threat_type, score)]
+        is called once, with only the escalated rows.
+        """
+        scores = self.fast.predict_proba(rows)[:, self._intrusion].sum(axis=1)
+        benign = scores < self.low
+        intrusion = scores >= self.high if self.high is not None else np.zeros(len(scores), dtype=bool)
+        escalated = np.flatnonzero(~(benign | intrusion))
+
+        verdicts = [
+            (self.benign_label if b else self.attack_label, round(float(s), 4), "fast")
+            for b, s in zip(benign, scores)
+        ]
+        if escalated.size:
+            for i, (threat_type, score) in zip(escalated, full(rows[escalated])):
+                verdicts[i] = (threat_type, score, "full")
+
+        with self._lock:
+            self._stats["rows"] += len(scores)
+            self._stats["fast_benign"] += int(benign.sum())
+            self._stats["fast_intrusion"] += int(intrusion.sum())
+            self._stats["escalated"] += int(escalated.size)
+        return verdicts
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        rows = snapshot["rows"]
+        snapshot.update({
+            "low": self.low,
+            "high": self.high,
+            "escalation_rate": round(snapshot["escalated"] / rows, 4) if rows else None,
+            "measured": {k: v for k, v in self.measured.items() if k != "tradeoff"},
+        })
+        return snapshot
@@ -0,0 +1,193 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+# ---------------------------------------------------------
+# BACKGROUND DISPATCH QUEUE
+# ---------------------------------------------------------
+# Slow outbound calls (ledger writes, SMS) run on a small worker pool. Tasks
+# with the same key run in order on one worker; essential ones (createLedger)
+# are never dropped when the queue is full.
+
+POLICIES = ("block", "drop_newest", "drop_oldest")
+
+class _TaskQueue:
+    """One worker's FIFO. Unlike queue.Queue, it can evict a task that isn't at the head."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._tasks = deque()
+        self._changed = threading.Condition()
+
+    def qsize(self):
+        return len(self._tasks)
+
+    def put(self, task, timeout=0.0, force=False):
+        """Appends task, waiting up to `timeout` for room; force appends even when full. False if full."""
+        with self._changed:
+            if not force and len(self._tasks) >= self.maxsize:
+                if timeout <= 0 or not self._changed.wait_for(lambda: len(self._tasks) < self.maxsize, timeout):
+                    return False
+            self._tasks.append(task)
+            self._changed.notify_all()
+            return True
+
+    def evict_oldest(self):
+        """Removes the oldest task that isn't essential. False if there is none."""
+        with self._changed:
+            for i, task in enumerate(self._tasks):
+                if task is not None and not task[3]:
+                    del self._tasks[i]
+                    self._changed.notify_all()
+                    return True
+            return False
+
+    def get(self):
+        with self._changed:
+            self._changed.wait_for(lambda: self._tasks)
+            task = self._tasks.popleft()
+            self._changed.notify_all()
+            return task
+
+class Dispatcher:
+    def __init__(self, workers=4, max_queue=1000, policy="drop_oldest", block_timeout=1.0, name="dispatch"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown dispatch policy '{policy}', expected one of {POLICIES}")
+
+        self.policy = policy
+        self.block_timeout = block_timeout
+        per_worker = max(1, max_queue // workers)
+        self._queues = [_TaskQueue(per_worker) for _ in range(workers)]
+        self._round_robin = itertools.cycle(range(workers))
+
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._closed = False
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0,
+            "dropped": 0, "blocked": 0, "over_capacity": 0, "high_water": 0,
+        }
+
+        # Workers start on the first submit, so importing a module that builds
+        # a Dispatcher it never uses (e.g. asgi.py importing main) costs no threads
+        self.name = name
+        self.workers = workers
+        self._threads = []
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i, q in enumerate(self._queues):
+                t = threading.Thread(target=self._worker, args=(q,), name=f"{self.name}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, fn, *args, key=None, essential=False, **kwargs):
+        """
+        Queues fn(*args, **kwargs). Returns False if the task was dropped.
+        An essential task is never dropped, whatever the policy.
+        """
+        if self._closed:
+            return False
+        if not self._threads:
+            self._start()
+
+        if key is None:
+            q = self._queues[next(self._round_robin)]
+        else:
+            q = self._queues[hash(key) % len(self._queues)]
+        task = (fn, args, kwargs, essential)
+
+        with self._lock:
+            self._pending += 1
+        if not q.put(task) and not self._enqueue_when_full(q, task):
+            self._count("dropped")
+            self._task_finished()
+            return False
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            depth = sum(x.qsize() for x in self._queues)
+            self._stats["high_water"] = max(self._stats["high_water"], depth)
+        return True
+
+    def _enqueue_when_full(self, q, task):
+        essential = task[3]
+        if self.policy == "block":
+            self._count("blocked")
+            if q.put(task, timeout=self.block_timeout):
+                return True
+        elif self.policy == "drop_oldest":
+            # Evict the stalest task that may be dropped to make room for the new one
+            if q.evict_oldest():
+                self._count("dropped")
+                self._task_finished()
+            if q.put(task):
+                return True
+        if essential:
+            self._count("over_capacity")
+            return q.put(task, force=True)
+        return False
+
+    def _worker(self, q):
+        while True:
+            task = q.get()
+            if task is None:
+                return
+            fn, args, kwargs, _ = task
+            try:
+                fn(*args, **kwargs)
+                self._count("completed")
+            except Exception as e:
+                self._count("failed")
+                print(f"Dispatch Error: {e}")
+            finally:
+                self._task_finished()
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _task_finished(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """Waits until every queued task has run. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=5.0):
+        """Stops accepting work, drains what is queued, then stops the workers."""
+        if self._closed:
+            return
+        self._closed = True
+        drained = self.flush(timeout)
+        for q in self._queues:
+            q.put(None, force=True)
+        for t in self._threads:
+            t.join(timeout=1.0)
+        if not drained:
+            print(f"⚠️ Dispatcher shut down with {self._pending} task(s) unsent")
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["pending"] = self._pending
+        snapshot["queued"] = sum(q.qsize() for q in self._queues)
+        snapshot["capacity"] = sum(q.maxsize for q in self._queues)
+        snapshot["workers"] = self.workers
+        snapshot["started"] = bool(self._threads)
+        snapshot["policy"] = self.policy
+        return snapshot
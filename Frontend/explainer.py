@@ -0,0 +1,112 @@
+import threading
+import time
+
+import numpy as np
+
+from forest import FlatForest
+from labels import is_benign
+
+# ---------------------------------------------------------
+# VERDICT EXPLANATIONS
+# ---------------------------------------------------------
+# Top-k feature contributions to a verdict's intrusion score, built once per
+# model generation: path attribution for forests, else XGBoost's or shap's
+# TreeSHAP. method="auto" picks the first that applies.
+
+METHODS = ("auto", "path", "xgboost", "shap")
+
+class Explainer:
+    def __init__(self, model, features, top_k=5, method="auto", chunk_rows=1024):
+        if method not in METHODS:
+            raise ValueError(f"Unknown explain method '{method}', expected one of {METHODS}")
+        self.features = list(features)
+        self.top_k = max(1, min(top_k, len(self.features)))
+        self.chunk_rows = chunk_rows
+        # Contributions to 1 - benign mass are the sum of those to the non-benign classes
+        self._weights = np.array([not is_benign(c) for c in model.classes_], dtype=np.float64)
+
+        self._lock = threading.Lock()
+        self._stats = {"rows": 0, "calls": 0, "seconds": 0.0}
+        start = time.perf_counter()
+        self.method = self._build(model, method)
+        self._stats["build_ms"] = round((time.perf_counter() - start) * 1e3, 2)
+
+    def _build(self, model, method):
+        if method in ("auto", "path"):
+            forest = model if isinstance(model, FlatForest) else None
+            if forest is None and hasattr(getattr(model, "estimators_", [None])[0], "tree_"):
+                forest = FlatForest.from_model(model)
+            if forest is not None:
+                self._forest = forest
+                self._node_score = forest._value.astype(np.float64) @ self._weights
+                self.units = "probability"
+                return "path"
+        if method in ("auto", "xgboost") and hasattr(model, "get_booster"):
+            import xgboost as xgb
+            self._booster = model.get_booster()
+            self._dmatrix = xgb.DMatrix
+            self.units = "log_odds"
+            return "xgboost"
+        if method in ("auto", "shap"):
+            import shap
+            self._shap = shap.TreeExplainer(model)
+            self.units = "model_output"
+            return "shap"
+        raise ValueError(f"explain method '{method}' doesn't support {type(model).__name__}")
+
+    def _toward_intrusion(self, values, base):
+        """Per-class attributions ([n, f, classes] / [classes]) -> intrusion score ones."""
+        values, base = np.asarray(values), np.asarray(base, dtype=np.float64)
+        if values.ndim == 2:
+            # One output, for the positive class: flip it if that class is benign
+            sign = 1.0 if self._weights[-1] else -1.0
+            return float(base.reshape(-1)[-1]) * sign, values * sign
+        return float(base @ self._weights), values @ self._weights
+
+    def _contributions(self, X):
+        if self.method == "path":
+            return self._forest.contributions(X, self._node_score)
+        if self.method == "xgboost":
+            raw = self._booster.predict(self._dmatrix(X), pred_contribs=True)
+            if raw.ndim == 3:
+                # Multi-class: [n, classes, f + 1], bias last
+                return self._toward_intrusion(raw[:, :, :-1].transpose(0, 2, 1), raw[0, :, -1])
+            return self._toward_intrusion(raw[:, :-1], raw[0, -1])
+        values = self._shap.shap_values(X, check_additivity=False)
+        if isinstance(values, list):
+            values = np.stack(values, axis=-1)
+        return self._toward_intrusion(values, self._shap.expected_value)
+
+    def explain(self, X):
+        """One {"base", "top": [{"feature", "contribution"}, ...]} per row, largest |contribution| first."""
+        X = np.asarray(X, dtype=np.float32)
+        start = time.perf_counter()
+        explanations = []
+        for offset in range(0, len(X), self.chunk_rows):
+            base, contributions = self._contributions(X[offset:offset + self.chunk_rows])
+            k = self.top_k
+            top = np.argpartition(-np.abs(contributions), k - 1, axis=1)[:, :k]
+            for row, columns in zip(contributions, top):
+                columns = columns[np.argsort(-np.abs(row[columns]))]
+                explanations.append({
+                    "base": round(base, 4),
+                    "top": [{"feature": self.features[j], "contribution": round(float(row[j]), 4)}
+                            for j in columns],
+                })
+        with self._lock:
+            self._stats["rows"] += len(X)
+            self._stats["calls"] += 1
+            self._stats["seconds"] += time.perf_counter() - start
+        return explanations
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        rows, seconds = snapshot["rows"], snapshot.pop("seconds")
+        snapshot.update({
+            "method": self.method,
+            "units": self.units,
+            "top_k": self.top_k,
+            "us_per_row": round(seconds / rows * 1e6, 2) if rows else None,
+        })
+        return snapshot
@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import Counter, deque
+
+# ---------------------------------------------------------
+# FLOW WINDOWS
+# ---------------------------------------------------------
+# NSL-KDD's 19 time- and host-window traffic features, computed from each
+# source's own connections rather than trusted from the client. Updates are
+# O(1) amortized and memory is bounded by `max_events`.
+
+SERROR_FLAGS = frozenset(("S0", "S1", "S2", "S3"))
+RERROR_FLAGS = frozenset(("REJ",))
+
+TIME_FEATURES = ("count", "srv_count", "serror_rate", "srv_serror_rate", "rerror_rate",
+                 "srv_rerror_rate", "same_srv_rate", "diff_srv_rate", "srv_diff_host_rate")
+HOST_FEATURES = ("dst_host_count", "dst_host_srv_count", "dst_host_same_srv_rate",
+                 "dst_host_diff_srv_rate", "dst_host_same_src_port_rate", "dst_host_srv_diff_host_rate",
+                 "dst_host_serror_rate", "dst_host_srv_serror_rate", "dst_host_rerror_rate",
+                 "dst_host_srv_rerror_rate")
+WINDOW_FEATURES = TIME_FEATURES + HOST_FEATURES
+
+def _dec(counter, key):
+    n = counter[key] - 1
+    if n:
+        counter[key] = n
+    else:
+        del counter[key]
+
+class _Window:
+    """Running counters over a set of (host, service, src_port, serror, rerror) connections."""
+
+    def __init__(self):
+        self.host = Counter()
+        self.service = Counter()
+        self.host_service = Counter()
+        self.host_port = Counter()
+        self.host_serror = Counter()
+        self.host_rerror = Counter()
+        self.service_serror = Counter()
+        self.service_rerror = Counter()
+
+    def add(self, host, service, port, serror, rerror):
+        self.host[host] += 1
+        self.service[service] += 1
+        self.host_service[host, service] += 1
+        if port is not None:
+            self.host_port[host, port] += 1
+        if serror:
+            self.host_serror[host] += 1
+            self.service_serror[service] += 1
+        if rerror:
+            self.host_rerror[host] += 1
+            self.service_rerror[service] += 1
+
+    def remove(self, host, service, port, serror, rerror):
+        _dec(self.host, host)
+        _dec(self.service, service)
+        _dec(self.host_service, (host, service))
+        if port is not None:
+            _dec(self.host_port, (host, port))
+        if serror:
+            _dec(self.host_serror, host)
+            _dec(self.service_serror, service)
+        if rerror:
+            _dec(self.host_rerror, host)
+            _dec(self.service_rerror, service)
+
+class _Ring:
+    """
+    Time-window connections sharing one host (or one service), oldest first.
+    `other` counts the service (or host) of each, by conn index `other_index`.
+    """
+
+    __slots__ = ("events", "latest", "other", "other_index", "serror", "rerror")
+
+    def __init__(self, other_index):
+        self.events = deque()  # [ts, conn, in host ring, in service ring]
+        self.latest = float("-inf")
+        self.other = Counter()
+        self.other_index = other_index
+        self.serror = 0
+        self.rerror = 0
+
+    def add(self, event):
+        conn = event[1]
+        self.events.append(event)
+        self.other[conn[self.other_index]] += 1
+        self.serror += conn[3]
+        self.rerror += conn[4]
+
+    def pop(self):
+        event = self.events.popleft()
+        conn = event[1]
+        _dec(self.other, conn[self.other_index])
+        self.serror -= conn[3]
+        self.rerror -= conn[4]
+        return event
+
+def _rate(n, d):
+    return round(n / d, 2) if d else 0.0
+
+HOST_RING, SERVICE_RING = 2, 3  # where an event records that a ring still holds it
+
+class FlowWindows:
+    def __init__(self, window_seconds=2.0, window_conns=100, max_events=100000):
+        self.window_seconds = window_seconds
+        self.window_conns = window_conns
+        self.max_events = max_events
+
+        self._lock = threading.Lock()
+        self._by_host = {}     # host -> _Ring
+        self._by_service = {}  # service -> _Ring
+        self._arrivals = deque()  # every time-window event in arrival order, for the max_events bound
+        self._last = [None] * window_conns  # ring of the last `window_conns` connections
+        self._next = 0
+        self._hosts = _Window()
+        self._stats = {"events": 0, "evicted_early": 0}
+
+    def observe(self, host, service, flag="SF", src_port=None, timestamp=None):
+        """
+        Adds one connection and returns its 19 window features.
+        timestamp is the connection's own time, for callers that can vouch
+        for it; otherwise the time of the call.
+        """
+        ts = time.time() if timestamp is None else float(timestamp)
+        flag = str(flag)
+        conn = (host, service, src_port, flag in SERROR_FLAGS, flag in RERROR_FLAGS)
+
+        with self._lock:
+            self._stats["events"] += 1
+            # Before looking up the rings: this can drop one that empties
+            while len(self._arrivals) >= self.max_events:
+                self._evict_oldest()
+            host_ring = self._by_host.get(host)
+            if host_ring is None:
+                host_ring = self._by_host[host] = _Ring(1)
+            service_ring = self._by_service.get(service)
+            if service_ring is None:
+                service_ring = self._by_service[service] = _Ring(0)
+            self._expire(host_ring, ts, HOST_RING)
+            self._expire(service_ring, ts, SERVICE_RING)
+
+            event = [ts, conn, True, True]
+            host_ring.add(event)
+            service_ring.add(event)
+            self._arrivals.append(event)
+
+            hosts = self._hosts
+            old = self._last[self._next]
+            if old is not None:
+                hosts.remove(*old)
+            self._last[self._next] = conn
+            self._next = (self._next + 1) % self.window_conns
+            hosts.add(*conn)
+
+            return self._features(conn, host_ring, service_ring)
+
+    def _expire(self, ring, ts, held):
+        """Drops what fell out of one ring's window. Late events count as of its newest."""
+        ring.latest = max(ring.latest, ts)
+        horizon = ring.latest - self.window_seconds
+        events = ring.events
+        while events and events[0][0] < horizon:
+            ring.pop()[held] = False
+
+    def _evict_oldest(self):
+        """Removes the oldest arrival from the rings still holding it, to stay within max_events."""
+        event = self._arrivals.popleft()
+        host, service = event[1][0], event[1][1]
+        early = False
+        for held, rings, key in ((HOST_RING, self._by_host, host), (SERVICE_RING, self._by_service, service)):
+            if not event[held]:
+                continue
+            # Rings are in arrival order, so the oldest arrival is at the front of its own
+            ring = rings[key]
+            ring.pop()[held] = False
+            early = True
+            if not ring.events:
+                del rings[key]
+        if early:
+            self._stats["evicted_early"] += 1
+
+    def _features(self, conn, host_ring, service_ring):
+        host, service, port, _, _ = conn
+        h = self._hosts
+
+        count, srv_count = len(host_ring.events), len(service_ring.events)
+        same_srv = host_ring.other[service]
+        srv_same_host = service_ring.other[host]
+        dst_host_count, dst_host_srv_count = h.host[host], h.service[service]
+        host_same_srv = h.host_service[host, service]
+        return {
+            "count": count,
+            "srv_count": srv_count,
+            "serror_rate": _rate(host_ring.serror, count),
+            "srv_serror_rate": _rate(service_ring.serror, srv_count),
+            "rerror_rate": _rate(host_ring.rerror, count),
+            "srv_rerror_rate": _rate(service_ring.rerror, srv_count),
+            "same_srv_rate": _rate(same_srv, count),
+            "diff_srv_rate": _rate(count - same_srv, count),
+            "srv_diff_host_rate": _rate(srv_count - srv_same_host, srv_count),
+            "dst_host_count": dst_host_count,
+            "dst_host_srv_count": dst_host_srv_count,
+            "dst_host_same_srv_rate": _rate(host_same_srv, dst_host_count),
+            "dst_host_diff_srv_rate": _rate(dst_host_count - host_same_srv, dst_host_count),
+            "dst_host_same_src_port_rate": _rate(h.host_port[host, port], dst_host_count) if port is not None else 0.0,
+            "dst_host_srv_diff_host_rate": _rate(dst_host_srv_count - host_same_srv, dst_host_srv_count),
+            "dst_host_serror_rate": _rate(h.host_serror[host], dst_host_count),
+            "dst_host_srv_serror_rate": _rate(h.service_serror[service], dst_host_srv_count),
+            "dst_host_rerror_rate": _rate(h.host_rerror[host], dst_host_count),
+            "dst_host_srv_rerror_rate": _rate(h.service_rerror[service], dst_host_srv_count),
+        }
+
+    def enrich(self, host, record, timestamp=None):
+        """
+        record with its window features replaced by the server's own.
+        record["timestamp"] is ignored: a trusted time is passed as `timestamp`.
+        """
+        features = self.observe(
+            host, record.get("service"), record.get("flag", "SF"),
+            src_port=record.get("src_port"), timestamp=timestamp,
+        )
+        return {**record, **features}
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["time_window_events"] = sum(len(r.events) for r in self._by_host.values())
+            snapshot["hosts"] = len(self._by_host)
+            snapshot["services"] = len(self._by_service)
+        snapshot["window_seconds"] = self.window_seconds
+        snapshot["window_conns"] = self.window_conns
+        return snapshot
@@ -0,0 +1,208 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# ---------------------------------------------------------
+# FLAT FOREST
+# ---------------------------------------------------------
+# A RandomForestClassifier as a few contiguous .npy arrays that the server
+# mmaps instead of unpickling, evaluated for all trees in lockstep.
+
+FORMAT_VERSION = 1
+ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+def flatten(model):
+    """
+    (meta, arrays) for a fitted single-output RandomForestClassifier, in the
+    layout above. A lone DecisionTreeClassifier is flattened as a one-tree forest.
+    """
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("only single-output forests can be flattened")
+
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in getattr(model, "estimators_", [model]):
+        tree = estimator.tree_
+        n = tree.node_count
+        nodes = np.arange(offset, offset + n, dtype=np.int32)
+        is_leaf = tree.children_left < 0
+
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        left.append(np.where(is_leaf, nodes, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, nodes, tree.children_right + offset).astype(np.int32))
+        # Counts or fractions depending on the sklearn version: normalize per node
+        counts = tree.value[:, 0, :]
+        value.append((counts / counts.sum(axis=1, keepdims=True)).astype(np.float32))
+        roots.append(offset)
+
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "feature": np.concatenate(feature), "threshold": np.concatenate(threshold),
+        "left": np.concatenate(left), "right": np.concatenate(right),
+        "value": np.concatenate(value), "roots": np.asarray(roots, dtype=np.int32),
+    }
+    meta = {
+        "format": FORMAT_VERSION,
+        "classes": [c.item() if hasattr(c, "item") else c for c in model.classes_],
+        "n_features": int(model.n_features_in_),
+        "n_trees": len(roots),
+        "max_depth": int(max_depth),
+    }
+    return meta, arrays
+
+def export_forest(model, out_dir):
+    """Flattens a fitted single-output RandomForestClassifier (or decision tree) into out_dir."""
+    meta, arrays = flatten(model)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+class FlatForest:
+    """Drop-in for the parts of RandomForestClassifier the server uses."""
+
+    def __init__(self, meta, arrays):
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported flat forest format {meta.get('format')}")
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_features_in_ = meta["n_features"]
+        self.n_estimators = meta["n_trees"]
+        self.max_depth = meta["max_depth"]
+        for name in ARRAYS:
+            setattr(self, f"_{name}", arrays[name])
+        self.path = None  # set by load(..., mmap=True)
+
+    @classmethod
+    def from_model(cls, model):
+        """An in-memory FlatForest of a fitted RandomForestClassifier."""
+        return cls(*flatten(model))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS}
+        forest = cls(meta, arrays)
+        if mmap:
+            forest.path = path
+        return forest
+
+    def __reduce_ex__(self, protocol):
+        # A mapped forest pickles as its directory, so another process (an
+        # InferencePool worker) maps the same pages instead of copying them
+        if self.path is not None:
+            return type(self).load, (self.path,)
+        return super().__reduce_ex__(protocol)
+
+    def apply(self, X):
+        """Leaf index reached in every tree: [n_samples, n_trees]."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_trees = X.shape[0], self.n_estimators
+        flat_x = X.ravel()
+        # One (sample, tree) walker per slot; row_base turns a column into a flat_x index
+        row_base = np.repeat(np.arange(n_samples, dtype=np.int64) * X.shape[1], n_trees)
+        nodes = np.tile(self._roots.astype(np.int64), n_samples)
+        active = np.arange(nodes.size)
+
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            go_left = flat_x[row_base[active] + self._feature[current]] <= self._threshold[current]
+            step = np.where(go_left, self._left[current], self._right[current])
+            nodes[active] = step
+            # Walkers that landed on a leaf stop moving (leaves point to themselves)
+            active = active[step != current]
+            if not active.size:
+                break
+        return nodes.reshape(n_samples, n_trees)
+
+    def contributions(self, X, node_score):
+        """
+        Per-feature contributions to the forest's mean of node_score
+        ([n_nodes], e.g. value @ class weights): base + row sum == prediction.
+        Each split adds node_score[child] - node_score[parent] to its split
+        feature (Saabas path attribution), in the same lockstep walk as apply().
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features, n_trees = X.shape[0], X.shape[1], self.n_estimators
+        flat_x = X.ravel()
+        row_base = np.repeat(np.arange(n_samples, dtype=np.int64) * n_features, n_trees)
+        nodes = np.tile(self._roots.astype(np.int64), n_samples)
+        active = np.arange(nodes.size)
+        out = np.zeros(n_samples * n_features, dtype=np.float64)
+
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            split = self._feature[current]
+            go_left = flat_x[row_base[active] + split] <= self._threshold[current]
+            step = np.where(go_left, self._left[current], self._right[current])
+            moved = step != current
+            np.add.at(out, row_base[active[moved]] + split[moved], node_score[step[moved]] - node_score[current[moved]])
+            nodes[active] = step
+            active = active[moved]
+            if not active.size:
+                break
+        base = float(np.mean(node_score[self._roots]))
+        return base, out.reshape(n_samples, n_features) / n_trees
+
+    def predict_proba(self, X, chunk_size=1024):
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        # Chunked so the per-walker index arrays stay cache-sized
+        for start in range(0, X.shape[0], chunk_size):
+            leaves = self.apply(X[start:start + chunk_size])
+            out[start:start + chunk_size] = self._value[leaves].mean(axis=1, dtype=np.float64)
+        return out
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+# ---------------------------------------------------------
+# CLI: flatten an existing pickle and check it against the original
+# ---------------------------------------------------------
+#   python forest.py best_intrusion_model.pkl forest/ [dataset.csv]
+
+def main():
+    import joblib
+
+    if len(sys.argv) < 3:
+        print("usage: python forest.py MODEL.pkl OUT_DIR [DATASET.csv]")
+        sys.exit(2)
+    model_path, out_dir = sys.argv[1], sys.argv[2]
+
+    start = time.perf_counter()
+    model = joblib.load(model_path)
+    pickle_load = time.perf_counter() - start
+
+    export_forest(model, out_dir)
+    start = time.perf_counter()
+    forest = FlatForest.load(out_dir)
+    flat_load = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(out_dir, f"{name}.npy")) for name in ARRAYS)
+
+    print(f"✅ Flattened {forest.n_estimators} trees ({len(forest._feature)} nodes, {size / 1e6:.1f} MB) into {out_dir}")
+    print(f"   joblib.load:     {pickle_load * 1e3:8.2f} ms")
+    print(f"   FlatForest.load: {flat_load * 1e3:8.2f} ms")
+
+    if len(sys.argv) > 3:
+        import pandas as pd
+        X = pd.read_csv(sys.argv[3]).drop(columns=["label"], errors="ignore").to_numpy(dtype=np.float32)
+        start = time.perf_counter()
+        expected = model.predict(X)
+        sk_time = time.perf_counter() - start
+        start = time.perf_counter()
+        got = forest.predict(X)
+        flat_time = time.perf_counter() - start
+        print(f"   predict {len(X)} rows: sklearn {sk_time * 1e3:.1f} ms, flat {flat_time * 1e3:.1f} ms, "
+              f"agreement {np.mean(expected == got) * 100:.2f}%")
+
+if __name__ == "__main__":
+    main()
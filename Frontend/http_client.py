@@ -0,0 +1,123 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ---------------------------------------------------------
+# POOLED HTTP CLIENT
+# ---------------------------------------------------------
+# A module-level requests.post() opens a fresh TCP+TLS connection per call.
+# HttpClient keeps one Session with a keep-alive connection pool per host,
+# retries transient failures with backoff, and applies per-endpoint timeouts.
+
+DEFAULT_TIMEOUT = 5
+
+class RetryPolicy:
+    """
+    The one retry policy for outbound calls: HttpClient hands it to urllib3,
+    and asgi.py's async client follows the same rules by hand.
+
+    Only retry when the request surely did not reach the backend (connect
+    errors) or the backend asked us to (429/503). A read timeout on /addLog
+    may already have written the log, so it is never replayed.
+
+    Status retries are for GETs only. A POST that got a 429/503 answer was
+    still received, and /predict answers 503 on purpose for DOS and banned
+    sources; replaying those would send every blocked request three more
+    times, and /addLogs may have written part of a batch.
+    """
+
+    def __init__(self, retries=3, backoff_factor=0.3, status_forcelist=(429, 503), status_methods=("GET",)):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = tuple(status_forcelist)
+        # Methods whose 429/503 answers are retried; None means every method
+        self.status_methods = None if status_methods is None else frozenset(m.upper() for m in status_methods)
+
+    def urllib3(self):
+        return Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=0,
+            status=self.retries,
+            status_forcelist=self.status_forcelist,
+            allowed_methods=self.status_methods,
+            backoff_factor=self.backoff_factor,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+
+    def retries_status(self, method, status):
+        return status in self.status_forcelist and (self.status_methods is None or method.upper() in self.status_methods)
+
+    def backoff(self, attempt):
+        """Seconds to sleep before retry number `attempt` (1-based), as urllib3 computes it."""
+        if attempt <= 1:
+            return 0
+        return min(Retry.DEFAULT_BACKOFF_MAX, self.backoff_factor * (2 ** (attempt - 1)))
+
+class HttpClient:
+    def __init__(self, timeouts=None, default_timeout=DEFAULT_TIMEOUT, retries=3,
+                 backoff_factor=0.3, pool_connections=10, pool_maxsize=20):
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.retry_policy = RetryPolicy(retries, backoff_factor)
+        retry = self.retry_policy.urllib3()
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._lock = threading.Lock()
+        self._errors = 0
+
+    def request(self, method, url, endpoint=None, **kwargs):
+        """
+        Sends a request through the shared pool.
+        `endpoint` names an entry in `timeouts` (e.g. "addLog") to pick its timeout.
+        """
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, self.default_timeout))
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def get(self, url, endpoint=None, **kwargs):
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def post(self, url, endpoint=None, **kwargs):
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
+
+    def stats(self):
+        """
+        Per-host connection counters from urllib3's pools.
+        `handshakes` counts new TCP(+TLS) connections, `pool_hits` counts requests
+        served on an already open keep-alive connection.
+        """
+        hosts = {}
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "requests": pool.num_requests,
+                "handshakes": pool.num_connections,
+                "pool_hits": max(0, pool.num_requests - pool.num_connections),
+            }
+        return {
+            "requests": sum(h["requests"] for h in hosts.values()),
+            "handshakes": sum(h["handshakes"] for h in hosts.values()),
+            "pool_hits": sum(h["pool_hits"] for h in hosts.values()),
+            "errors": self._errors,
+            "hosts": hosts,
+        }
+
+    def close(self):
+        self.session.close()
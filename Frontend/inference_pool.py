@@ -0,0 +1,318 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+# ---------------------------------------------------------
+# MULTI-PROCESS INFERENCE POOL
+# ---------------------------------------------------------
+# Runs predict_proba in forkserver worker processes. Rows travel through a
+# shared-memory slot ring, only slot numbers cross the pipes, and a worker
+# that dies fails its slots at once and is replaced.
+
+RESPAWN_BACKOFF = 1.0  # seconds before replacing a worker that died this soon after starting
+
+class _Worker:
+    __slots__ = ("id", "process", "tasks", "results", "pending", "started")
+
+class InferencePool:
+    def __init__(self, model, n_features, workers=2, slots=256, slot_rows=64,
+                 max_batch_rows=1024, timeout=5.0):
+        if workers < 1:
+            raise ValueError("an inference pool needs at least one worker")
+        self.model = model
+        self.classes_ = np.asarray(model.classes_)
+        self.n_features = n_features
+        self.slot_rows = slot_rows
+        self.max_batch_rows = max_batch_rows
+        self.timeout = timeout
+
+        self._shapes = ((slots, slot_rows, n_features), (slots, slot_rows, len(self.classes_)))
+        self._in_size = slots * slot_rows * n_features * 4
+        out_size = slots * slot_rows * len(self.classes_) * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=self._in_size + out_size)
+        self._inputs, self._outputs = _views(self._shm, self._shapes, self._in_size)
+
+        self._ctx = mp.get_context("forkserver")
+        self._free = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+
+        self._lock = threading.Lock()
+        self._waiting = {}       # slot -> [threading.Event, error]
+        self._abandoned = set()  # slots whose caller timed out; freed when they come back
+        self._stats = {"requests": 0, "rows": 0, "batches": 0, "largest_batch": 0,
+                       "timeouts": 0, "errors": 0, "worker_deaths": 0, "respawns": 0}
+        self._closed = False
+
+        # The collector's wait() also wakes on this pipe, when workers are replaced or on close
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._workers = [self._spawn(i) for i in range(workers)]
+        self._collector = threading.Thread(target=self._collect, name="inference-collector", daemon=True)
+        self._collector.start()
+
+    def _spawn(self, worker_id):
+        tasks_r, tasks_w = self._ctx.Pipe(duplex=False)
+        results_r, results_w = self._ctx.Pipe(duplex=False)
+        p = self._ctx.Process(target=_worker, name=f"inference-{worker_id}", daemon=True,
+                              args=(self.model, self._shm.name, self._shapes, self._in_size,
+                                    tasks_r, results_w, self.max_batch_rows))
+        p.start()
+        # The child holds its own ends now
+        tasks_r.close()
+        results_w.close()
+        worker = _Worker()
+        worker.id, worker.process, worker.tasks, worker.results = worker_id, p, tasks_w, results_r
+        worker.pending = set()
+        worker.started = time.monotonic()
+        return worker
+
+    def predict_proba(self, X):
+        """Class probabilities for a 2-D feature matrix, computed in the worker processes."""
+        if self._closed:
+            raise RuntimeError("inference pool is closed")
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features)
+        out = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+
+        chunks = []
+        try:
+            for start in range(0, X.shape[0], self.slot_rows):
+                rows = X[start:start + self.slot_rows]
+                slot = self._acquire()
+                event = threading.Event()
+                self._inputs[slot, :len(rows)] = rows
+                try:
+                    self._submit(slot, len(rows), event)
+                except RuntimeError:
+                    self._free.put(slot)
+                    raise
+                chunks.append((slot, start, len(rows), event))
+
+            for slot, start, n, event in chunks:
+                if not event.wait(self.timeout):
+                    raise TimeoutError(f"inference pool did not answer within {self.timeout}s")
+                error = self._waiting[slot][1]
+                if error is not None:
+                    with self._lock:
+                        self._stats["errors"] += 1
+                    raise RuntimeError(f"inference worker failed: {error}")
+                out[start:start + n] = self._outputs[slot, :n]
+        except TimeoutError:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise
+        finally:
+            self._release([slot for slot, _, _, _ in chunks])
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["rows"] += X.shape[0]
+        return out
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def _acquire(self):
+        try:
+            return self._free.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no free inference slot within {self.timeout}s") from None
+
+    def _submit(self, slot, n_rows, event):
+        with self._lock:
+            if not self._workers:
+                raise RuntimeError("no inference worker is running (restarting after a crash)")
+            worker = min(self._workers, key=lambda w: len(w.pending))
+            self._waiting[slot] = [event, None]
+            worker.pending.add(slot)
+            try:
+                worker.tasks.send((slot, n_rows))
+            except OSError:
+                pass  # it just died; the collector fails its pending slots, this one included
+
+    def _release(self, slots):
+        with self._lock:
+            for slot in slots:
+                event, _ = self._waiting.pop(slot)
+                if event.is_set():
+                    self._free.put(slot)
+                else:
+                    # Still queued or running: a worker will write to it later
+                    self._abandoned.add(slot)
+
+    def _finish(self, slots, error):
+        """Wakes the callers of `slots`; slots nobody waits for any more go back to the ring. Holds _lock."""
+        for slot in slots:
+            if slot in self._abandoned:
+                self._abandoned.discard(slot)
+                self._free.put(slot)
+                continue
+            waiter = self._waiting.get(slot)
+            if waiter is not None:
+                waiter[1] = error
+                waiter[0].set()
+
+    def _collect(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                by_handle = {}
+                for w in self._workers:
+                    by_handle[w.results] = w
+                    by_handle[w.process.sentinel] = w
+            for handle in wait(list(by_handle) + [self._wakeup_r]):
+                if handle == self._wakeup_r:
+                    os.read(self._wakeup_r, 512)
+                    continue
+                worker = by_handle[handle]
+                if handle is worker.results:
+                    self._receive(worker)
+                else:
+                    self._replace(worker)
+
+    def _receive(self, worker):
+        try:
+            slots, error = worker.results.recv()
+        except (EOFError, OSError):
+            return False  # died; its sentinel is ready too
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(slots))
+            worker.pending.difference_update(slots)
+            self._finish(slots, error)
+        return True
+
+    def _replace(self, worker):
+        """A worker exited: fails the slots it held and, unless closing, starts another in its place."""
+        worker.process.join(timeout=0)
+        # Results it managed to send before dying are still in its pipe
+        while worker.results.poll() and self._receive(worker):
+            pass
+        with self._lock:
+            if worker not in self._workers:
+                return
+            # Out of the dispatch list and its slots failed in one step, so none can be sent to it after
+            self._workers.remove(worker)
+            self._finish(worker.pending, f"worker {worker.id} died (exit code {worker.process.exitcode})")
+            worker.pending = set()
+            if self._closed:
+                return
+            self._stats["worker_deaths"] += 1
+        worker.tasks.close()
+        worker.results.close()
+        # One that died right after starting (e.g. the model didn't load) isn't restarted in a tight loop
+        if time.monotonic() - worker.started < RESPAWN_BACKOFF:
+            timer = threading.Timer(RESPAWN_BACKOFF, self._respawn, (worker.id,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._respawn(worker.id)
+
+    def _respawn(self, worker_id):
+        if self._closed:
+            return
+        replacement = self._spawn(worker_id)
+        with self._lock:
+            closing = self._closed
+            if not closing:
+                self._workers.append(replacement)
+                self._stats["respawns"] += 1
+        if closing:
+            replacement.tasks.send(None)
+            return
+        os.write(self._wakeup_w, b"x")  # the collector starts watching it
+
+    def close(self):
+        """Stops the workers and releases the shared memory."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for w in workers:
+            try:
+                w.tasks.send(None)
+            except OSError:
+                pass
+        for w in workers:
+            w.process.join(timeout=1.0)
+            if w.process.is_alive():
+                w.process.terminate()
+        os.write(self._wakeup_w, b"x")
+        self._collector.join(timeout=1.0)
+        with self._lock:
+            # Anyone still waiting gets an answer now rather than at their timeout
+            for w in workers:
+                self._finish(w.pending, "inference pool closed")
+        for w in workers:
+            w.tasks.close()
+            w.results.close()
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
+        # Views into the buffer must go before the segment can be closed
+        self._inputs = self._outputs = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["abandoned_slots"] = len(self._abandoned)
+            workers = list(self._workers)
+        snapshot["workers"] = len(workers)
+        snapshot["alive"] = sum(w.process.is_alive() for w in workers)
+        snapshot["free_slots"] = self._free.qsize()
+        return snapshot
+
+def _views(shm, shapes, in_size):
+    in_shape, out_shape = shapes
+    inputs = np.ndarray(in_shape, dtype=np.float32, buffer=shm.buf)
+    outputs = np.ndarray(out_shape, dtype=np.float64, buffer=shm.buf, offset=in_size)
+    return inputs, outputs
+
+def _worker(model, shm_name, shapes, in_size, tasks, results, max_batch_rows):
+    # Ctrl-C reaches the whole process group; the server stops workers through close()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    inputs, outputs = _views(shm, shapes, in_size)
+    while True:
+        try:
+            task = tasks.recv()
+        except EOFError:
+            return  # the server went away
+        if task is None:
+            return
+        batch, stop = [task], False
+        n_rows = task[1]
+        # Take whatever else is already in the pipe, so a burst costs one predict_proba
+        while n_rows < max_batch_rows and tasks.poll():
+            task = tasks.recv()
+            if task is None:
+                stop = True
+                break
+            batch.append(task)
+            n_rows += task[1]
+
+        slots = [slot for slot, _ in batch]
+        try:
+            if len(batch) == 1:
+                slot, n = batch[0]
+                outputs[slot, :n] = model.predict_proba(inputs[slot, :n])
+            else:
+                probabilities = model.predict_proba(np.concatenate([inputs[slot, :n] for slot, n in batch]))
+                offsets = itertools.accumulate([n for _, n in batch], initial=0)
+                for (slot, n), start in zip(batch, offsets):
+                    outputs[slot, :n] = probabilities[start:start + n]
+            results.send((slots, None))
+        except Exception as e:
+            results.send((slots, str(e)))
+        if stop:
+            return
@@ -0,0 +1,281 @@
+import argparse
+import io
+import json
+import math
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+import main
+
+# ---------------------------------------------------------
+# CONNECTION-LOG INGESTION
+# ---------------------------------------------------------
+# Classifies connection records from a file, a followed log or a Unix socket
+# (Zeek conn.log, NSL-KDD CSV or NDJSON), chunk by chunk, with the same
+# per-IP actions as /predict.
+
+FORMATS = ("auto", "zeek", "csv", "ndjson")
+
+# Zeek conn_state -> NSL-KDD flag
+ZEEK_FLAGS = {
+    "S0": "S0", "S1": "S1", "S2": "S2", "S3": "S3", "SF": "SF", "REJ": "REJ",
+    "RSTO": "RSTO", "RSTR": "RSTR", "RSTOS0": "RSTOS0", "RSTRH": "RSTR",
+    "SH": "SH", "SHR": "SH", "OTH": "OTH",
+}
+
+def detect_format(first_line):
+    if first_line.startswith("#"):
+        return "zeek"
+    if first_line.lstrip().startswith("{"):
+        return "ndjson"
+    return "csv"
+
+def _present(record):
+    return {k: v for k, v in record.items() if not (v is None or (isinstance(v, float) and math.isnan(v)))}
+
+class ChunkParser:
+    """Turns chunks of text lines into (records, ips, flows) for one stream."""
+
+    def __init__(self, fmt="auto", default_ip="0.0.0.0"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}")
+        self.fmt = fmt
+        self.default_ip = default_ip
+        self.columns = None  # zeek #fields or the csv header, once seen
+
+    def parse(self, lines):
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return [], [], None
+        if self.fmt == "auto":
+            self.fmt = detect_format(lines[0])
+
+        if self.fmt == "zeek":
+            return self._parse_zeek(lines)
+        if self.fmt == "csv":
+            if self.columns is None:
+                self.columns = [c.strip() for c in lines[0].rstrip("\n").split(",")]
+                lines = lines[1:]
+            if not lines:
+                return [], [], None
+            # Only an empty field is missing: "NA", "null" or "None" are values (a service name, say)
+            frame = pd.read_csv(io.StringIO("".join(lines)), names=self.columns, header=None,
+                                skipinitialspace=True, keep_default_na=False, na_values=[""])
+            frame = frame.drop(columns=["label"], errors="ignore")
+        else:
+            # Values as the JSON has them: no date parsing, no dtype guessing
+            frame = pd.read_json(io.StringIO("".join(lines)), lines=True, convert_dates=False, dtype=False)
+        return self._split_ips(frame) + (None,)
+
+    def _split_ips(self, frame):
+        if "ip" in frame.columns:
+            ips = frame.pop("ip").fillna(self.default_ip).astype(str).tolist()
+        else:
+            ips = [self.default_ip] * len(frame)
+        # The frame fills empty fields and keys a line doesn't have with NaN; the record just lacks them
+        return [_present(record) for record in frame.to_dict("records")], ips
+
+    def _parse_zeek(self, lines):
+        rows = []
+        for line in lines:
+            if line.startswith("#fields"):
+                self.columns = line.rstrip("\n").split("\t")[1:]
+            elif not line.startswith("#"):
+                rows.append(line)
+        if not rows:
+            return [], [], True
+        if self.columns is None:
+            raise ValueError("Zeek log has no #fields header")
+
+        raw = pd.read_csv(io.StringIO("".join(rows)), sep="\t", names=self.columns, header=None,
+                          na_values=["-", "(empty)"], keep_default_na=False, dtype=str)
+
+        def number(col):
+            if col not in raw:
+                return pd.Series(0, index=raw.index)
+            return pd.to_numeric(raw[col], errors="coerce").fillna(0)
+
+        orig_h, resp_h = raw["id.orig_h"].fillna(""), raw["id.resp_h"].fillna("")
+        frame = pd.DataFrame({
+            "duration": number("duration"),
+            "protocol_type": raw["proto"].fillna("other").str.lower(),
+            "service": raw["service"].fillna("other").str.split(",").str[0],
+            "flag": raw["conn_state"].map(ZEEK_FLAGS).fillna("OTH"),
+            "src_bytes": number("orig_bytes"),
+            "dst_bytes": number("resp_bytes"),
+            "land": ((orig_h == resp_h) & (raw["id.orig_p"] == raw["id.resp_p"])).astype(np.int8),
+            "src_port": number("id.orig_p").astype(np.int64),
+            "timestamp": number("ts"),
+        })
+        return frame.to_dict("records"), orig_h.replace("", self.default_ip).tolist(), True
+
+class Ingestor:
+    """Classifies parsed chunks and writes one NDJSON result per record."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.chunks = 0
+        self.failed_chunks = 0
+        self.threats = Counter()
+        self.started = time.perf_counter()
+
+    def run_chunk(self, parser, lines, out):
+        try:
+            records, ips, flows = parser.parse(lines)
+            if not records:
+                return
+            # A log line's own time places it in the flow windows; the log is trusted, a client isn't
+            timestamps = [r.pop("timestamp", None) for r in records] if flows else None
+            results = main.classify_records(records, ips, flows=flows, timestamps=timestamps)
+        except Exception as e:
+            # One bad chunk (malformed lines, a model error) doesn't stop the stream
+            with self._lock:
+                self.failed_chunks += 1
+            print(f"⚠️ Ingest chunk of {len(lines)} lines failed: {e}", file=sys.stderr)
+            return
+        if out is not None:
+            out.write("".join(json.dumps(r) + "\n" for r in results))
+            out.flush()
+        with self._lock:
+            self.rows += len(results)
+            self.chunks += 1
+            self.threats.update(r["threatType"] for r in results)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            threats = {str(k): v for k, v in self.threats.most_common()}
+            return (f"📊 {self.rows} records in {self.chunks} chunks ({self.failed_chunks} failed), "
+                    f"{elapsed:.1f}s ({self.rows / elapsed if elapsed else 0:.0f}/s): {threats}")
+
+def read_chunks(path, chunk_rows, follow=False, poll=0.2):
+    """Chunks of at most chunk_rows lines; with follow, keeps reading as the file grows or rotates."""
+    # Binary, so tell() works mid-iteration (truncation check below)
+    f = open(path, "rb")
+    pending = ""
+    try:
+        while True:
+            lines = [line.decode(errors="replace") for line in islice(f, chunk_rows)]
+            if lines:
+                # A line still being written has no newline yet: keep it for the next read
+                lines[0] = pending + lines[0]
+                pending = ""
+                if follow and not lines[-1].endswith("\n"):
+                    pending = lines.pop()
+                if lines:
+                    yield lines
+                if len(lines) == chunk_rows:
+                    continue
+            if not follow:
+                if pending:
+                    yield [pending]
+                return
+            time.sleep(poll)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # mid-rotation: the new file isn't there yet
+            if st.st_ino != os.fstat(f.fileno()).st_ino:
+                # Rotated: whatever reached the old file since the last read is still in it
+                lines = [line.decode(errors="replace") for line in f]
+                if pending:
+                    lines[:1] = [pending + (lines[0] if lines else "")]
+                    pending = ""
+                for start in range(0, len(lines), chunk_rows):
+                    yield lines[start:start + chunk_rows]
+            elif st.st_size < f.tell():
+                pending = ""  # truncated in place: that content is gone, start over
+            else:
+                continue
+            f.close()
+            f = open(path, "rb")
+    finally:
+        f.close()
+
+class SocketHandler(socketserver.BaseRequestHandler):
+    """One client stream. A chunk is classified when it is full or the client pauses."""
+
+    def handle(self):
+        server = self.server
+        parser = ChunkParser(server.fmt, server.default_ip)
+        out = self.request.makefile("w")
+        self.request.settimeout(server.flush_interval)
+        buffer, lines = b"", []
+        while True:
+            try:
+                data = self.request.recv(1 << 16)
+            except socket.timeout:
+                data = None
+            if data:
+                buffer += data
+                *complete, buffer = buffer.split(b"\n")
+                lines.extend(line.decode(errors="replace") + "\n" for line in complete)
+            if lines and (data is None or not data or len(lines) >= server.chunk_rows):
+                for start in range(0, len(lines), server.chunk_rows):
+                    server.ingestor.run_chunk(parser, lines[start:start + server.chunk_rows], out)
+                lines = []
+            if data == b"":
+                if buffer.strip():
+                    server.ingestor.run_chunk(parser, [buffer.decode(errors="replace") + "\n"], out)
+                return
+
+class IngestServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, ingestor, fmt, default_ip, chunk_rows, flush_interval):
+        self.ingestor = ingestor
+        self.fmt = fmt
+        self.default_ip = default_ip
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, SocketHandler)
+
+def cli():
+    parser = argparse.ArgumentParser(description="Classify connection logs without going through HTTP.")
+    parser.add_argument("path", nargs="?", help="log file to read")
+    parser.add_argument("--follow", action="store_true", help="keep reading as the file grows (tail -F)")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of reading a file")
+    parser.add_argument("--format", choices=FORMATS, default="auto")
+    parser.add_argument("--chunk-rows", type=int, default=4096)
+    parser.add_argument("--flush-ms", type=float, default=50, help="socket: classify a partial chunk after this pause")
+    parser.add_argument("--default-ip", default="0.0.0.0", help="ip for records that don't carry one")
+    parser.add_argument("--output", help="NDJSON results file (default: stdout; '-' for none)")
+    args = parser.parse_args()
+
+    if bool(args.path) == bool(args.socket):
+        parser.error("give either a log file or --socket")
+    main.start()
+    if main.SERVING.model is None:
+        print("⚠️ No model loaded", file=sys.stderr)
+        sys.exit(1)
+
+    ingestor = Ingestor()
+    try:
+        if args.socket:
+            with IngestServer(args.socket, ingestor, args.format, args.default_ip,
+                              args.chunk_rows, args.flush_ms / 1000) as server:
+                print(f"🚀 Ingesting from {args.socket}", file=sys.stderr)
+                server.serve_forever()
+        else:
+            out = sys.stdout if not args.output else None if args.output == "-" else open(args.output, "a")
+            chunk_parser = ChunkParser(args.format, args.default_ip)
+            for lines in read_chunks(args.path, args.chunk_rows, follow=args.follow):
+                ingestor.run_chunk(chunk_parser, lines, out)
+    except KeyboardInterrupt:
+        pass
+    print(ingestor.summary(), file=sys.stderr)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,13 @@
+# ---------------------------------------------------------
+# CLASS LABELS
+# ---------------------------------------------------------
+# The one list of labels that mean "no intrusion", compared lower-cased.
+# Training (preprocessing.labels), verdicts (ThresholdPolicy, the fast tier),
+# explanations and the per-IP actions in main.apply_verdict all go through
+# is_benign, so a label can't be benign in one place and an attack in
+# another. "0" covers datasets whose label column is already binary.
+
+BENIGN_LABELS = frozenset(("normal", "benign", "benign traffic", "0"))
+
+def is_benign(label):
+    return str(label).strip().lower() in BENIGN_LABELS
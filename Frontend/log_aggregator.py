@@ -0,0 +1,85 @@
+import threading
+import time
+
+# ---------------------------------------------------------
+# ON-CHAIN LOG AGGREGATOR
+# ---------------------------------------------------------
+# Buffers verdicts per ledger and flushes them as one /addLogs call, in
+# arrival order, so each ledger's hash chain is built as single writes would.
+
+class LogAggregator:
+    def __init__(self, flush_fn, dispatcher=None, max_batch=8, max_wait=0.25):
+        """
+        flush_fn(ledger, entries) sends one batch. If a dispatcher is given the
+        call is queued on it (keyed by ledger), otherwise it runs inline on the
+        aggregator's timer thread - handy for testing against a stand-in backend.
+        """
+        self.flush_fn = flush_fn
+        self.dispatcher = dispatcher
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._buffers = {}  # ledger -> (first_added_at, [entries])
+        self._stats = {"entries": 0, "batches": 0, "largest_batch": 0}
+        self._closed = threading.Event()
+        # Started by the first add(), so an aggregator that is never used costs no thread
+        self._timer = None
+
+    def add(self, payload):
+        """Buffers one {"ledger", "ipAddress", "threatType", "actionTaken"} verdict."""
+        ledger = payload["ledger"]
+        entry = {k: payload[k] for k in ("ipAddress", "threatType", "actionTaken")}
+        full = None
+        with self._lock:
+            if self._timer is None and not self._closed.is_set():
+                self._timer = threading.Thread(target=self._run, name="log-aggregator", daemon=True)
+                self._timer.start()
+            self._stats["entries"] += 1
+            started, entries = self._buffers.setdefault(ledger, (time.monotonic(), []))
+            entries.append(entry)
+            if len(entries) >= self.max_batch:
+                full = self._buffers.pop(ledger)[1]
+        if full:
+            self._send(ledger, full)
+
+    def _run(self):
+        tick = max(self.max_wait / 4, 0.005)
+        while not self._closed.wait(tick):
+            self.flush(older_than=self.max_wait)
+
+    def flush(self, older_than=0.0):
+        """Sends every buffered batch that has waited at least `older_than` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            due = [l for l, (started, _) in self._buffers.items() if now - started >= older_than]
+            batches = [(l, self._buffers.pop(l)[1]) for l in due]
+        for ledger, entries in batches:
+            self._send(ledger, entries)
+
+    def _send(self, ledger, entries):
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(entries))
+        if self.dispatcher is not None:
+            self.dispatcher.submit(self.flush_fn, ledger, entries, key=ledger)
+        else:
+            try:
+                self.flush_fn(ledger, entries)
+            except Exception as e:
+                print(f"Log Batch Error: {e}")
+
+    def close(self):
+        """Stops the timer and hands off whatever is still buffered."""
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join(timeout=1.0)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["buffered"] = sum(len(e) for _, e in self._buffers.values())
+            snapshot["ledgers"] = len(self._buffers)
+        snapshot["avg_batch"] = round(snapshot["entries"] / snapshot["batches"], 2) if snapshot["batches"] else 0
+        return snapshot
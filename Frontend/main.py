@@ -1,11 +1,31 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, request, jsonify, session, has_request_context
+import json
 import joblib
-import numpy as np
-import requests
 import random
 import os
+import atexit
+import threading
+import time
+from collections import namedtuple
 from solders.pubkey import Pubkey
 
+from dispatcher import Dispatcher
+from http_client import HttpClient
+from log_aggregator import LogAggregator
+from preprocessing import Preprocessor
+from forest import FlatForest
+from inference_pool import InferencePool
+from batcher import DynamicBatcher
+from labels import is_benign
+from threshold import ThresholdPolicy
+from explainer import Explainer
+from cascade import Cascade
+from model_registry import ModelRegistry
+from verdict_cache import VerdictCache
+from flow_window import FlowWindows
+from state_store import LedgerStore, make_ban_list
+from ban_middleware import BanMiddleware
+
 app = Flask(__name__)
 
 # ---------------------------------------------------------
@@ -18,19 +38,71 @@ HTTPSMS_API_KEY = os.environ.get("HTTPSMS_API_KEY", "your_api_key")
 SMS_FROM = os.environ.get("SMS_FROM", "+1234567890")
 SMS_TO = os.environ.get("SMS_TO", "+0987654321")
 
-USER_LEDGERS = {}
-BANNED_USERS = set()
+# Bounded, lock-sharded replacements for the old dict/set (see state_store.py).
+# BAN_BACKEND=sqlite shares bans between worker processes through BAN_DB_PATH.
+USER_LEDGERS = LedgerStore(max_entries=int(os.environ.get("MAX_LEDGERS", 100000)))
+BANNED_USERS = make_ban_list(
+    os.environ.get("BAN_BACKEND", "memory"),
+    path=os.environ.get("BAN_DB_PATH", "bans.db"),
+    ttl=float(os.environ.get("BAN_TTL", 3600)),
+    max_bans=int(os.environ.get("MAX_BANS", 100000)),
+)
+atexit.register(BANNED_USERS.close)
+
+# Banned sources get their 503 before Flask parses anything (see ban_middleware.py).
+# BANNED_CIDRS: comma-separated networks to refuse outright, e.g. "203.0.113.0/24,2001:db8::/32"
+BAN_GATE = BanMiddleware(
+    app.wsgi_app, BANNED_USERS,
+    cidrs=[c for c in os.environ.get("BANNED_CIDRS", "").split(",") if c.strip()],
+)
+app.wsgi_app = BAN_GATE
 
 PROGRAM_ID = Pubkey.from_string("J3zRkAgCWjpXnKUr6teTdS2nLTGA3ZhEUi6gBvi5ZhdY")
-BACKEND_URL = "https://laptop.aditya.stream"
+BACKEND_URL = os.environ.get("BACKEND_URL", "https://laptop.aditya.stream")
 MODEL_PATH = "best_intrusion_model.pkl"
+# Flattened copy of the forest (see forest.py); preferred over the pickle when present
+FOREST_PATH = os.environ.get("FOREST_PATH", "forest")
+# Distilled fast tier + its band, exported by model/train.py (see cascade.py); CASCADE=off ignores it
+FAST_PATH = os.environ.get("FAST_PATH", "fast")
+CASCADE_ENABLED = os.environ.get("CASCADE", "on") != "off"
+# Decision threshold picked by the notebook (see threshold.py); edits apply without a restart
+THRESHOLD_PATH = os.environ.get("THRESHOLD_PATH", "threshold_config.json")
+# Encoder vocabularies + scaler exported by the notebook's deployment cell
+PREPROCESSING_PATH = os.environ.get("PREPROCESSING_PATH", "preprocessing.json")
+MAX_BATCH_RECORDS = int(os.environ.get("MAX_BATCH_RECORDS", 10000))
+
+# Outbound ledger/SMS calls run on a background worker pool (see dispatcher.py).
+# Its threads start on first use, so asgi.py (which has its own) never starts them.
+DISPATCHER = Dispatcher(
+    workers=int(os.environ.get("DISPATCH_WORKERS", 4)),
+    max_queue=int(os.environ.get("DISPATCH_QUEUE_SIZE", 1000)),
+    policy=os.environ.get("DISPATCH_POLICY", "drop_oldest"),
+    block_timeout=float(os.environ.get("DISPATCH_BLOCK_TIMEOUT", 1.0)),
+)
+atexit.register(DISPATCHER.shutdown)
+
+# Keep-alive connection pool shared by every outbound call (see http_client.py)
+HTTP = HttpClient(timeouts={
+    "createLedger": float(os.environ.get("TIMEOUT_CREATE_LEDGER", 10)),
+    "addLog": float(os.environ.get("TIMEOUT_ADD_LOG", 5)),
+    "sms": float(os.environ.get("TIMEOUT_SMS", 5)),
+})
+
+# Verdicts for repeated feature vectors (see verdict_cache.py); cleared when the model files change
+VERDICT_CACHE = VerdictCache(
+    max_entries=int(os.environ.get("VERDICT_CACHE_SIZE", 100000)),
+    ttl=float(os.environ.get("VERDICT_CACHE_TTL", 60)),
+    decimals=int(os.environ.get("VERDICT_CACHE_DECIMALS", 4)),
+    watch_paths=[MODEL_PATH, FOREST_PATH, THRESHOLD_PATH, FAST_PATH, PREPROCESSING_PATH],
+)
 
-try:
-    model = joblib.load(MODEL_PATH)
-    print(f"✅ Model loaded from {MODEL_PATH}")
-except Exception as e:
-    print(f"⚠️ Error loading model: {e}")
-    model = None
+# Explanations for repeated feature vectors, same keying as VERDICT_CACHE
+EXPLANATION_CACHE = VerdictCache(
+    max_entries=int(os.environ.get("EXPLAIN_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("EXPLAIN_CACHE_TTL", 300)),
+    decimals=int(os.environ.get("VERDICT_CACHE_DECIMALS", 4)),
+    watch_paths=[MODEL_PATH, FOREST_PATH, PREPROCESSING_PATH],
+)
 
 FEATURES = [
     "duration","protocol_type","service","flag","src_bytes","dst_bytes","land",
@@ -44,42 +116,274 @@ FEATURES = [
     "dst_host_srv_serror_rate","dst_host_rerror_rate","dst_host_srv_rerror_rate"
 ]
 
-def preprocess_input(data):
-    vector = []
-    for f in FEATURES:
-        if f not in data:
-            # In production, handle missing fields gracefully (e.g., default to 0)
-            vector.append(0) 
-        else:
-            vector.append(data[f])
-    return np.array(vector).reshape(1, -1)
+def load_model():
+    """
+    The model, with the preprocessing schema model/train.py exported next to
+    it (see preprocessing.py) as model.preprocessor. The registry swaps one
+    object, so the schema rides on the model: a model is never served with
+    another model's vocabularies or scaler.
+    """
+    if os.path.isdir(FOREST_PATH):
+        # mmap'd arrays: no unpickling, and forked workers share the pages
+        model = FlatForest.load(FOREST_PATH)
+        print(f"✅ Flat forest mapped from {FOREST_PATH}")
+    else:
+        model = joblib.load(MODEL_PATH)
+        print(f"✅ Model loaded from {MODEL_PATH}")
+    model.preprocessor = Preprocessor.from_file(PREPROCESSING_PATH, FEATURES)
+    return model
+
+# INFERENCE_PROCESSES > 0 moves model calls into worker processes started
+# from a forkserver (see inference_pool.py); a flat forest is mapped, not
+# copied, by each of them. The first pool starts in start(), with the first
+# model; each hot-swap starts a new one, and dead workers are replaced.
+INFERENCE_PROCESSES = int(os.environ.get("INFERENCE_PROCESSES", 0))
+
+def start_pool(model):
+    return InferencePool(
+        model, len(FEATURES),
+        workers=INFERENCE_PROCESSES,
+        slots=int(os.environ.get("INFERENCE_SLOTS", 256)),
+        slot_rows=int(os.environ.get("INFERENCE_SLOT_ROWS", 64)),
+        max_batch_rows=int(os.environ.get("INFERENCE_MAX_BATCH_ROWS", 1024)),
+        timeout=float(os.environ.get("INFERENCE_TIMEOUT", 5)),
+    )
+
+# ?explain=1 (or =threats: non-benign verdicts only) adds the top EXPLAIN_TOP_K
+# feature contributions to a verdict (see explainer.py). EXPLAIN_METHOD=off
+# skips building the explainer.
+EXPLAIN_METHOD = os.environ.get("EXPLAIN_METHOD", "auto")
+EXPLAIN_TOP_K = int(os.environ.get("EXPLAIN_TOP_K", 5))
+
+def build_explainer(model):
+    if EXPLAIN_METHOD == "off":
+        return None
+    try:
+        return Explainer(model, model.preprocessor.features, top_k=EXPLAIN_TOP_K, method=EXPLAIN_METHOD)
+    except Exception as e:
+        print(f"⚠️ Explanations unavailable for this model: {e}")
+        return None
+
+def load_cascade(model):
+    if not CASCADE_ENABLED:
+        return None
+    try:
+        cascade = Cascade.load(FAST_PATH, model.classes_)
+    except Exception as e:
+        print(f"⚠️ Fast tier not loaded, every row goes to the full model: {e}")
+        return None
+    if cascade is not None:
+        print(f"✅ Fast tier mapped from {FAST_PATH} (band {cascade.low}..{cascade.high})")
+    return cascade
+
+# Everything predict() needs from one model generation, swapped as a single
+# reference. A request takes SERVING once and uses that generation throughout:
+# its vectorizer builds the rows, its model (through the batcher's context)
+# and explainer read them.
+Serving = namedtuple("Serving", "model vectorizer pool thresholds explainer cascade generation")
+SERVING = Serving(None, None, None, None, None, None, None)
+
+def serve(model):
+    """on_swap callback: builds the new generation's vectorizer, pool, thresholds, explainer and fast tier, then swaps them in."""
+    global SERVING
+    pool = start_pool(model) if INFERENCE_PROCESSES > 0 else None
+    previous = SERVING
+    generation = (previous.generation or 0) + 1
+    serving = Serving(model, model.preprocessor.vectorizer(), pool, ThresholdPolicy(model.classes_, THRESHOLD_PATH),
+                      build_explainer(model), load_cascade(model), generation)
+    # Caches before the swap: from here on, batches still running on `previous` can't write to them
+    VERDICT_CACHE.invalidate(generation)
+    EXPLANATION_CACHE.invalidate(generation)
+    SERVING = serving
+    if previous.pool is not None:
+        # Calls already inside the old pool get up to their timeout to finish
+        retire = threading.Timer(previous.pool.timeout, previous.pool.close)
+        retire.daemon = True
+        retire.start()
+
+def shadow_inputs(live, candidate, rows):
+    """Rows the live model was given, re-encoded with the candidate's own schema when it differs."""
+    if live.preprocessor.schema() == candidate.preprocessor.schema():
+        return rows
+    return candidate.preprocessor.transform(live.preprocessor.decode(rows))
+
+# Watches the model files and swaps in new ones without a restart (see model_registry.py).
+# SHADOW_FRACTION > 0 first runs a new model on that share of traffic.
+REGISTRY = ModelRegistry(
+    load_model, [FOREST_PATH, MODEL_PATH, FAST_PATH, PREPROCESSING_PATH], len(FEATURES),
+    check_interval=float(os.environ.get("MODEL_CHECK_INTERVAL", 5)),
+    shadow_fraction=float(os.environ.get("SHADOW_FRACTION", 0)),
+    shadow_rows=int(os.environ.get("SHADOW_ROWS", 5000)),
+    min_agreement=float(os.environ.get("SHADOW_MIN_AGREEMENT", 0)),
+    threshold_path=THRESHOLD_PATH,
+    translate=shadow_inputs,
+)
+REGISTRY.on_swap(serve)
+atexit.register(lambda: SERVING.pool and SERVING.pool.close())
+atexit.register(REGISTRY.close)
 
-def get_or_create_ledger(ip_address):
-    if ip_address in USER_LEDGERS:
-        return USER_LEDGERS[ip_address]
+_start_lock = threading.Lock()
+_started = False
 
+def start():
+    """
+    Loads the first model (starting its inference pool) and starts the model
+    watcher. Importing main only builds objects: every other background
+    thread (dispatcher, log aggregator, batchers, ban expiry) starts on first
+    use. The entry points call this once: __main__ below, wsgi.py, asgi.py's
+    lifespan and ingest.py.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        REGISTRY.load_initial()
+        REGISTRY.start()
+
+def run_full_model(serving, rows):
+    """(threat_type, score) per row from the generation's full model."""
+    start = time.perf_counter()
+    proba = (serving.pool or serving.model).predict_proba(rows)
+    seconds = time.perf_counter() - start
+    decisions = serving.thresholds.decide(proba)
+    REGISTRY.observe(serving.model, rows, decisions, seconds)
+    return decisions
+
+def run_model(rows, serving):
+    """(threat_type, score, tier) per row from `serving`: the fast tier first, if there is one."""
+    if serving.cascade is not None:
+        return serving.cascade.decide(rows, lambda escalated: run_full_model(serving, escalated))
+    return [(threat_type, score, "full") for threat_type, score in run_full_model(serving, rows)]
+
+# Single-record requests are merged into one model call (see batcher.py).
+# BATCH_MAX_WAIT_MS=0 turns it off. BATCH_CONCURRENCY batches run at once;
+# by default one per inference process, so every worker gets work.
+BATCHER = DynamicBatcher(
+    run_model,
+    max_rows=int(os.environ.get("BATCH_MAX_ROWS", 32)),
+    max_wait=float(os.environ.get("BATCH_MAX_WAIT_MS", 2)) / 1000,
+    concurrency=int(os.environ.get("BATCH_CONCURRENCY", max(1, INFERENCE_PROCESSES))),
+)
+atexit.register(BATCHER.close)
+
+def run_explainer(rows, serving):
+    explainer = serving.explainer
+    if explainer is None:
+        return [None] * len(rows)
+    return explainer.explain(rows)
+
+# Explanation requests arriving together share one explain() call
+EXPLAIN_BATCHER = DynamicBatcher(
+    run_explainer,
+    max_rows=int(os.environ.get("EXPLAIN_BATCH_MAX_ROWS", 64)),
+    max_wait=float(os.environ.get("EXPLAIN_BATCH_MAX_WAIT_MS", 2)) / 1000,
+    name="explain-batcher",
+)
+atexit.register(EXPLAIN_BATCHER.close)
+
+# FLOW_FEATURES=server: count/rate features come from the server's own view of
+# each IP's recent connections (see flow_window.py); "client" trusts the record.
+FLOW_FEATURES = os.environ.get("FLOW_FEATURES", "client")
+if FLOW_FEATURES not in ("client", "server"):
+    raise ValueError(f"Unknown FLOW_FEATURES '{FLOW_FEATURES}', expected 'client' or 'server'")
+FLOWS = FlowWindows(
+    window_seconds=float(os.environ.get("FLOW_WINDOW_SECONDS", 2)),
+    window_conns=int(os.environ.get("FLOW_WINDOW_CONNS", 100)),
+    max_events=int(os.environ.get("FLOW_MAX_EVENTS", 100000)),
+)
+
+def preprocess_input(data, ip_address=None, serving=None):
+    if ip_address is not None and FLOW_FEATURES == "server":
+        data = FLOWS.enrich(ip_address, data)
+    return (serving or SERVING).vectorizer.transform(data)
+
+def preprocess_batch(records, ips=None, flows=None, serving=None, timestamps=None):
+    """
+    One contiguous float32 matrix (n_records x 41) for a single model call.
+    flows=True derives the window features whatever FLOW_FEATURES says
+    (ingest.py does this for raw connection logs, which don't carry them).
+    timestamps are the connections' own times, from a log the caller trusts;
+    without them each connection is placed at the time it's seen.
+    """
+    if flows is None:
+        flows = FLOW_FEATURES == "server"
+    if ips is not None and flows:
+        if timestamps is None:
+            timestamps = [None] * len(records)
+        records = [FLOWS.enrich(ip, record, ts) for ip, record, ts in zip(ips, records, timestamps)]
+    return (serving or SERVING).vectorizer.transform_batch(records)
+
+def classify(features, serving=None):
+    """
+    One (threat_type, score, tier) per feature row from `serving` (the live
+    generation by default), which must be the one whose vectorizer built the
+    rows. Repeated rows are answered from VERDICT_CACHE.
+    """
+    serving = serving or SERVING
+    return VERDICT_CACHE.predict(lambda rows: BATCHER.predict(rows, serving), features, serving.generation)
+
+def explain_mode(value):
+    """?explain= value -> "all", "threats" or None."""
+    value = (value or "").lower()
+    if value in ("1", "true", "yes", "all"):
+        return "all"
+    return "threats" if value == "threats" else None
+
+def explain(features, threats, mode, serving=None):
+    """Explanation per row of `features` that `mode` asks for, else None; one cached, batched call."""
+    serving = serving or SERVING
+    wanted = [i for i, (threat_type, _, _) in enumerate(threats)
+              if mode == "all" or (mode == "threats" and not is_benign(threat_type))]
+    explanations = [None] * len(threats)
+    if wanted:
+        explained = EXPLANATION_CACHE.predict(lambda rows: EXPLAIN_BATCHER.predict(rows, serving), features[wanted],
+                                              serving.generation)
+        for i, explanation in zip(wanted, explained):
+            explanations[i] = explanation
+    return explanations
+
+def get_or_create_ledger(ip_address, outbound=None):
+    outbound = outbound or OUTBOUND
+    return USER_LEDGERS.get_or_create(ip_address, lambda: new_ledger(outbound))
+
+def new_ledger(outbound):
     seed_int = random.randint(1, 65535)
     seed_bytes = seed_int.to_bytes(2, 'little')
     ledger_pda, _ = Pubkey.find_program_address([b"state", seed_bytes], PROGRAM_ID)
-    
+
+    # Keyed by PDA so the ledger is created before any of its logs are sent
+    outbound.create_ledger(seed_int, str(ledger_pda))
+
+    return {"pda": str(ledger_pda), "seed": seed_int}
+
+def create_ledger_on_chain(seed_int):
     try:
         payload = {"seed": str(seed_int)}
-        requests.post(f"{BACKEND_URL}/createLedger", json=payload, timeout=5)
+        HTTP.post(f"{BACKEND_URL}/createLedger", endpoint="createLedger", json=payload)
     except Exception:
         pass
 
-    ledger_data = {"pda": str(ledger_pda), "seed": seed_int}
-    USER_LEDGERS[ip_address] = ledger_data
-    return ledger_data
-
-def post_result_to_external_api(payload):
+def post_results_to_external_api(ledger, entries):
     try:
-        requests.post(f"{BACKEND_URL}/addLog", json=payload, timeout=5)
+        HTTP.post(f"{BACKEND_URL}/addLogs", endpoint="addLog", json={"ledger": ledger, "logs": entries})
     except Exception as e:
         print(f"Log Error: {e}")
 
-def send_sms_alert(ip, threat_type):
-    url = "https://api.httpsms.com"
+# Verdicts are coalesced per ledger into multi-log transactions (see log_aggregator.py).
+# Registered after the dispatcher, so atexit hands off the last batches before the drain.
+LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", 8))
+LOG_BATCH_WAIT = float(os.environ.get("LOG_BATCH_WAIT_MS", 250)) / 1000
+LOG_AGGREGATOR = LogAggregator(
+    post_results_to_external_api,
+    dispatcher=DISPATCHER,
+    max_batch=LOG_BATCH_SIZE,
+    max_wait=LOG_BATCH_WAIT,
+)
+atexit.register(LOG_AGGREGATOR.close)
+
+def sms_request(ip, threat_type):
+    """(url, payload, headers) for one httpSMS alert."""
     payload = {
         "from": SMS_FROM,
         "to": SMS_TO,
@@ -87,84 +391,216 @@ def send_sms_alert(ip, threat_type):
         "encrypted": False
     }
     headers = {"x-api-key": HTTPSMS_API_KEY, "Content-Type": "application/json"}
+    return "https://api.httpsms.com", payload, headers
+
+def send_sms_alert(ip, threat_type):
+    url, payload, headers = sms_request(ip, threat_type)
     try:
-        requests.post(url, json=payload, headers=headers, timeout=5)
+        HTTP.post(url, endpoint="sms", json=payload, headers=headers)
         print(f"📲 SMS Alert Sent to {SMS_TO}")
     except Exception:
         pass
 
+class Outbound:
+    """
+    Where a verdict's side effects go. This server queues them on the
+    dispatcher threads; asgi.py passes an async implementation instead.
+    """
+
+    def create_ledger(self, seed_int, ledger_pda):
+        # Essential: dropping it would make every queued and later addLog of this ledger fail on-chain
+        DISPATCHER.submit(create_ledger_on_chain, seed_int, key=ledger_pda, essential=True)
+
+    def add_log(self, payload):
+        LOG_AGGREGATOR.add(payload)
+
+    def sms(self, ip, threat_type):
+        DISPATCHER.submit(send_sms_alert, ip, threat_type)
+
+OUTBOUND = Outbound()
+
+def apply_verdict(ip_address, threat_type, outbound=None):
+    """Runs the per-IP side effects for one verdict and returns (response_body, status)."""
+    outbound = outbound or OUTBOUND
+    # Solana Logging
+    ledger_info = get_or_create_ledger(ip_address, outbound)
+    if not is_benign(threat_type):
+        outbound.add_log({
+            "ledger": ledger_info["pda"],
+            "ipAddress": ip_address,
+            "threatType": threat_type,
+            "actionTaken": "Blocked/Alerted"
+        })
+
+    # -------------------------------------------------
+    # ACTION HANDLERS
+    # -------------------------------------------------
+
+    # 1. U2R (User to Root) -> TERMINATE SESSION
+    if threat_type == "U2R":
+        if has_request_context():
+            session.clear()  # Wipes server-side session data (asgi.py expires the cookie itself)
+        return {
+            "message": "CRITICAL SECURITY ALERT: SESSION TERMINATED",
+            "action": "logout_force" # Frontend should look for this and redirect to login
+        }, 403
+
+    # 2. R2L (Remote to Local) -> RELOAD PAGE
+    elif threat_type == "R2L":
+        # We return a 401 with a specific instruction
+        return {
+            "message": "UNAUTHORIZED REQUEST",
+            "action": "reload_page" # Frontend should look for this and trigger location.reload()
+        }, 401
+
+    # 3. DOS (Denial of Service) -> BAN IP
+    elif threat_type == "DOS":
+        if ip_address:
+            BANNED_USERS.add(ip_address)
+        return {"message": "SERVICE UNAVAILABLE"}, 503
+
+    # 4. PROBE -> SMS ALERT
+    elif threat_type == "PROBE":
+        outbound.sms(ip_address, threat_type)
+        return {"message": "PROBE DETECTED: ADMIN NOTIFIED"}, 406
+
+    # 5. NORMAL TRAFFIC
+    return {
+        "ledger": ledger_info["pda"],
+        "ipAddress": ip_address,
+        "threatType": "Benign Traffic",
+        "status": "Allowed"
+    }, 200
+
 @app.route("/predict", methods=["POST"])
 def predict():
-    if not model:
+    serving = SERVING
+    if serving.model is None:
         return jsonify({"error": "Model not loaded"}), 500
 
     try:
         body = request.get_json()
         ip_address = request.headers.get("ip", request.remote_addr)
+        if not ip_address:
+            # e.g. a Unix-socket WSGI server: no address to ban or keep a ledger for
+            return jsonify({"error": "No source address"}), 400
 
-        # DOS Logic: Early Rejection
+        # DOS Logic: Early Rejection (BAN_GATE normally answers these before Flask)
         if ip_address in BANNED_USERS:
              return jsonify({"message": "SERVICE UNAVAILABLE"}), 503
 
-        features = preprocess_input(body)
-        prediction_output = model.predict(features)
-        
-        # Normalize threat type string
-        raw_threat = prediction_output[0][0] if isinstance(prediction_output[0], (list, np.ndarray)) else prediction_output[0]
-        threat_type = str(raw_threat)
-
-        # Solana Logging
-        ledger_info = get_or_create_ledger(ip_address)
-        if threat_type not in ["normal", "benign", "Benign Traffic"]:
-            post_result_to_external_api({
-                "ledger": ledger_info["pda"],
-                "ipAddress": ip_address,
-                "threatType": threat_type,
-                "actionTaken": "Blocked/Alerted"
-            })
-
-        # -------------------------------------------------
-        # ACTION HANDLERS
-        # -------------------------------------------------
-
-        # 1. U2R (User to Root) -> TERMINATE SESSION
-        if threat_type == "U2R":
-            session.clear()  # Wipes server-side session data
-            return jsonify({
-                "message": "CRITICAL SECURITY ALERT: SESSION TERMINATED",
-                "action": "logout_force" # Frontend should look for this and redirect to login
-            }), 403
-
-        # 2. R2L (Remote to Local) -> RELOAD PAGE
-        elif threat_type == "R2L":
-            # We return a 401 with a specific instruction
-            return jsonify({
-                "message": "UNAUTHORIZED REQUEST",
-                "action": "reload_page" # Frontend should look for this and trigger location.reload()
-            }), 401
-
-        # 3. DOS (Denial of Service) -> BAN IP
-        elif threat_type == "DOS":
-            if ip_address:
-                BANNED_USERS.add(ip_address)
-            return jsonify({"message": "SERVICE UNAVAILABLE"}), 503
-
-        # 4. PROBE -> SMS ALERT
-        elif threat_type == "PROBE":
-            send_sms_alert(ip_address, threat_type)
-            return jsonify({"message": "PROBE DETECTED: ADMIN NOTIFIED"}), 406
-
-        # 5. NORMAL TRAFFIC
-        return jsonify({
-            "ledger": ledger_info["pda"],
-            "ipAddress": ip_address,
-            "threatType": "Benign Traffic",
-            "status": "Allowed"
-        }), 200
+        features = preprocess_input(body, ip_address, serving)
+        threats = classify(features, serving)
+        threat_type, score, tier = threats[0]
+        mode = explain_mode(request.args.get("explain"))
+        explanation = explain(features, threats, mode, serving)[0] if mode else None
+
+        response_body, status = apply_verdict(ip_address, threat_type)
+        response_body = {**response_body, "score": score, "tier": tier}
+        if mode:
+            response_body["explanation"] = explanation
+        return jsonify(response_body), status
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+def classify_records(records, ips, flows=None, explain_as=None, timestamps=None):
+    """
+    One result per record, in order: {"ipAddress", "threatType", "score", "tier", "code", ...}.
+    Runs the same per-IP actions as /predict, with a single model call.
+    explain_as ("all"/"threats") adds an "explanation" to each result.
+    timestamps (ingest only) place each record in the flow windows.
+    """
+    # Banned sources are answered without spending inference on them
+    live = [i for i, ip in enumerate(ips) if ip not in BANNED_USERS]
+    threats, explanations = {}, {}
+    if live:
+        serving = SERVING
+        features = preprocess_batch([records[i] for i in live], [ips[i] for i in live], flows=flows, serving=serving,
+                                    timestamps=None if timestamps is None else [timestamps[i] for i in live])
+        verdicts = classify(features, serving)
+        threats = dict(zip(live, verdicts))
+        if explain_as:
+            explanations = dict(zip(live, explain(features, verdicts, explain_as, serving)))
+
+    results = []
+    for i, ip_address in enumerate(ips):
+        if i in threats and ip_address not in BANNED_USERS:
+            threat_type, score, tier = threats[i]
+            response_body, status = apply_verdict(ip_address, threat_type)
+        else:
+            # Banned before this batch, or by a DOS verdict earlier in it
+            threat_type, score, tier = None, None, None
+            response_body, status = {"message": "SERVICE UNAVAILABLE"}, 503
+        result = {"ipAddress": ip_address, "threatType": threat_type, "score": score, "tier": tier,
+                  "code": status, **response_body}
+        if explain_as:
+            result["explanation"] = explanations.get(i)
+        results.append(result)
+    return results
+
+def read_batch_records():
+    """Accepts a JSON list, {"records": [...]}, or NDJSON (one record per line)."""
+    if request.mimetype == "application/x-ndjson":
+        return [json.loads(line) for line in request.get_data().splitlines() if line.strip()]
+    body = request.get_json()
+    return body["records"] if isinstance(body, dict) else body
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    Classifies many flow records with one vectorized model call.
+    Each record may carry its own "ip"; otherwise the request's ip header is used.
+    Results are returned in input order, as JSON or NDJSON to match the request.
+    """
+    if SERVING.model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    try:
+        records = read_batch_records()
+        if not isinstance(records, list):
+            return jsonify({"error": "Expected a list of records"}), 400
+        if len(records) > MAX_BATCH_RECORDS:
+            return jsonify({"error": f"Batch exceeds {MAX_BATCH_RECORDS} records"}), 413
+
+        default_ip = request.headers.get("ip", request.remote_addr)
+        ips = [record.get("ip", default_ip) for record in records]
+        if not all(ips):
+            return jsonify({"error": "Every record needs a source address (ip)"}), 400
+        results = classify_records(records, ips, explain_as=explain_mode(request.args.get("explain")))
 
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+    if request.mimetype == "application/x-ndjson":
+        return Response((json.dumps(r) + "\n" for r in results), mimetype="application/x-ndjson")
+    return jsonify({"count": len(results), "results": results}), 200
+
+def collect_metrics():
+    return {
+        "dispatcher": DISPATCHER.stats(),
+        "http": HTTP.stats(),
+        "log_batches": LOG_AGGREGATOR.stats(),
+        "verdict_cache": VERDICT_CACHE.stats(),
+        "ledgers": USER_LEDGERS.stats(),
+        "bans": BANNED_USERS.stats(),
+        "ban_gate": BAN_GATE.stats(),
+        "batcher": BATCHER.stats(),
+        "model": REGISTRY.stats(),
+        "flows": FLOWS.stats() if FLOW_FEATURES == "server" else None,
+        "thresholds": SERVING.thresholds.stats() if SERVING.thresholds else None,
+        "model_pool": SERVING.pool.stats() if SERVING.pool else None,
+        "explainer": SERVING.explainer.stats() if SERVING.explainer else None,
+        "cascade": SERVING.cascade.stats() if SERVING.cascade else None,
+        "explain_batcher": EXPLAIN_BATCHER.stats(),
+        "explanation_cache": EXPLANATION_CACHE.stats(),
+    }
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify(collect_metrics()), 200
+
 if __name__ == "__main__":
+    start()
     print("🚀 Security ML API Active...")
     app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,240 @@
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+from threshold import ThresholdPolicy
+
+# ---------------------------------------------------------
+# MODEL REGISTRY
+# ---------------------------------------------------------
+# Owns the live model and swaps in a changed artifact without a restart, after
+# a warm-up and, with shadow_fraction > 0, an agreement check on live traffic.
+
+class ModelRegistry:
+    def __init__(self, loader, watch_paths, n_features, check_interval=5.0, warmup_rows=256,
+                 shadow_fraction=0.0, shadow_rows=5000, min_agreement=0.0, shadow_queue=64,
+                 threshold_path=None, translate=None):
+        self.loader = loader
+        self.watch_paths = [p for p in watch_paths if p]
+        self.n_features = n_features
+        self.check_interval = check_interval
+        self.warmup_rows = warmup_rows
+        self.shadow_fraction = shadow_fraction
+        self.shadow_rows = shadow_rows
+        self.min_agreement = min_agreement
+        self.threshold_path = threshold_path
+        # translate(live_model, candidate, rows): the live model's rows as the candidate's input
+        self.translate = translate or (lambda live, candidate, rows: rows)
+
+        self.active = None
+        self.generation = 0
+        self._on_swap = []
+        self._lock = threading.Lock()
+        self._signature = None
+        self._seen = None  # last signature observed, promoted or not
+        self._closed = threading.Event()
+        self._watcher = None
+
+        self._candidate = None
+        self._samples = queue.Queue(maxsize=shadow_queue)
+        self._shadow_thread = None
+        self._shadow = None
+        self._stats = {"loads": 0, "failures": 0, "promotions": 0, "rejections": 0,
+                       "last_error": None, "warmup_ms": None, "loaded_at": None}
+
+    def on_swap(self, callback):
+        """callback(new_model) runs before the new model becomes `active`."""
+        self._on_swap.append(callback)
+
+    def _file_signature(self):
+        signature = []
+        for path in self.watch_paths:
+            # A directory (flat forest) changes when any file in it does
+            try:
+                files = [os.path.join(path, f) for f in sorted(os.listdir(path))]
+            except OSError:
+                files = [path]
+            for f in files:
+                try:
+                    st = os.stat(f)
+                    signature.append((f, st.st_size, st.st_mtime_ns))
+                except OSError:
+                    pass
+        return tuple(signature)
+
+    def load_initial(self):
+        """Loads and promotes the current artifacts in the calling thread."""
+        signature = self._file_signature()
+        self._seen = signature
+        candidate = self._load(signature)
+        if candidate is not None:
+            self._promote(candidate, signature)
+        else:
+            self._signature = signature
+        return self.active
+
+    def start(self):
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while not self._closed.wait(self.check_interval):
+            signature = self._file_signature()
+            if signature == self._signature or not signature:
+                self._seen = signature
+                continue
+            if signature != self._seen:
+                self._seen = signature  # changed since the last look: let it settle
+                continue
+            if self._candidate is not None and self._candidate[1] == signature:
+                continue  # already in shadow
+            candidate = self._load(signature)
+            if candidate is None:
+                self._signature = signature  # don't retry until the files change again
+            elif self.shadow_fraction > 0 and self.active is not None:
+                self._start_shadow(candidate, signature)
+            else:
+                self._promote(candidate, signature)
+
+    def _load(self, signature):
+        try:
+            start = time.perf_counter()
+            model = self.loader()
+            self._warm_up(model)
+            with self._lock:
+                self._stats["loads"] += 1
+                self._stats["warmup_ms"] = round((time.perf_counter() - start) * 1e3, 2)
+            return model
+        except Exception as e:
+            with self._lock:
+                self._stats["failures"] += 1
+                self._stats["last_error"] = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Error loading model: {e}")
+            return None
+
+    def _warm_up(self, model):
+        """Runs a synthetic batch through the model and checks the output shape."""
+        rng = np.random.default_rng(0)
+        rows = rng.standard_normal((self.warmup_rows, self.n_features)).astype(np.float32)
+        rows[0] = 0
+        n_features = getattr(model, "n_features_in_", self.n_features)
+        if n_features != self.n_features:
+            raise ValueError(f"model expects {n_features} features, server sends {self.n_features}")
+        proba = np.asarray(model.predict_proba(rows))
+        if proba.shape != (self.warmup_rows, len(model.classes_)) or not np.isfinite(proba).all():
+            raise ValueError(f"warm-up predict_proba returned shape {proba.shape} or non-finite values")
+
+    def _promote(self, model, signature):
+        for callback in self._on_swap:
+            callback(model)
+        with self._lock:
+            self.active = model
+            self.generation += 1
+            self._signature = signature
+            self._stats["promotions"] += 1
+            self._stats["loaded_at"] = time.time()
+        print(f"✅ Model generation {self.generation} is live")
+
+    def _start_shadow(self, model, signature):
+        policy = ThresholdPolicy(model.classes_, self.threshold_path)
+        with self._lock:
+            self._candidate = (model, signature, policy)
+            self._shadow = {"rows": 0, "agree": 0, "live_s": 0.0, "shadow_s": 0.0, "dropped": 0,
+                            "generation": self.generation + 1}
+        if self._shadow_thread is None:
+            self._shadow_thread = threading.Thread(target=self._run_shadow, name="model-shadow", daemon=True)
+            self._shadow_thread.start()
+        print(f"🔍 Model candidate loaded, shadowing {self.shadow_fraction:.1%} of traffic")
+
+    def observe(self, model, rows, decisions, seconds):
+        """
+        Offers one live batch to the shadow candidate, if any. Never blocks.
+        decisions are the (threat_type, score) pairs served for `rows`.
+        """
+        if self._candidate is None or random.random() >= self.shadow_fraction:
+            return
+        try:
+            self._samples.put_nowait((model, np.array(rows, copy=True), decisions, seconds))
+        except queue.Full:
+            with self._lock:
+                if self._shadow is not None:
+                    self._shadow["dropped"] += 1
+
+    def _run_shadow(self):
+        while not self._closed.is_set():
+            try:
+                live_model, rows, live_decisions, live_seconds = self._samples.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            candidate = self._candidate
+            if candidate is None or live_model is not self.active:
+                continue
+            model, signature, policy = candidate
+            try:
+                inputs = self.translate(live_model, model, rows)
+                start = time.perf_counter()
+                proba = model.predict_proba(inputs)
+                seconds = time.perf_counter() - start
+                decisions = policy.decide(proba)
+            except Exception as e:
+                self._finish_shadow(candidate, False, f"shadow predict failed: {e}")
+                continue
+
+            agree = sum(live[0] == mine[0] for live, mine in zip(live_decisions, decisions))
+            with self._lock:
+                shadow = self._shadow
+                shadow["rows"] += len(rows)
+                shadow["agree"] += agree
+                shadow["live_s"] += live_seconds
+                shadow["shadow_s"] += seconds
+                done = shadow["rows"] >= self.shadow_rows
+                agreement = shadow["agree"] / shadow["rows"]
+            if done:
+                self._finish_shadow(candidate, agreement >= self.min_agreement,
+                                    f"agreement {agreement:.4f} below {self.min_agreement}")
+
+    def _finish_shadow(self, candidate, promote, reason):
+        with self._lock:
+            if self._candidate is not candidate:
+                return  # replaced by a newer artifact meanwhile
+            self._candidate = None
+        model, signature, _ = candidate
+        if promote:
+            self._promote(model, signature)
+            return
+        with self._lock:
+            self._signature = signature  # rejected: wait for the next artifact
+            self._stats["rejections"] += 1
+            self._stats["last_error"] = reason
+        print(f"⚠️ Model candidate rejected: {reason}")
+
+    def close(self):
+        self._closed.set()
+        for thread in (self._watcher, self._shadow_thread):
+            if thread is not None:
+                thread.join(timeout=1.0)
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["generation"] = self.generation
+            snapshot["loaded"] = self.active is not None
+            shadow = dict(self._shadow) if self._shadow else None
+            in_shadow = self._candidate is not None
+        if shadow:
+            rows = shadow.pop("rows")
+            agree, live_s, shadow_s = shadow.pop("agree"), shadow.pop("live_s"), shadow.pop("shadow_s")
+            shadow.update({
+                "active": in_shadow,
+                "rows": rows,
+                "agreement": round(agree / rows, 4) if rows else None,
+                "live_us_per_row": round(live_s / rows * 1e6, 2) if rows else None,
+                "shadow_us_per_row": round(shadow_s / rows * 1e6, 2) if rows else None,
+            })
+        snapshot["shadow"] = shadow
+        return snapshot
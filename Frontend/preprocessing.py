@@ -0,0 +1,204 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from labels import is_benign
+from vectorizer import UNSEEN_CATEGORY, FeatureVectorizer
+
+# ---------------------------------------------------------
+# PREPROCESSING
+# ---------------------------------------------------------
+# The notebook's preprocessing as whole-column operations, shared by
+# model/train.py and the server. Fitting keeps only per-column value counts;
+# the fitted state is preprocessing.json.
+
+def target_column(columns):
+    """The notebook's choice of label column."""
+    columns = list(columns)
+    return "label" if "label" in columns else "class" if "class" in columns else columns[-1]
+
+def _merge_counts(total, counts):
+    return counts if total is None else total.add(counts, fill_value=0)
+
+def _median(counts):
+    """The median of the values behind a value_counts() Series (pandas' even-count convention)."""
+    counts = counts.sort_index()
+    n = int(counts.sum())
+    cumulative = counts.to_numpy().cumsum()
+    lo = counts.index[np.searchsorted(cumulative, (n - 1) // 2, side="right")]
+    hi = counts.index[np.searchsorted(cumulative, n // 2, side="right")]
+    return (float(lo) + float(hi)) / 2
+
+def _mode(counts):
+    """Most frequent value; ties go to the smallest, as Series.mode()[0]."""
+    return counts.sort_index().idxmax()
+
+class Preprocessor:
+    def __init__(self, features=None, categories=None, fill_values=None, scaler_mean=None, scaler_scale=None):
+        self.features = list(features or [])
+        self.categories = {name: list(classes) for name, classes in (categories or {}).items()}
+        self.fill_values = dict(fill_values or {})
+        self.scaler_mean = None if scaler_mean is None else np.asarray(scaler_mean, dtype=np.float32)
+        self.scaler_scale = None if scaler_scale is None else np.asarray(scaler_scale, dtype=np.float32)
+        self.n_rows = 0
+        self.target = None  # label column seen by fit(); not part of the schema
+
+    def fit(self, data, target_col=None):
+        """
+        Learns fill values and vocabularies from a DataFrame or an iterable of
+        DataFrame chunks. Columns that are strings in the first chunk are
+        categorical; the target column is left out of the features.
+        """
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        counts, categorical, n_rows = {}, None, 0
+        for chunk in chunks:
+            if categorical is None:
+                target_col = target_col or target_column(chunk.columns)
+                self.features = [c for c in chunk.columns if c != target_col]
+                categorical = {c for c in self.features if not pd.api.types.is_numeric_dtype(chunk[c])}
+            n_rows += len(chunk)
+            for col in self.features:
+                column = chunk[col] if col in categorical else pd.to_numeric(chunk[col], errors="coerce")
+                vc = column.value_counts(dropna=True)
+                vc = vc[vc > 0]  # a category-dtype column also lists the values it doesn't hold
+                if col in categorical:
+                    # LabelEncoder saw astype(str); converting the distinct values is enough
+                    vc.index = vc.index.astype(str)
+                    vc = vc.groupby(level=0).sum()
+                counts[col] = _merge_counts(counts.get(col), vc)
+
+        self.n_rows = n_rows
+        self.target = target_col
+        self.categories, self.fill_values = {}, {}
+        for col in self.features:
+            vc = counts.get(col)
+            if vc is None or vc.empty:
+                self.fill_values[col] = 0.0
+                if col in (categorical or ()):
+                    self.categories[col] = []
+                continue
+            if col in categorical:
+                classes = sorted(vc.index)
+                self.categories[col] = classes
+                self.fill_values[col] = float(classes.index(_mode(vc)))
+            else:
+                self.fill_values[col] = _median(vc)
+        return self
+
+    def set_scaler(self, mean, scale):
+        """Takes a fitted StandardScaler's mean_ and scale_."""
+        self.scaler_mean = np.asarray(mean, dtype=np.float32)
+        self.scaler_scale = np.asarray(scale, dtype=np.float32)
+        return self
+
+    def _codes(self, column, classes):
+        missing = column.isna().to_numpy()
+        # -1 for values outside the vocabulary (and for NA)
+        codes = pd.Index(classes).get_indexer(column).astype(np.float32)
+        unseen = (codes < 0) & ~missing
+        if unseen.any():
+            # Numbers are already-encoded codes, as FeatureVectorizer reads them
+            codes[unseen] = [UNSEEN_CATEGORY if isinstance(v, str) else float(v) for v in column[unseen]]
+        codes[missing] = np.nan
+        return codes
+
+    def encode(self, frame, out=None):
+        """Filled, label-encoded float32 matrix (len(frame) x n_features), unscaled."""
+        if out is None:
+            out = np.empty((len(frame), len(self.features)), dtype=np.float32)
+        for j, col in enumerate(self.features):
+            if col not in frame:
+                out[:, j] = self.fill_values.get(col, 0.0)
+                continue
+            if col in self.categories and not pd.api.types.is_numeric_dtype(frame[col]):
+                out[:, j] = self._codes(frame[col], self.categories[col])
+            else:
+                out[:, j] = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+        # Every NA, in every column, in one masked assignment
+        nan = np.isnan(out)
+        if nan.any():
+            fill = np.array([self.fill_values.get(c, 0.0) for c in self.features], dtype=np.float32)
+            out[nan] = np.broadcast_to(fill, out.shape)[nan]
+        return out
+
+    def scale(self, X):
+        if self.scaler_mean is not None:
+            np.subtract(X, self.scaler_mean, out=X)
+        if self.scaler_scale is not None:
+            np.divide(X, np.where(self.scaler_scale == 0, 1, self.scaler_scale), out=X)
+        return X
+
+    def transform(self, frame, out=None):
+        return self.scale(self.encode(frame, out=out))
+
+    def decode(self, X):
+        """
+        A DataFrame of the values behind a transformed matrix: unscaled, with
+        category codes back as their strings. Missing values come back as the
+        fill value they were given. Codes outside the vocabulary (unseen
+        categories) stay numbers, which encode() reads as codes again.
+        """
+        X = np.array(X, dtype=np.float64)
+        if self.scaler_scale is not None:
+            X *= np.where(self.scaler_scale == 0, 1, self.scaler_scale)
+        if self.scaler_mean is not None:
+            X += self.scaler_mean
+        frame = pd.DataFrame(X, columns=self.features)
+        for col, classes in self.categories.items():
+            if col not in frame or not classes:
+                continue
+            codes = np.rint(frame[col].to_numpy()).astype(np.int64)
+            known = (codes >= 0) & (codes < len(classes))
+            values = frame[col].astype(object)
+            values[known] = np.asarray(classes, dtype=object)[codes[known]]
+            frame[col] = values
+        return frame
+
+    @staticmethod
+    def labels(column):
+        """0 for benign labels, 1 for everything else (NaN included), as int8."""
+        codes, uniques = pd.factorize(column)
+        benign = np.array([is_benign(u) for u in uniques] + [False])
+        return (~benign[codes]).astype(np.int8)  # code -1 (NaN) picks the trailing False
+
+    def schema(self):
+        return {
+            "features": self.features,
+            "categories": self.categories,
+            "fill_values": self.fill_values,
+            "scaler": None if self.scaler_mean is None else {
+                "mean": self.scaler_mean.tolist(), "scale": self.scaler_scale.tolist(),
+            },
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.schema(), f, indent=2)
+
+    @classmethod
+    def from_file(cls, path, features):
+        """Loads preprocessing.json, or an identity schema over `features` if it is absent."""
+        if not os.path.exists(path):
+            return cls(features)
+        with open(path, "r") as f:
+            schema = json.load(f)
+        scaler = schema.get("scaler") or {}
+        return cls(
+            schema.get("features", features),
+            categories=schema.get("categories"),
+            fill_values=schema.get("fill_values"),
+            scaler_mean=scaler.get("mean"),
+            scaler_scale=scaler.get("scale"),
+        )
+
+    def vectorizer(self):
+        """The per-record FeatureVectorizer for this schema."""
+        return FeatureVectorizer(
+            self.features,
+            categories=self.categories,
+            fill_values=self.fill_values,
+            scaler_mean=self.scaler_mean,
+            scaler_scale=self.scaler_scale,
+        )
@@ -1,9 +1,11 @@
 import asyncio
 import json
-from pathlib import Path
-from anchorpy import Provider, Wallet, Program, Idl  # <--- 1. IMPORT 'Idl'
+from functools import lru_cache
+from anchorpy import Provider, Wallet, Program, Idl
 from solana.rpc.async_api import AsyncClient
+from solders.hash import Hash
 from solders.keypair import Keypair
+from solders.message import Message
 from solders.pubkey import Pubkey
 from solders.system_program import ID as SYS_PROGRAM_ID
 
@@ -11,95 +13,217 @@ from solders.system_program import ID as SYS_PROGRAM_ID
 # CONFIGURATION
 # ==========================================
 WALLET_PATH = "id.json"
-IDL_PATH = "rayguard_program.json" 
+IDL_PATH = "rayguard_program.json"
 PROGRAM_ID = Pubkey.from_string("J3zRkAgCWjpXnKUr6teTdS2nLTGA3ZhEUi6gBvi5ZhdY")
 RPC_URL = "https://devnet.helius-rpc.com/?api-key=3306ede2-b0da-4ea3-a571-50369811ddb4"
+# At most this many add_log instructions per transaction (compute budget); fewer
+# when long strings or IPv6 addresses would push it past PACKET_DATA_SIZE
+MAX_LOGS_PER_TX = 8
+PACKET_DATA_SIZE = 1232
+# getMultipleAccounts accepts at most 100 addresses per call
+FETCH_BATCH_SIZE = 100
 
-async def get_program():
-    """Helper to set up the connection."""
-    client = AsyncClient(RPC_URL)
-    
-    # Load Wallet
-    with open(WALLET_PATH, "r") as f:
+@lru_cache(maxsize=None)
+def load_keypair(path: str):
+    with open(path, "r") as f:
         secret = json.load(f)
-    kp = Keypair.from_bytes(bytes(secret))
-    wallet = Wallet(kp)
-    
-    provider = Provider(client, wallet)
-    
-    # 2. FIX: Load IDL as a string, then parse it into an Idl object
-    with open(IDL_PATH, "r") as f:
+    return Keypair.from_bytes(bytes(secret))
+
+@lru_cache(maxsize=None)
+def load_idl(path: str):
+    # Load IDL as a string, then parse it into an Idl object
+    with open(path, "r") as f:
         raw_idl = f.read()
-    idl = Idl.from_json(raw_idl)
-        
-    # Now 'idl' is an object, not a dict, so Program() can read it correctly
-    program = Program(idl, PROGRAM_ID, provider)
-    return program, provider
+    return Idl.from_json(raw_idl)
 
-# ==========================================
-# FUNCTION 1: CREATE LEDGER
-# ==========================================
-async def create_ledger(seed_id: int):
-    program, provider = await get_program()
-    
-    seed_bytes = seed_id.to_bytes(2, 'little')
-    
+def derive_ledger_pda(seed_id: int):
     ledger_pda, _ = Pubkey.find_program_address(
-        [b"state", seed_bytes],
+        [b"state", seed_id.to_bytes(2, 'little')],
         PROGRAM_ID
     )
-    
-    print(f"Creating Ledger at: {ledger_pda}")
-    
-    tx = await program.methods.create_ledger(seed_id).accounts({
-        "ledger": ledger_pda,
-        "authority": provider.wallet.public_key,
-        "system_program": SYS_PROGRAM_ID
-    }).rpc()
-    
-    return str(tx), str(ledger_pda)
+    return ledger_pda
 
-# ==========================================
-# FUNCTION 2: ADD LOG
-# ==========================================
-async def add_log(ledger_address_str: str, ip: str, threat: str, action: str):
-    program, provider = await get_program()
-    ledger_pubkey = Pubkey.from_string(ledger_address_str)
-    
-    try:
-        ledger_account = await program.account["Ledger"].fetch(ledger_pubkey)
-        current_count = ledger_account.count
-    except Exception as e:
-        return None, f"Could not find ledger account: {e}"
-
-    count_bytes = current_count.to_bytes(8, 'little')
+def derive_log_pda(ledger_pubkey: Pubkey, index: int):
     log_pda, _ = Pubkey.find_program_address(
-        [b"log", bytes(ledger_pubkey), count_bytes],
+        [b"log", bytes(ledger_pubkey), index.to_bytes(8, 'little')],
         PROGRAM_ID
     )
-    
-    log_args = {
-        "ip_address": ip,
-        "threat_type": threat,
-        "action_taken": action
-    }
-    
-    print(f"Writing log #{current_count} to: {log_pda}")
-
-    try:
-        tx = await program.methods.add_log(log_args).accounts({
-            "ledger": ledger_pubkey,
-            "log": log_pda,
-            "authority": provider.wallet.public_key,
+    return log_pda
+
+def transaction_size(instructions, payer: Pubkey):
+    """Bytes on the wire for a transaction of `instructions` (the blockhash doesn't change the size)."""
+    message = Message.new_with_blockhash(instructions, payer, Hash.default())
+    return 1 + 64 * message.header.num_required_signatures + len(bytes(message))
+
+def is_too_large(error):
+    return "too large" in str(error).lower()
+
+# ==========================================
+# HANDLER
+# ==========================================
+class RayguardHandler:
+    """
+    Long-lived connection to the rayguard program. Owns one pooled RPC client,
+    the parsed IDL and the wallet keypair, all set up once:
+
+        async with RayguardHandler() as handler:
+            await handler.add_log(ledger, ip, threat, action)
+    """
+
+    def __init__(self, rpc_url: str = RPC_URL, wallet_path: str = WALLET_PATH, idl_path: str = IDL_PATH):
+        self.rpc_url = rpc_url
+        self.wallet_path = wallet_path
+        self.idl_path = idl_path
+        self.client = None
+        self.provider = None
+        self.program = None
+        # Next log index per ledger: seeded once from chain, then advanced locally
+        self._counts = {}
+        # One lock per ledger; asyncio.Lock wakes waiters in arrival order, so
+        # concurrent writers queue up instead of racing for the same log PDA
+        self._locks = {}
+
+    async def open(self):
+        # AsyncClient keeps a keep-alive httpx pool for every call made through it
+        self.client = AsyncClient(self.rpc_url)
+        self.provider = Provider(self.client, Wallet(load_keypair(self.wallet_path)))
+        self.program = Program(load_idl(self.idl_path), PROGRAM_ID, self.provider)
+        return self
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # ==========================================
+    # FUNCTION 1: CREATE LEDGER
+    # ==========================================
+    async def create_ledger(self, seed_id: int):
+        ledger_pda = derive_ledger_pda(seed_id)
+
+        print(f"Creating Ledger at: {ledger_pda}")
+
+        tx = await self.program.methods["create_ledger"].args([seed_id]).accounts({
+            "ledger": ledger_pda,
+            "authority": self.provider.wallet.public_key,
             "system_program": SYS_PROGRAM_ID
         }).rpc()
-        return str(tx), None
-    except Exception as e:
-        return None, str(e)
+
+        self._counts[ledger_pda] = 0
+        return str(tx), str(ledger_pda)
+
+    def _ledger_lock(self, ledger_pubkey: Pubkey):
+        if ledger_pubkey not in self._locks:
+            self._locks[ledger_pubkey] = asyncio.Lock()
+        return self._locks[ledger_pubkey]
+
+    async def _next_index(self, ledger_pubkey: Pubkey):
+        if ledger_pubkey not in self._counts:
+            ledger_account = await self.program.account["Ledger"].fetch(ledger_pubkey)
+            self._counts[ledger_pubkey] = ledger_account.count
+        return self._counts[ledger_pubkey]
+
+    async def _reconcile(self, ledger_pubkey: Pubkey):
+        """Re-reads count after a failed send - the transaction may or may not have landed."""
+        try:
+            ledger_account = await self.program.account["Ledger"].fetch(ledger_pubkey)
+            self._counts[ledger_pubkey] = ledger_account.count
+        except Exception:
+            # Unknown state: drop it and seed again on the next write
+            self._counts.pop(ledger_pubkey, None)
+
+    # ==========================================
+    # FUNCTION 2: ADD LOG
+    # ==========================================
+    async def add_log(self, ledger_address_str: str, ip: str, threat: str, action: str):
+        signatures, error = await self.add_logs(ledger_address_str, [{
+            "ipAddress": ip,
+            "threatType": threat,
+            "actionTaken": action
+        }])
+        return (signatures[0] if signatures else None), error
+
+    # ==========================================
+    # FUNCTION 3: ADD LOGS (BATCHED)
+    # ==========================================
+    async def add_logs(self, ledger_address_str: str, entries: list):
+        """
+        Writes several logs to one ledger, packing as many add_log instructions
+        into each transaction as fit in PACKET_DATA_SIZE, up to MAX_LOGS_PER_TX.
+        Instruction k in a transaction runs after k-1 has bumped ledger.count,
+        so it targets log PDA count+k, and each one links previous_hash to the
+        prior entry exactly as single writes do. A send rejected as too large
+        is retried in smaller transactions.
+
+        The count comes from the handler's local counter, so there is no fetch
+        round-trip before each write. Writes to one ledger are serialized, and a
+        failed send re-syncs the counter from chain.
+
+        entries: [{"ipAddress", "threatType", "actionTaken"}, ...] in ledger order.
+        Returns (signatures, error) - on error, signatures holds the chunks that landed.
+        """
+        ledger_pubkey = Pubkey.from_string(ledger_address_str)
+        signatures = []
+
+        payer = self.provider.wallet.public_key
+        async with self._ledger_lock(ledger_pubkey):
+            start, limit = 0, MAX_LOGS_PER_TX
+            while start < len(entries):
+                try:
+                    current_count = await self._next_index(ledger_pubkey)
+                except Exception as e:
+                    return signatures, f"Could not find ledger account: {e}"
+
+                builders, instructions = [], []
+                for offset, entry in enumerate(entries[start:start + limit]):
+                    log_args = self.program.type["AddLogArgs"](
+                        ip_address=entry["ipAddress"],
+                        threat_type=entry["threatType"],
+                        action_taken=entry["actionTaken"],
+                    )
+                    builder = self.program.methods["add_log"].args([log_args]).accounts({
+                        "ledger": ledger_pubkey,
+                        "log": derive_log_pda(ledger_pubkey, current_count + offset),
+                        "authority": payer,
+                        "system_program": SYS_PROGRAM_ID
+                    })
+                    instruction = builder.instruction()
+                    if instructions and transaction_size(instructions + [instruction], payer) > PACKET_DATA_SIZE:
+                        break
+                    builders.append(builder)
+                    instructions.append(instruction)
+                n = len(instructions)
+
+                print(f"Writing logs #{current_count}..#{current_count + n - 1} to ledger {ledger_pubkey}")
+
+                try:
+                    tx = await builders[-1].pre_instructions(instructions[:-1]).rpc()
+                except Exception as e:
+                    if n > 1 and is_too_large(e):
+                        limit = n // 2  # nothing landed: send the same logs in smaller transactions
+                        continue
+                    await self._reconcile(ledger_pubkey)
+                    return signatures, str(e)
+
+                self._counts[ledger_pubkey] = current_count + n
+                signatures.append(str(tx))
+                start += n
+
+        return signatures, None
+
+async def main():
+    async with RayguardHandler() as handler:
+        await handler.create_ledger(105)
 
 if __name__ == "__main__":
     # Windows-specific fix for asyncio loop issues
     if asyncio.get_event_loop_policy().__class__.__name__ == 'WindowsProactorEventLoopPolicy':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-    asyncio.run(create_ledger(105))
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,325 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+# ---------------------------------------------------------
+# SERVER STATE STORE
+# ---------------------------------------------------------
+# Bounded, sharded replacements for USER_LEDGERS and BANNED_USERS. Bans expire
+# on a timer wheel, or live in SQLite so every worker process sees them.
+
+IPV6_FLAG = 1 << 128  # keeps IPv6 keys apart from IPv4 ones
+V4_MAPPED_PREFIX = bytes(10) + b"\xff\xff"  # ::ffff:0:0/96
+
+def ip_key(ip):
+    """
+    IPv4 -> int, IPv6 -> int | IPV6_FLAG, anything unparseable -> the string
+    itself. IPv4-mapped IPv6 addresses are unmapped first (what
+    ipaddress.IPv6Address.ipv4_mapped does), so they key as the IPv4 address.
+    """
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except (OSError, TypeError):
+        pass
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, ip)
+    except (OSError, TypeError):
+        return str(ip)
+    if packed.startswith(V4_MAPPED_PREFIX):
+        return int.from_bytes(packed[12:], "big")
+    return int.from_bytes(packed, "big") | IPV6_FLAG
+
+def _shard_of(key, n_shards):
+    if isinstance(key, int):
+        return key % n_shards
+    # crc32 rather than hash(): stable across processes and restarts
+    return zlib.crc32(key.encode()) % n_shards
+
+class CidrSet:
+    """
+    Banned networks, e.g. "203.0.113.0/24" or "2001:db8::/32". Kept as one
+    set of masked network ints per prefix length, so a lookup is one
+    dict/set probe per distinct prefix length in use, at most 33 for IPv4
+    and 129 for IPv6.
+    """
+
+    def __init__(self, cidrs=()):
+        self._by_prefix = {}  # (is_v6, prefix_len) -> {network int}
+        for cidr in cidrs:
+            self.add(cidr)
+
+    def add(self, cidr):
+        address, _, prefix = cidr.strip().partition("/")
+        key = ip_key(address)
+        if not isinstance(key, int):
+            raise ValueError(f"not an IP network: {cidr!r}")
+        is_v6 = key >= IPV6_FLAG
+        bits = 128 if is_v6 else 32
+        # An IPv4-mapped network ("::ffff:10.0.0.0/104") is written with an IPv6 prefix length
+        written_bits = 128 if ":" in address else 32
+        if prefix and not prefix.isdigit():
+            raise ValueError(f"invalid prefix length in {cidr!r}")
+        prefix_len = int(prefix) if prefix else written_bits
+        if not written_bits - bits <= prefix_len <= written_bits:
+            raise ValueError(f"invalid prefix length in {cidr!r}: expected "
+                             f"{written_bits - bits}..{written_bits}")
+        prefix_len -= written_bits - bits
+        self._by_prefix.setdefault((is_v6, prefix_len), set()).add(key & self._mask(bits, prefix_len, is_v6))
+
+    @staticmethod
+    def _mask(bits, prefix_len, is_v6):
+        mask = ((1 << prefix_len) - 1) << (bits - prefix_len)
+        return mask | IPV6_FLAG if is_v6 else mask
+
+    def __contains__(self, ip):
+        key = ip if isinstance(ip, int) else ip_key(ip)
+        if not isinstance(key, int):
+            return False
+        is_v6 = key >= IPV6_FLAG
+        bits = 128 if is_v6 else 32
+        for (v6, prefix_len), networks in self._by_prefix.items():
+            if v6 == is_v6 and key & self._mask(bits, prefix_len, is_v6) in networks:
+                return True
+        return False
+
+    def __len__(self):
+        return sum(len(networks) for networks in self._by_prefix.values())
+
+class LedgerStore:
+    def __init__(self, max_entries=100000, shards=16):
+        self.max_entries = max_entries
+        self._per_shard = max(1, max_entries // shards)
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+        self._evictions = 0
+        self._stats_lock = threading.Lock()  # counters are shared by every shard
+
+    def get_or_create(self, ip, create):
+        """
+        Returns the ledger for `ip`, calling create() under the shard lock on
+        a miss, so one ip never gets two ledgers. The least recently used
+        entry of the shard is evicted past capacity. An evicted ip that comes
+        back is given a new ledger.
+        """
+        lock, entries = self._shards[_shard_of(ip, len(self._shards))]
+        with lock:
+            ledger = entries.get(ip)
+            if ledger is not None:
+                entries.move_to_end(ip)
+                return ledger
+            ledger = entries[ip] = create()
+            if len(entries) <= self._per_shard:
+                return ledger
+            entries.popitem(last=False)
+        with self._stats_lock:
+            self._evictions += 1
+        return ledger
+
+    def __len__(self):
+        return sum(len(entries) for _, entries in self._shards)
+
+    def stats(self):
+        return {"ledgers": len(self), "capacity": self.max_entries, "evictions": self._evictions}
+
+class BanList:
+    def __init__(self, ttl=3600.0, max_bans=100000, shards=16, tick=1.0):
+        self.ttl = ttl
+        self.max_bans = max_bans
+        self.tick = tick
+        self._per_shard = max(1, max_bans // shards)
+        self._shards = [(threading.Lock(), {}) for _ in range(shards)]  # ip -> expires_at, oldest ban first
+        self._stats = {"bans": 0, "expired": 0, "evictions": 0}
+        self._stats_lock = threading.Lock()  # counters are shared by every shard
+
+        # Timer wheel: slot s holds the ips due to expire in tick number s (mod size)
+        self._wheel = [set() for _ in range(int(ttl / tick) + 2)]
+        self._wheel_lock = threading.Lock()
+        self._current_tick = int(time.monotonic() / tick)
+
+        # The expiry thread starts with the first ban, as the dispatcher's workers do
+        self._closed = threading.Event()
+        self._timer = None
+        self._timer_lock = threading.Lock()
+
+    def _start_timer(self):
+        with self._timer_lock:
+            if self._timer is None and not self._closed.is_set():
+                self._timer = threading.Thread(target=self._run, name="ban-expiry", daemon=True)
+                self._timer.start()
+
+    def _shard(self, key):
+        return self._shards[_shard_of(key, len(self._shards))]
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def add(self, ip, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        ip = ip_key(ip)
+        lock, bans = self._shard(ip)
+        with lock:
+            bans.pop(ip, None)  # re-insert so a re-ban counts as newest
+            bans[ip] = expires_at
+            evicted = len(bans) > self._per_shard
+            if evicted:
+                del bans[next(iter(bans))]
+        with self._stats_lock:
+            self._stats["evictions"] += int(evicted)
+            self._stats["bans"] += 1
+        self._schedule(ip, expires_at)
+        if self._timer is None:
+            self._start_timer()
+
+    def _schedule(self, ip, expires_at):
+        with self._wheel_lock:
+            self._wheel[int(expires_at / self.tick) % len(self._wheel)].add(ip)
+
+    def __contains__(self, ip):
+        ip = ip_key(ip)
+        lock, bans = self._shard(ip)
+        with lock:
+            expires_at = bans.get(ip)
+            if expires_at is None:
+                return False
+            if expires_at > time.monotonic():
+                return True
+            # The wheel will get to it too; don't keep a dead ban in the meantime
+            del bans[ip]
+        self._count("expired")
+        return False
+
+    def _run(self):
+        while not self._closed.wait(self.tick):
+            self.expire()
+
+    def expire(self):
+        """Advances the wheel to now, dropping bans that are due."""
+        now = time.monotonic()
+        target = int(now / self.tick)
+        due = []
+        with self._wheel_lock:
+            # Never walk more than one full turn, whatever the gap since the last call
+            for t in range(max(self._current_tick, target - len(self._wheel) + 1), target + 1):
+                slot = t % len(self._wheel)
+                due.append(self._wheel[slot])
+                self._wheel[slot] = set()
+            self._current_tick = target + 1
+
+        expired = 0
+        for ips in due:
+            for ip in ips:
+                lock, bans = self._shard(ip)
+                with lock:
+                    expires_at = bans.get(ip)
+                    if expires_at is None:
+                        continue
+                    if expires_at <= now:
+                        del bans[ip]
+                        expired += 1
+                        continue
+                # Re-banned since, or a custom ttl longer than the wheel: file it again
+                self._schedule(ip, expires_at)
+        if expired:
+            self._count("expired", expired)
+
+    def __len__(self):
+        return sum(len(bans) for _, bans in self._shards)
+
+    def close(self):
+        with self._timer_lock:
+            self._closed.set()
+        if self._timer is not None:
+            self._timer.join(timeout=1.0)
+
+    def stats(self):
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        snapshot.update({"active": len(self), "capacity": self.max_bans, "ttl": self.ttl, "backend": "memory"})
+        return snapshot
+
+class SqliteBanList:
+    def __init__(self, path, ttl=3600.0, max_bans=100000, sweep_interval=5.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_bans = max_bans
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+
+        # Wall-clock expiry: the timestamps are compared across processes
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS bans (ip TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+        db.execute("CREATE INDEX IF NOT EXISTS bans_expires_at ON bans (expires_at)")
+        db.commit()
+
+        # The sweeper starts with this process's first ban
+        self._closed = threading.Event()
+        self._timer = None
+        self._timer_lock = threading.Lock()
+
+    def _start_timer(self):
+        with self._timer_lock:
+            if self._timer is None and not self._closed.is_set():
+                self._timer = threading.Thread(target=self._run, name="ban-sweeper", daemon=True)
+                self._timer.start()
+
+    def _db(self):
+        # sqlite3 connections must stay on the thread that opened them
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def add(self, ip, ttl=None):
+        db = self._db()
+        db.execute("INSERT OR REPLACE INTO bans (ip, expires_at) VALUES (?, ?)",
+                   (str(ip_key(ip)), time.time() + (self.ttl if ttl is None else ttl)))
+        db.commit()
+        if self._timer is None:
+            self._start_timer()
+
+    def __contains__(self, ip):
+        row = self._db().execute("SELECT 1 FROM bans WHERE ip = ? AND expires_at > ?", (str(ip_key(ip)), time.time())).fetchone()
+        return row is not None
+
+    def _run(self):
+        while not self._closed.wait(self.sweep_interval):
+            try:
+                self.expire()
+            except sqlite3.Error as e:
+                print(f"Ban Sweep Error: {e}")
+
+    def expire(self):
+        """Deletes expired bans, then the soonest-expiring ones past max_bans."""
+        db = self._db()
+        db.execute("DELETE FROM bans WHERE expires_at <= ?", (time.time(),))
+        db.execute(
+            "DELETE FROM bans WHERE ip IN (SELECT ip FROM bans ORDER BY expires_at LIMIT "
+            "MAX(0, (SELECT COUNT(*) FROM bans) - ?))", (self.max_bans,))
+        db.commit()
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM bans WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+    def close(self):
+        with self._timer_lock:
+            self._closed.set()
+        if self._timer is not None:
+            self._timer.join(timeout=1.0)
+
+    def stats(self):
+        return {"active": len(self), "capacity": self.max_bans, "ttl": self.ttl,
+                "backend": "sqlite", "path": os.path.abspath(self.path)}
+
+def make_ban_list(backend="memory", path="bans.db", **kwargs):
+    if backend == "sqlite":
+        return SqliteBanList(path, **kwargs)
+    if backend == "memory":
+        return BanList(**kwargs)
+    raise ValueError(f"unknown ban backend {backend!r} (use 'memory' or 'sqlite')")
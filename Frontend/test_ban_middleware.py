@@ -0,0 +1,37 @@
+import pytest
+
+from ban_middleware import BanMiddleware
+from state_store import CidrSet
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+def call(middleware, path="/predict", **environ):
+    seen = []
+    body = middleware({"PATH_INFO": path, **environ}, lambda status, headers: seen.append(status))
+    return seen[0], b"".join(body)
+
+def test_banned_source_is_rejected_before_the_app():
+    middleware = BanMiddleware(app, bans={"10.0.0.1"}, cidrs=["203.0.113.0/24"])
+    assert call(middleware, REMOTE_ADDR="10.0.0.1")[0].startswith("503")
+    assert call(middleware, HTTP_IP="203.0.113.9", REMOTE_ADDR="10.0.0.2")[0].startswith("503")
+    assert call(middleware, REMOTE_ADDR="10.0.0.2") == ("200 OK", b"ok")
+    assert middleware.stats() == {"rejected": 2, "networks": 1}
+
+def test_unprotected_paths_are_not_checked():
+    middleware = BanMiddleware(app, bans={"10.0.0.1"})
+    assert call(middleware, path="/health", REMOTE_ADDR="10.0.0.1") == ("200 OK", b"ok")
+
+def test_cidr_set_matches_networks():
+    networks = CidrSet(["203.0.113.0/24", "2001:db8::/32", "::ffff:10.0.0.0/104"])
+    assert "203.0.113.77" in networks and "203.0.114.1" not in networks
+    assert "2001:db8::1" in networks and "2001:db9::1" not in networks
+    assert "10.1.2.3" in networks and "::ffff:203.0.113.5" in networks
+    assert "not-an-ip" not in networks
+    assert len(networks) == 3
+
+@pytest.mark.parametrize("cidr", ["10.0.0.0/33", "10.0.0.0/-1", "10.0.0.0/x", "::ffff:10.0.0.0/8", "host/24"])
+def test_cidr_set_rejects_invalid_networks(cidr):
+    with pytest.raises(ValueError):
+        CidrSet([cidr])
@@ -0,0 +1,99 @@
+import threading
+
+import numpy as np
+import pytest
+
+from batcher import DynamicBatcher
+
+def run_concurrently(batcher, inputs, contexts=None):
+    """predict() from one thread per input; returns results (or errors) in input order."""
+    results = [None] * len(inputs)
+
+    def call(i):
+        try:
+            results[i] = batcher.predict(inputs[i], None if contexts is None else contexts[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+class GatedModel:
+    """Holds its first call until released, so later requests queue up behind it."""
+
+    def __init__(self):
+        self.calls = []
+        self.entered, self.release = threading.Event(), threading.Event()
+
+    def __call__(self, X, context=None):
+        self.calls.append((len(X), context))
+        self.entered.set()
+        self.release.wait(5)
+        return X[:, 0] * 10 + (0 if context is None else context)
+
+def queue_behind_first_call(batcher, model):
+    first = threading.Thread(target=batcher.predict, args=(np.array([[0.0]]),))
+    first.start()
+    model.entered.wait(5)
+    return first
+
+def test_queued_requests_share_one_call_and_get_their_own_rows():
+    model = GatedModel()
+    batcher = DynamicBatcher(model, max_rows=32, max_wait=1.0)
+    first = queue_behind_first_call(batcher, model)
+    inputs = [np.array([[float(i)], [float(i) + 0.5]]) for i in range(1, 6)]
+    threading.Timer(0.2, model.release.set).start()
+    results = run_concurrently(batcher, inputs)
+    first.join(5)
+    for X, result in zip(inputs, results):
+        assert np.array_equal(result, X[:, 0] * 10)
+    assert len(model.calls) == 2 and model.calls[1] == (10, None)
+    batcher.close()
+
+def test_rows_of_different_contexts_never_share_a_batch():
+    model = GatedModel()
+    batcher = DynamicBatcher(model, max_rows=32, max_wait=1.0)
+    first = queue_behind_first_call(batcher, model)
+    inputs = [np.array([[float(i)]]) for i in range(6)]
+    contexts = [1, 2, 1, 2, 1, 2]
+    threading.Timer(0.2, model.release.set).start()
+    results = run_concurrently(batcher, inputs, contexts)
+    first.join(5)
+    for X, context, result in zip(inputs, contexts, results):
+        assert result[0] == X[0, 0] * 10 + context
+    assert sorted(model.calls[1:]) == [(3, 1), (3, 2)]
+    batcher.close()
+
+def test_an_error_reaches_every_request_in_the_batch():
+    def fail(X):
+        raise ValueError("model failed")
+
+    batcher = DynamicBatcher(fail, max_rows=32, max_wait=0.05)
+    results = run_concurrently(batcher, [np.array([[1.0]])] * 4)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert batcher.stats()["errors"] >= 1
+    batcher.close()
+
+def test_large_inputs_bypass_the_queue():
+    calls = []
+    batcher = DynamicBatcher(lambda X: calls.append(len(X)) or X[:, 0], max_rows=4, max_wait=1.0)
+    assert list(batcher.predict(np.arange(8.0).reshape(8, 1))) == list(range(8))
+    assert calls == [8] and batcher.stats()["bypassed"] == 1
+
+def test_window_is_zero_when_arrivals_are_sparse():
+    batcher = DynamicBatcher(lambda X: X, max_rows=32, max_wait=0.002)
+    assert batcher.window() == 0.0
+    batcher._gap = 0.01
+    assert batcher.window() == 0.0
+    batcher._gap = 0.00001
+    assert batcher.window() == pytest.approx(0.00031)
+
+def test_closed_batcher_refuses_new_requests():
+    batcher = DynamicBatcher(lambda X: X, max_wait=0.01)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.predict(np.array([[1.0]]))
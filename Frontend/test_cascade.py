@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from cascade import Cascade
+
+class FastTier:
+    """One feature: the intrusion probability itself."""
+
+    classes_ = np.array(["normal", "attack"])
+
+    def predict_proba(self, X):
+        return np.column_stack([1.0 - X[:, 0], X[:, 0]])
+
+ROWS = np.array([[0.01], [0.5], [0.99], [0.2]])
+
+def test_rows_outside_the_band_are_answered_by_the_fast_tier():
+    cascade = Cascade(FastTier(), ["normal", "DOS"], low=0.05, high=0.95)
+    escalated = []
+
+    def full(rows):
+        escalated.append(rows[:, 0].tolist())
+        return [("DOS", 0.7), ("normal", 0.1)]
+
+    assert cascade.decide(ROWS, full) == [
+        ("normal", 0.01, "fast"), ("DOS", 0.7, "full"), ("DOS", 0.99, "fast"), ("normal", 0.1, "full"),
+    ]
+    assert escalated == [[0.5, 0.2]]
+    stats = cascade.stats()
+    assert (stats["fast_benign"], stats["fast_intrusion"], stats["escalated"]) == (1, 1, 2)
+
+def test_high_is_ignored_when_the_full_model_has_several_attack_classes():
+    cascade = Cascade(FastTier(), ["normal", "DOS", "Probe"], low=0.05, high=0.95)
+    assert cascade.high is None
+    verdicts = cascade.decide(ROWS, lambda rows: [("Probe", 0.9)] * len(rows))
+    assert [v[2] for v in verdicts] == ["fast", "full", "full", "full"]
+
+def test_full_model_is_not_called_when_nothing_escalates():
+    cascade = Cascade(FastTier(), ["normal", "DOS"], low=0.5)
+
+    def full(rows):
+        raise AssertionError("nothing should escalate")
+
+    assert [v[0] for v in cascade.decide(ROWS[[0, 3]], full)] == ["normal", "normal"]
+
+def test_full_model_without_a_benign_class_is_rejected():
+    with pytest.raises(ValueError):
+        Cascade(FastTier(), ["DOS", "Probe"], low=0.05)
+
+def test_missing_export_means_no_fast_tier(tmp_path):
+    assert Cascade.load(str(tmp_path), ["normal", "DOS"]) is None
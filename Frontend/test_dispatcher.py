@@ -0,0 +1,46 @@
+import threading
+
+from dispatcher import Dispatcher
+
+def blocked_dispatcher(policy, max_queue=2):
+    """One worker, held busy by a first task until the returned event is set."""
+    dispatcher = Dispatcher(workers=1, max_queue=max_queue, policy=policy, block_timeout=0.05)
+    release, running = threading.Event(), threading.Event()
+    dispatcher.submit(lambda: (running.set(), release.wait(5)))
+    running.wait(5)
+    return dispatcher, release
+
+def test_drop_oldest_never_evicts_an_essential_task():
+    dispatcher, release = blocked_dispatcher("drop_oldest")
+    ran = []
+    assert dispatcher.submit(ran.append, "createLedger", essential=True)
+    assert dispatcher.submit(ran.append, "log-1")
+    assert dispatcher.submit(ran.append, "log-2")  # full: evicts log-1, not createLedger
+    release.set()
+    assert dispatcher.flush(5)
+    assert ran == ["createLedger", "log-2"]
+    assert dispatcher.stats()["dropped"] == 1
+    dispatcher.shutdown()
+
+def test_essential_task_goes_over_capacity_rather_than_being_dropped():
+    for policy in ("drop_newest", "block", "drop_oldest"):
+        dispatcher, release = blocked_dispatcher(policy, max_queue=1)
+        ran = []
+        assert dispatcher.submit(ran.append, "first", essential=True)
+        assert dispatcher.submit(ran.append, "second", essential=True)
+        if policy != "drop_oldest":
+            assert not dispatcher.submit(ran.append, "log")
+        release.set()
+        assert dispatcher.flush(5)
+        assert ran[:2] == ["first", "second"]
+        assert dispatcher.stats()["over_capacity"] >= 1
+        dispatcher.shutdown()
+
+def test_same_key_runs_in_order_on_one_worker():
+    dispatcher = Dispatcher(workers=4, max_queue=100)
+    ran = []
+    for i in range(20):
+        dispatcher.submit(ran.append, i, key="ledger")
+    assert dispatcher.flush(5)
+    assert ran == list(range(20))
+    dispatcher.shutdown()
@@ -0,0 +1,48 @@
+from flow_window import WINDOW_FEATURES, FlowWindows
+
+def test_time_window_counts_are_per_host_and_per_service():
+    windows = FlowWindows(window_seconds=2.0)
+    windows.observe("a", "http", timestamp=100.0)
+    windows.observe("a", "ftp", flag="S0", timestamp=100.5)
+    windows.observe("b", "http", flag="REJ", timestamp=101.0)
+    features = windows.observe("a", "http", timestamp=101.5)
+    assert set(features) == set(WINDOW_FEATURES)
+    assert features["count"] == 3 and features["srv_count"] == 3
+    assert features["same_srv_rate"] == 0.67 and features["diff_srv_rate"] == 0.33
+    assert features["serror_rate"] == 0.33 and features["srv_rerror_rate"] == 0.33
+    assert features["srv_diff_host_rate"] == 0.33
+
+def test_old_connections_leave_the_time_window():
+    windows = FlowWindows(window_seconds=2.0)
+    for t in (100.0, 100.5, 101.0):
+        windows.observe("a", "http", timestamp=t)
+    features = windows.observe("a", "http", timestamp=102.6)
+    assert features["count"] == 2  # 101.0 and 102.6
+    assert features["dst_host_count"] == 4  # the host window counts connections, not seconds
+
+def test_one_source_clock_never_empties_another_sources_window():
+    windows = FlowWindows(window_seconds=2.0)
+    windows.observe("a", "http", timestamp=100.0)
+    windows.observe("b", "smtp", timestamp=5000.0)  # skewed, far ahead
+    assert windows.observe("a", "ftp", timestamp=100.5)["count"] == 2
+
+def test_host_window_keeps_the_last_connections():
+    windows = FlowWindows(window_conns=3)
+    for i, host in enumerate(("a", "a", "b", "a")):
+        features = windows.observe(host, "http", src_port=1000 if host == "a" else 2000, timestamp=i)
+    assert features["dst_host_count"] == 2 and features["dst_host_srv_count"] == 3
+    assert features["dst_host_same_src_port_rate"] == 1.0
+    assert features["dst_host_srv_diff_host_rate"] == 0.33
+
+def test_time_window_memory_is_bounded():
+    windows = FlowWindows(window_seconds=60.0, max_events=10)
+    for i in range(50):
+        windows.observe(f"h{i % 7}", f"s{i % 3}", timestamp=100.0 + i * 0.1)
+    stats = windows.stats()
+    assert stats["time_window_events"] <= 10 and stats["evicted_early"] == 40
+
+def test_enrich_ignores_the_clients_timestamp_and_window_features():
+    windows = FlowWindows(window_seconds=2.0)
+    windows.enrich("a", {"service": "http"}, timestamp=100.0)
+    record = windows.enrich("a", {"service": "http", "count": 999, "timestamp": 0.0}, timestamp=101.0)
+    assert record["count"] == 2 and record["timestamp"] == 0.0
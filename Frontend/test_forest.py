@@ -0,0 +1,31 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from forest import FlatForest, export_forest
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+def fitted_forest(n_classes=3):
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((600, 8)).astype(np.float32)
+    y = np.array(["DOS", "normal", "PROBE"][:n_classes])[(X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+                                                         + (n_classes > 2) * (X[:, 3] > 1)]
+    model = ensemble.RandomForestClassifier(n_estimators=20, max_depth=8, min_samples_leaf=2, random_state=0)
+    return model.fit(X, y), rng.standard_normal((300, 8)).astype(np.float32)
+
+def test_predict_proba_matches_sklearn():
+    model, X = fitted_forest()
+    flat = FlatForest.from_model(model)
+    assert flat.classes_.tolist() == model.classes_.tolist()
+    assert np.allclose(flat.predict_proba(X), model.predict_proba(X), atol=1e-5)
+    assert (flat.predict(X) == model.predict(X)).all()
+
+def test_exported_forest_maps_and_pickles_as_its_path(tmp_path):
+    model, X = fitted_forest(n_classes=2)
+    flat = FlatForest.load(export_forest(model, str(tmp_path / "forest")))
+    assert np.allclose(flat.predict_proba(X), model.predict_proba(X), atol=1e-5)
+    again = pickle.loads(pickle.dumps(flat))
+    assert again.path == flat.path
+    assert np.allclose(again.predict_proba(X[:10]), flat.predict_proba(X[:10]))
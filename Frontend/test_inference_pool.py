@@ -0,0 +1,54 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from inference_pool import InferencePool
+
+class ScoreModel:
+    """Two classes; a row whose first feature is -1 kills the worker running it."""
+
+    classes_ = np.array(["normal", "DOS"])
+
+    def predict_proba(self, X):
+        if (X[:, 0] == -1).any():
+            os._exit(3)
+        p = np.clip(X[:, 0], 0.0, 1.0).astype(np.float64)
+        return np.column_stack([1.0 - p, p])
+
+@pytest.fixture
+def pool():
+    pool = InferencePool(ScoreModel(), n_features=2, workers=1, slots=8, slot_rows=4, timeout=10.0)
+    yield pool
+    pool.close()
+
+def wait_for(condition, seconds=10.0):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def test_rows_spanning_several_slots_come_back_in_order(pool):
+    X = np.column_stack([np.linspace(0, 1, 11), np.zeros(11)])
+    assert np.allclose(pool.predict_proba(X), ScoreModel().predict_proba(X))
+    assert list(pool.predict(X[[0, 10]])) == ["normal", "DOS"]
+
+def test_worker_death_fails_its_callers_at_once_and_is_replaced(pool):
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="died"):
+        pool.predict_proba(np.array([[-1.0, 0.0]]))
+    assert time.monotonic() - started < pool.timeout
+    assert wait_for(lambda: pool.stats()["respawns"] == 1 and pool.stats()["alive"] == 1)
+
+    assert np.allclose(pool.predict_proba(np.array([[0.25, 0.0]])), [[0.75, 0.25]])
+    stats = pool.stats()
+    assert stats["worker_deaths"] == 1 and stats["free_slots"] == 8
+
+def test_closed_pool_refuses_requests():
+    pool = InferencePool(ScoreModel(), n_features=2, workers=1, slots=2, slot_rows=4)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.predict_proba(np.zeros((1, 2)))
@@ -0,0 +1,92 @@
+import pytest
+
+import state_store
+from state_store import BanList, SqliteBanList
+
+class FakeClock:
+    """Stands in for the time module, so expiry is tested without sleeping."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(state_store, "time", clock)
+    return clock
+
+def ban_list(**kwargs):
+    bans = BanList(**kwargs)
+    bans.close()  # no expiry thread: the tests drive expire() themselves
+    return bans
+
+def test_ban_expires_when_the_wheel_reaches_it(clock):
+    bans = ban_list(ttl=10, tick=1)
+    bans.add("1.2.3.4")
+    clock.now += 5
+    bans.expire()
+    assert "1.2.3.4" in bans and len(bans) == 1
+    clock.now += 6
+    bans.expire()
+    assert len(bans) == 0 and bans.stats()["expired"] == 1
+
+def test_reban_and_long_ttl_are_rescheduled(clock):
+    bans = ban_list(ttl=10, tick=1)
+    bans.add("10.0.0.1")
+    bans.add("10.0.0.2", ttl=100)  # longer than one turn of the wheel
+    clock.now += 8
+    bans.add("10.0.0.1")
+    for _ in range(4):
+        clock.now += 5
+        bans.expire()
+    assert "10.0.0.1" not in bans and "10.0.0.2" in bans
+    while clock.now < 1101:
+        clock.now += 5
+        bans.expire()
+    assert len(bans) == 0
+
+def test_expired_ban_is_not_reported_before_the_wheel_runs(clock):
+    bans = ban_list(ttl=10, tick=1)
+    bans.add("1.2.3.4")
+    clock.now += 11
+    assert "1.2.3.4" not in bans
+
+def test_equivalent_addresses_are_one_ban(clock):
+    bans = ban_list()
+    bans.add("1.2.3.4")
+    bans.add("::1")
+    assert "::ffff:1.2.3.4" in bans and "0::1" in bans
+    assert len(bans) == 2
+
+def test_oldest_ban_is_evicted_past_capacity(clock):
+    bans = ban_list(max_bans=2, shards=1)
+    for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+        bans.add(ip)
+    assert "10.0.0.1" not in bans and len(bans) == 2
+    assert bans.stats()["evictions"] == 1
+
+def test_sqlite_bans_are_shared_and_expire(clock, tmp_path):
+    path = str(tmp_path / "bans.db")
+    a, b = SqliteBanList(path, ttl=10), SqliteBanList(path, ttl=10)
+    a.close(), b.close()
+    a.add("1.2.3.4")
+    assert "::ffff:1.2.3.4" in b
+    clock.now += 11
+    assert "1.2.3.4" not in b
+    b.expire()
+    assert a._db().execute("SELECT COUNT(*) FROM bans").fetchone()[0] == 0
+
+def test_sqlite_keeps_the_longest_lived_bans_past_capacity(clock, tmp_path):
+    bans = SqliteBanList(str(tmp_path / "bans.db"), ttl=10, max_bans=2)
+    bans.close()
+    bans.add("10.0.0.1", ttl=5)
+    bans.add("10.0.0.2")
+    bans.add("10.0.0.3")
+    bans.expire()
+    assert "10.0.0.1" not in bans and len(bans) == 2
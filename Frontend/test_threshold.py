@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+
+from threshold import ThresholdPolicy
+
+CLASSES = ["DOS", "normal", "U2R"]
+PROBA = np.array([
+    [0.30, 0.60, 0.10],  # intrusion score 0.4
+    [0.10, 0.85, 0.05],  # 0.15
+    [0.05, 0.70, 0.25],  # 0.3, U2R most likely attack
+])
+
+def write_config(path, config):
+    path.write_text(json.dumps(config))
+    return str(path)
+
+def test_without_a_config_verdicts_are_the_argmax():
+    policy = ThresholdPolicy(CLASSES, path=None)
+    assert policy.decide(PROBA) == [("normal", 0.6), ("normal", 0.85), ("normal", 0.7)]
+    assert policy.stats()["mode"] == "argmax"
+
+def test_threshold_applies_to_the_intrusion_score(tmp_path):
+    policy = ThresholdPolicy(CLASSES, write_config(tmp_path / "t.json", {"optimal_threshold": 0.35}))
+    assert policy.decide(PROBA) == [("DOS", 0.4), ("normal", 0.15), ("normal", 0.3)]
+
+def test_per_class_threshold_overrides_the_default(tmp_path):
+    config = {"optimal_threshold": 0.35, "class_thresholds": {"U2R": 0.2}}
+    policy = ThresholdPolicy(CLASSES, write_config(tmp_path / "t.json", config))
+    assert [v[0] for v in policy.decide(PROBA)] == ["DOS", "normal", "U2R"]
+
+def test_config_changes_are_picked_up_and_bad_files_keep_the_last_good(tmp_path):
+    path = tmp_path / "t.json"
+    policy = ThresholdPolicy(CLASSES, write_config(path, {"optimal_threshold": 0.5}), check_interval=0)
+    assert policy.decide(PROBA)[0][0] == "normal"
+    write_config(path, {"optimal_threshold": 0.35})
+    assert policy.decide(PROBA)[0][0] == "DOS"
+    path.write_text('{"optimal_thres')
+    assert policy.decide(PROBA)[0][0] == "DOS"
+    assert policy.stats()["reloads"] == 2
+
+def test_model_without_benign_classes_uses_the_argmax(tmp_path):
+    policy = ThresholdPolicy(["DOS", "U2R"], write_config(tmp_path / "t.json", {"optimal_threshold": 0.1}))
+    assert policy.decide([[0.2, 0.8]]) == [("U2R", 0.8)]
@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import Preprocessor
+from vectorizer import FeatureVectorizer
+
+FEATURES = ["duration", "protocol_type", "src_bytes"]
+
+def make_vectorizer():
+    return FeatureVectorizer(
+        FEATURES,
+        categories={"protocol_type": ["icmp", "tcp", "udp"]},
+        fill_values={"duration": 2.0, "protocol_type": 1.0, "src_bytes": 100.0},
+    )
+
+def test_none_and_nan_get_the_fill_value_like_a_missing_key():
+    vectorizer = make_vectorizer()
+    expected = [2.0, 1.0, 100.0]
+    for record in (
+        {},
+        {"duration": None, "protocol_type": None, "src_bytes": None},
+        {"duration": math.nan, "protocol_type": math.nan, "src_bytes": np.float32("nan")},
+        {"duration": None, "src_bytes": math.nan},
+    ):
+        assert vectorizer.transform(record)[0].tolist() == expected
+
+def test_present_values_are_kept():
+    vectorizer = make_vectorizer()
+    row = vectorizer.transform({"duration": 0, "protocol_type": "udp", "src_bytes": None})
+    assert row[0].tolist() == [0.0, 2.0, 100.0]
+
+def test_batch_fills_only_the_missing_cells():
+    vectorizer = make_vectorizer()
+    X = vectorizer.transform_batch([
+        {"duration": 5, "protocol_type": "tcp", "src_bytes": 7},
+        {"duration": None, "protocol_type": "icmp", "src_bytes": math.nan},
+    ])
+    assert X.tolist() == [[5.0, 1.0, 7.0], [2.0, 0.0, 100.0]]
+
+def test_matches_preprocessor_encode():
+    records = [
+        {"duration": 1, "protocol_type": "tcp", "src_bytes": 10},
+        {"duration": None, "protocol_type": "udp", "src_bytes": 30},
+        {"duration": 3, "protocol_type": None, "src_bytes": math.nan},
+        {"protocol_type": "sctp"},
+    ]
+    preprocessor = Preprocessor().fit(pd.DataFrame(records[:2] + [{"duration": 5, "protocol_type": "tcp",
+                                                                     "src_bytes": 20, "label": "normal"}]))
+    encoded = preprocessor.encode(pd.DataFrame(records))
+    vectorized = preprocessor.vectorizer().transform_batch(records)
+    assert np.array_equal(encoded, vectorized)
+
+def test_decode_inverts_transform_for_another_schema():
+    train = pd.DataFrame({"duration": [1, 2, 3, 4], "protocol_type": ["tcp", "udp", "tcp", "icmp"],
+                          "label": ["normal", "DOS", "normal", "DOS"]})
+    live = Preprocessor().fit(train).set_scaler([2.0, 1.0], [1.5, 0.5])
+    candidate = Preprocessor().fit(train.iloc[:2]).set_scaler([1.0, 0.0], [2.0, 1.0])
+    raw = pd.DataFrame({"duration": [1.0, 4.0], "protocol_type": ["udp", "sctp"]})
+    decoded = live.decode(live.transform(raw.copy()))
+    assert decoded["protocol_type"].tolist() == ["udp", -1.0]
+    assert np.allclose(candidate.transform(decoded), candidate.transform(raw.copy()))
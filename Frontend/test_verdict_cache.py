@@ -0,0 +1,25 @@
+import numpy as np
+
+from verdict_cache import VerdictCache
+
+def test_repeated_rows_cost_one_model_call():
+    cache = VerdictCache()
+    calls = []
+    rows = np.array([[1.0, 2.0], [1.0, 2.0], [3.0, 4.0]], dtype=np.float32)
+    predict = lambda X: calls.append(len(X)) or [f"v{x[0]:.0f}" for x in X]
+    assert cache.predict(predict, rows) == ["v1", "v1", "v3"]
+    assert cache.predict(predict, rows) == ["v1", "v1", "v3"]
+    assert calls == [2]
+
+def test_writes_from_an_older_generation_are_dropped():
+    cache = VerdictCache()
+    cache.invalidate(1)
+    rows = np.array([[1.0, 2.0]], dtype=np.float32)
+
+    def old_model(X):
+        cache.invalidate(2)  # the model is swapped while this batch runs
+        return ["stale"]
+
+    assert cache.predict(old_model, rows, generation=1) == ["stale"]
+    assert cache.predict(lambda X: ["fresh"], rows, generation=2) == ["fresh"]
+    assert cache.stats()["stale_writes"] == 1
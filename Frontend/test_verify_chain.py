@@ -0,0 +1,57 @@
+import json
+
+import verify_chain
+from verify_chain import ZERO_HASH, entry_hash, verify_file
+
+def make_chain(n):
+    entries, prev = [], ZERO_HASH
+    for i in range(n):
+        entry = {"index": i, "timestamp": 1700000000 + i, "ip_address": "10.0.0.1",
+                 "threat_type": "DOS", "action_taken": "BAN", "previous_hash": prev}
+        entry["current_hash"] = prev = entry_hash(entry)
+        entries.append(entry)
+    return entries
+
+def write_snapshot(path, entries, count):
+    with open(path, "w") as f:
+        if count is not None:
+            f.write(json.dumps({"ledger": "test", "count": count}) + "\n")
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    return path
+
+def verify(tmp_path, entries, count):
+    # batch_size 3 puts batch boundaries inside every case below
+    return verify_file(write_snapshot(tmp_path / "ledger.jsonl", entries, count), workers=1, batch_size=3)
+
+def test_intact_chain(tmp_path):
+    assert verify(tmp_path, make_chain(10), 10) == (10, None)
+    assert verify(tmp_path, [], 0) == (0, None)
+
+def test_missing_head_is_caught(tmp_path):
+    checked, failure = verify(tmp_path, make_chain(10)[3:], 10)
+    assert checked == 0 and failure[0] == 0
+
+def test_missing_tail_is_caught(tmp_path):
+    checked, failure = verify(tmp_path, make_chain(10)[:7], 10)
+    assert checked == 7 and failure[0] == 7
+
+def test_gap_in_the_middle_is_caught(tmp_path):
+    entries = make_chain(10)
+    for gap in (1, 3, 4, 8):  # inside a batch and on its boundaries
+        checked, failure = verify(tmp_path, entries[:gap] + entries[gap + 1:], 10)
+        assert failure[0] == gap + 1 and checked == gap
+
+def test_tampered_entry_is_caught(tmp_path):
+    entries = make_chain(10)
+    entries[5] = {**entries[5], "threat_type": "normal"}
+    checked, failure = verify(tmp_path, entries, 10)
+    assert checked == 5 and failure[0] == 5
+
+def test_snapshot_without_count_is_rejected(tmp_path):
+    checked, failure = verify(tmp_path, make_chain(3), None)
+    assert failure is not None
+
+def test_check_link_requires_a_zero_hash_at_the_start():
+    assert verify_chain.check_link(None, (0, "ab" * 32, "cd" * 32)) is not None
+    assert verify_chain.check_link(None, (0, ZERO_HASH, "cd" * 32)) is None
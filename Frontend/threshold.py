@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from labels import is_benign
+
+# ---------------------------------------------------------
+# DECISION THRESHOLDS
+# ---------------------------------------------------------
+# Turns predict_proba into verdicts with the notebook's tuned intrusion
+# threshold (threshold_config.json), else the plain argmax.
+
+class ThresholdPolicy:
+    def __init__(self, classes, path=None, check_interval=1.0):
+        self.classes = [str(c) for c in classes]
+        self.path = path
+        self.check_interval = check_interval
+        self._benign = np.array([is_benign(c) for c in self.classes])
+
+        self._lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0.0
+        self._config = {}
+        self._cutoffs = None  # per-class score threshold, or None for plain argmax
+        self.reloads = 0
+        self._check_file(time.monotonic())
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_size, st.st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
+    def _check_file(self, now):
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            signature = self._file_signature()
+            if signature == self._signature:
+                return
+            self._signature = signature
+            try:
+                config = {}
+                if signature is not None:
+                    with open(self.path, "r") as f:
+                        config = json.load(f)
+                self._config, self._cutoffs = config, self._compile(config)
+                self.reloads += 1
+            except (OSError, ValueError) as e:
+                # Keep the last good config; a half-written file is retried next check
+                self._signature = None
+                print(f"⚠️ Error loading threshold config {self.path}: {e}")
+
+    def _compile(self, config):
+        if "optimal_threshold" not in config and "class_thresholds" not in config:
+            return None
+        if not self._benign.any() or self._benign.all():
+            return None
+        default = float(config.get("optimal_threshold", 0.5))
+        overrides = config.get("class_thresholds", {})
+        return np.array([float(overrides.get(c, default)) for c in self.classes], dtype=np.float64)
+
+    def decide(self, probabilities):
+        """[(threat_type, score)] for every row of a predict_proba matrix."""
+        self._check_file(time.monotonic())
+        proba = np.asarray(probabilities, dtype=np.float64)
+        cutoffs = self._cutoffs
+        if cutoffs is None:
+            best = np.argmax(proba, axis=1)
+            scores = proba[np.arange(len(proba)), best]
+            return [(self.classes[i], round(float(s), 4)) for i, s in zip(best, scores)]
+
+        scores = 1.0 - proba[:, self._benign].sum(axis=1)
+        attack = np.argmax(np.where(self._benign, -1.0, proba), axis=1)
+        benign = np.argmax(np.where(self._benign, proba, -1.0), axis=1)
+        chosen = np.where(scores >= cutoffs[attack], attack, benign)
+        return [(self.classes[i], round(float(s), 4)) for i, s in zip(chosen, scores)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "loaded": self._signature is not None,
+                "mode": "argmax" if self._cutoffs is None else "threshold",
+                "config": self._config,
+                "reloads": self.reloads,
+            }
@@ -0,0 +1,101 @@
+import threading
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+# ---------------------------------------------------------
+# FEATURE VECTORIZER
+# ---------------------------------------------------------
+# Compiled from preprocessing.json: fills, category codes and scaling for each
+# record, written into a per-thread float32 buffer. transform() returns a view
+# of that buffer, valid until the same thread calls it again.
+
+UNSEEN_CATEGORY = -1.0  # LabelEncoder has no code for values it never saw in training
+MISSING = float("nan")
+
+class FeatureVectorizer:
+    def __init__(self, features, categories=None, fill_values=None, scaler_mean=None, scaler_scale=None):
+        self.features = list(features)
+        self.n_features = len(self.features)
+        self._positions = {name: j for j, name in enumerate(self.features)}
+
+        # column -> {category string: code}, in LabelEncoder order (sorted classes)
+        self._vocab = {
+            self._positions[name]: {str(value): float(code) for code, value in enumerate(classes)}
+            for name, classes in (categories or {}).items() if name in self._positions
+        }
+
+        fill = [0.0] * self.n_features
+        for name, value in (fill_values or {}).items():
+            if name in self._positions:
+                fill[self._positions[name]] = float(value)
+        # Complete records (the common case) are read in C by one itemgetter;
+        # records with missing fields fall back to dict.get per column. Missing
+        # values travel as NaN and get their fill value in one masked step.
+        self._getter = itemgetter(*self.features)
+        self._fill = np.array(fill, dtype=np.float32)
+
+        self._mean = None if scaler_mean is None else np.asarray(scaler_mean, dtype=np.float32)
+        self._scale = None
+        if scaler_scale is not None:
+            scale = np.asarray(scaler_scale, dtype=np.float32)
+            self._scale = np.where(scale == 0, 1, scale).astype(np.float32)
+
+        self._local = threading.local()
+
+    @classmethod
+    def from_file(cls, path, features):
+        """Loads the notebook's preprocessing.json, or an identity schema if it is absent."""
+        from preprocessing import Preprocessor  # preprocessing builds vectorizers: import on use
+        return Preprocessor.from_file(path, features).vectorizer()
+
+    def _buffer(self, n_rows):
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] < n_rows:
+            # Grow geometrically so a steady stream of batches stops allocating
+            capacity = max(n_rows, 2 * (buf.shape[0] if buf is not None else 32))
+            buf = np.empty((capacity, self.n_features), dtype=np.float32)
+            self._local.buf = buf
+        return buf[:n_rows]
+
+    def _row(self, record):
+        try:
+            values = self._getter(record)
+        except KeyError:
+            values = [record.get(name, MISSING) for name in self.features]
+        if None in values:
+            values = [MISSING if v is None else v for v in values]
+        if self._vocab:
+            values = list(values)
+            for j, codes in self._vocab.items():
+                # Raw category strings are encoded; numbers are taken as already-encoded codes
+                if isinstance(values[j], str):
+                    values[j] = codes.get(values[j], UNSEEN_CATEGORY)
+        return values
+
+    def _fill_missing(self, out):
+        # One unconditional masked copy; a nan.any() branch costs more than it saves
+        np.copyto(out, self._fill, where=np.isnan(out))
+        return out
+
+    def _scale_inplace(self, out):
+        if self._mean is not None:
+            np.subtract(out, self._mean, out=out)
+        if self._scale is not None:
+            np.divide(out, self._scale, out=out)
+        return out
+
+    def transform(self, record):
+        """One record -> (1, n_features) float32 view."""
+        out = self._buffer(1)
+        out[0] = np.fromiter(self._row(record), dtype=np.float32, count=self.n_features)
+        return self._scale_inplace(self._fill_missing(out))
+
+    def transform_batch(self, records):
+        """Many records -> (n_records, n_features) contiguous float32 view."""
+        out = self._buffer(len(records))
+        # fromiter converts straight into float32, with no intermediate float64 array
+        values = chain.from_iterable(map(self._row, records))
+        out.reshape(-1)[:] = np.fromiter(values, dtype=np.float32, count=out.size)
+        return self._scale_inplace(self._fill_missing(out))
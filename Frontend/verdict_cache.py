@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------------------------------------------------
+# VERDICT CACHE
+# ---------------------------------------------------------
+# Remembers the verdict per rounded feature vector for `ttl` seconds (LRU,
+# keyed by a 64-bit hash). A model swap or file change clears it, and writes
+# from an older model generation are dropped.
+
+class VerdictCache:
+    def __init__(self, max_entries=100000, ttl=60.0, decimals=4, watch_paths=(), check_interval=1.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.decimals = decimals
+        self.watch_paths = [p for p in watch_paths if p]
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (verdict, expires_at), oldest first
+        self._generation = None
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0,
+                       "stale_writes": 0}
+        self._signature = self._file_signature()
+        self._next_check = time.monotonic() + check_interval
+
+    def _file_signature(self):
+        signature = []
+        for path in self.watch_paths:
+            # A directory (flat forest) changes when any file in it does
+            try:
+                files = [os.path.join(path, f) for f in sorted(os.listdir(path))]
+            except OSError:
+                files = [path]
+            for f in files:
+                try:
+                    st = os.stat(f)
+                    signature.append((f, st.st_size, st.st_mtime_ns))
+                except OSError:
+                    signature.append((f, None, None))
+        return tuple(signature)
+
+    def _check_files(self, now):
+        if not self.watch_paths or now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        signature = self._file_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self.invalidate()
+
+    def keys(self, features):
+        """One hash per row of a 2-D feature matrix."""
+        quantized = np.round(np.asarray(features, dtype=np.float32), self.decimals)
+        quantized += 0.0  # -0.0 -> 0.0, so both round to the same key
+        return [hash(row.tobytes()) for row in quantized]
+
+    def get_many(self, keys):
+        """Cached verdict per key, or None for a miss."""
+        now = time.monotonic()
+        self._check_files(now)
+        verdicts = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] <= now:
+                    del self._entries[key]
+                    self._stats["expired"] += 1
+                    entry = None
+                if entry is None:
+                    self._stats["misses"] += 1
+                    verdicts.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    verdicts.append(entry[0])
+        return verdicts
+
+    def put_many(self, keys, verdicts, generation=None):
+        """Stores verdicts computed under `generation`; dropped if the cache has moved past it."""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation != self._generation:
+                self._stats["stale_writes"] += 1
+                return
+            for key, verdict in zip(keys, verdicts):
+                self._entries[key] = (verdict, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def predict(self, model_predict, features, generation=None):
+        """
+        Verdicts for every row of `features`. Rows that miss the cache are
+        passed to model_predict in a single call, once per distinct key, so a
+        batch full of one flood record costs one inference. `generation` is
+        the serving generation model_predict runs on.
+        """
+        keys = self.keys(features)
+        verdicts = self.get_many(keys)
+        first_row = {}
+        for i, verdict in enumerate(verdicts):
+            if verdict is None:
+                first_row.setdefault(keys[i], i)
+        if first_row:
+            fresh = dict(zip(first_row, model_predict(features[list(first_row.values())])))
+            for i, key in enumerate(keys):
+                if verdicts[i] is None:
+                    verdicts[i] = fresh[key]
+            self.put_many(list(fresh), list(fresh.values()), generation)
+        return verdicts
+
+    def invalidate(self, generation=None):
+        """Clears the cache; with a generation, only writes made under it are kept from now on."""
+        with self._lock:
+            self._entries.clear()
+            if generation is not None:
+                self._generation = generation
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["size"] = len(self._entries)
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = round(snapshot["hits"] / lookups, 4) if lookups else 0
+        snapshot["capacity"] = self.max_entries
+        return snapshot
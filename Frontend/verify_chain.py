@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from itertools import islice
+from multiprocessing import Pool
+
+# ---------------------------------------------------------
+# OFFLINE HASH-CHAIN VERIFIER
+# ---------------------------------------------------------
+# Checks a ledger's previous_hash -> current_hash chain from a JSONL snapshot
+# in a process pool, with no RPC per log. Run without arguments for usage.
+
+ZERO_HASH = "00" * 32
+
+def entry_hash(entry):
+    data = f"{entry['ip_address']}{entry['threat_type']}{entry['action_taken']}{entry['timestamp']}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+def check_batch(lines):
+    """
+    Worker: parses and checks one batch of snapshot lines on its own.
+    Returns (first_entry, last_entry, verified, failure) where the entries
+    are (index, previous_hash, current_hash) so the parent can check the
+    links between batches, verified counts the lines that passed, and
+    failure is (index, reason) or None.
+    """
+    first = last = None
+    verified = 0
+    for line in lines:
+        entry = json.loads(line)
+        index, prev, cur = entry["index"], entry["previous_hash"].lower(), entry["current_hash"].lower()
+
+        if last is not None:
+            failure = check_link(last, (index, prev, cur))
+            if failure:
+                return first, last, verified, failure
+        if entry_hash(entry) != cur:
+            return first, last, verified, (index, "current_hash does not match sha256(ip + threat + action + timestamp)")
+
+        last = (index, prev, cur)
+        if first is None:
+            first = last
+        verified += 1
+    return first, last, verified, None
+
+def check_link(before, entry):
+    """Checks that `entry` directly follows `before` in the ledger."""
+    index, prev, _ = entry
+    if before is None:
+        if index != 0:
+            return 0, f"log #0 is missing (snapshot starts at #{index})"
+        if prev != ZERO_HASH:
+            return index, "log #0 must have an all-zero previous_hash"
+        return None
+    if index != before[0] + 1:
+        return index, f"log #{before[0] + 1} is missing (jumped from #{before[0]} to #{index})"
+    if prev != before[2]:
+        return index, f"previous_hash does not match current_hash of log #{before[0]}"
+    return None
+
+def check_count(checked, count):
+    """Checks that the snapshot held every log the ledger counts on-chain."""
+    if checked < count:
+        return checked, f"log #{checked} is missing (ledger counts {count} logs, snapshot ends after {checked})"
+    if checked > count:
+        return count, f"snapshot has {checked} logs but the ledger counts only {count}"
+    return None
+
+def verify_file(path, workers=None, batch_size=20000):
+    """Returns (entries_checked, failure) for a snapshot file."""
+    workers = workers or os.cpu_count() or 1
+    with Pool(workers) as pool, open(path, "r") as f:
+        lines = (line for line in f if line.strip())
+        header = json.loads(next(lines, "{}"))
+        if "count" not in header:
+            # Without the on-chain count a truncated tail would look intact
+            return 0, (0, "snapshot has no ledger count line; dump it again with --dump")
+        count = header["count"]
+        window = workers * 2
+        previous = None
+        checked = 0
+
+        while True:
+            batches = [b for b in (list(islice(lines, batch_size)) for _ in range(window)) if b]
+            if not batches:
+                return checked, check_count(checked, count)
+
+            for first, last, verified, failure in pool.map(check_batch, batches):
+                if first is not None:
+                    boundary = check_link(previous, first)
+                    if boundary:
+                        return checked, boundary
+                # Lines that passed, not an index difference: a gap in the
+                # indices inside the batch would be counted as entries
+                checked += verified
+                if failure:
+                    return checked, failure
+                previous = last
+
+# ---------------------------------------------------------
+# SNAPSHOT DUMP (RPC)
+# ---------------------------------------------------------
+
+async def dump_ledger(ledger_address_str, out_path, concurrency=8):
+    """Writes every Log of one ledger to a snapshot file, fetching PDA batches in parallel."""
+    from solders.pubkey import Pubkey
+    from solana_handler import FETCH_BATCH_SIZE, RayguardHandler, derive_log_pda
+
+    ledger_pubkey = Pubkey.from_string(ledger_address_str)
+    async with RayguardHandler() as handler:
+        count = (await handler.program.account["Ledger"].fetch(ledger_pubkey)).count
+        print(f"📥 Dumping {count} logs from {ledger_address_str}")
+
+        async def fetch(start):
+            pdas = [derive_log_pda(ledger_pubkey, i) for i in range(start, min(start + FETCH_BATCH_SIZE, count))]
+            return start, await handler.program.account["Log"].fetch_multiple(pdas, batch_size=FETCH_BATCH_SIZE)
+
+        starts = range(0, count, FETCH_BATCH_SIZE)
+        with open(out_path, "w") as out:
+            out.write(json.dumps({"ledger": ledger_address_str, "count": count}) + "\n")
+            # Fetch `concurrency` batches at a time, write them in index order
+            for w in range(0, len(starts), concurrency):
+                for start, logs in await asyncio.gather(*(fetch(s) for s in starts[w:w + concurrency])):
+                    for i, log in enumerate(logs, start):
+                        if log is None:
+                            continue  # left out; verification reports it as missing, whatever its index
+                        out.write(json.dumps({
+                            "index": i,
+                            "timestamp": log.timestamp,
+                            "ip_address": log.ip_address,
+                            "threat_type": log.threat_type,
+                            "action_taken": log.action_taken,
+                            "previous_hash": bytes(log.previous_hash).hex(),
+                            "current_hash": bytes(log.current_hash).hex(),
+                        }) + "\n")
+    print(f"✅ Snapshot written to {out_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify a rayguard ledger's hash chain offline.")
+    parser.add_argument("snapshot", nargs="?", help="snapshot file (JSON lines) to verify")
+    parser.add_argument("--dump", metavar="LEDGER", help="dump this ledger's logs from RPC first")
+    parser.add_argument("--out", help="snapshot path to write with --dump (verified afterwards)")
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=20000, help="lines per worker task")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel RPC batches for --dump")
+    args = parser.parse_args()
+
+    path = args.snapshot
+    if args.dump:
+        path = args.out or f"{args.dump}.jsonl"
+        asyncio.run(dump_ledger(args.dump, path, args.concurrency))
+    if not path:
+        parser.error("give a snapshot file or --dump LEDGER")
+
+    checked, failure = verify_file(path, args.workers, args.batch_size)
+    if failure:
+        index, reason = failure
+        print(f"❌ Chain broken at log #{index}: {reason} ({checked} entries verified before it)")
+        sys.exit(1)
+    print(f"✅ Chain intact: {checked} entries verified")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import main
+
+# ---------------------------------------------------------
+# WSGI ENTRY POINT
+# ---------------------------------------------------------
+# For WSGI servers that import the app (gunicorn wsgi:app). Don't use
+# --preload; see README.md.
+
+main.start()
+app = main.app
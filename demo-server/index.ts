@@ -4,7 +4,14 @@ import z from "zod";
 import HttpSms from "httpsms";
 import { createChannel, createResponse } from "better-sse";
 
-import { Connection, Keypair, PublicKey } from "@solana/web3.js";
+import {
+  Connection,
+  Keypair,
+  PACKET_DATA_SIZE,
+  PublicKey,
+  Transaction,
+  type TransactionInstruction,
+} from "@solana/web3.js";
 import { AnchorProvider, BN, Program } from "@coral-xyz/anchor";
 import IDL from "../rayguard-program/target/idl/rayguard_program.json";
 import { type RayguardProgram } from "../rayguard-program/target/types/rayguard_program";
@@ -36,6 +43,73 @@ const provider = new AnchorProvider(
 
 const program = new Program<RayguardProgram>(IDL as RayguardProgram, provider);
 
+// At most this many add_log instructions per transaction (compute budget); fewer
+// when long strings or IPv6 addresses would push it past PACKET_DATA_SIZE
+const MAX_LOGS_PER_TX = 8;
+const SIZING_BLOCKHASH = PublicKey.default.toBase58(); // any 32 bytes: only the size is read
+
+// Bytes on the wire for a transaction of `ixs` signed by our wallet alone
+function transactionSize(ixs: TransactionInstruction[]): number {
+  try {
+    const message = new Transaction({
+      feePayer: provider.publicKey,
+      blockhash: SIZING_BLOCKHASH,
+      lastValidBlockHeight: 0,
+    })
+      .add(...ixs)
+      .serializeMessage();
+    return 1 + 64 + message.length;
+  } catch {
+    return Infinity; // web3.js can't even lay the message out in a packet
+  }
+}
+
+const isTooLarge = (e: unknown) =>
+  e instanceof RangeError || /too large/i.test(String(e));
+
+// Every add_log derives its log PDA from ledger.count, so writes to the same
+// ledger are chained one after another instead of racing for the same PDA.
+const ledgerQueues = new Map<string, Promise<unknown>>();
+
+function withLedgerLock<T>(ledger: string, fn: () => Promise<T>): Promise<T> {
+  const prev = ledgerQueues.get(ledger) ?? Promise.resolve();
+  const next = prev.then(fn, fn);
+  const tail = next.catch(() => {});
+  ledgerQueues.set(ledger, tail);
+  tail.then(() => {
+    if (ledgerQueues.get(ledger) === tail) ledgerQueues.delete(ledger);
+  });
+  return next;
+}
+
+// (ledger, ip, threat, action) -> latest matching log, so /verify never has to
+// scan every Log account of the program. Fed by our own writes and by
+// targeted backfills of a single ledger's log PDAs; `index` (the log's
+// position in its ledger) decides which of two matching logs is the latest.
+type IndexedLog = { log: string; signature: string | null; index: number };
+const verifyIndex = new Map<string, IndexedLog>();
+const scannedThrough = new Map<string, number>();
+const FETCH_BATCH_SIZE = 100;
+
+const indexKey = (
+  ledger: string,
+  ipAddress: string,
+  threatType: string,
+  actionTaken: string,
+) => [ledger, ipAddress, threatType, actionTaken].join("|");
+
+const logPda = (ledger: PublicKey, index: BN) =>
+  PublicKey.findProgramAddressSync(
+    [Buffer.from("log"), ledger.toBuffer(), index.toArrayLike(Buffer, "le", 8)],
+    program.programId,
+  )[0];
+
+// Writes and backfills can finish in any order: an entry only ever moves to a newer log
+function indexLog(key: string, entry: IndexedLog) {
+  const current = verifyIndex.get(key);
+  if (!current || current.index < entry.index) verifyIndex.set(key, entry);
+}
+
 app.post(
   "/createLedger",
   zValidator(
@@ -78,23 +152,137 @@ app.post(
 
     const { ledger, actionTaken, ipAddress, threatType } = d;
 
-    await program.methods
-      .addLog({
-        ipAddress,
-        threatType,
-        actionTaken,
-      })
-      .accounts({ ledger: new PublicKey(ledger) })
-      .rpc({
-        skipPreflight: true,
-        preflightCommitment: "processed",
-        commitment: "processed",
-      });
+    const ledgerPubkey = new PublicKey(ledger);
+    const { signature, pda, index } = await withLedgerLock(ledger, async () => {
+      const { count } = await program.account.ledger.fetch(
+        ledgerPubkey,
+        "processed",
+      );
+      const pda = logPda(ledgerPubkey, count);
+      const signature = await program.methods
+        .addLog({
+          ipAddress,
+          threatType,
+          actionTaken,
+        })
+        .accountsPartial({
+          ledger: ledgerPubkey,
+          log: pda,
+          authority: provider.publicKey,
+        })
+        .rpc({
+          skipPreflight: true,
+          preflightCommitment: "processed",
+          commitment: "processed",
+        });
+      return { signature, pda, index: count.toNumber() };
+    });
+
+    indexLog(indexKey(ledger, ipAddress, threatType, actionTaken), {
+      log: pda.toBase58(),
+      signature,
+      index,
+    });
 
     return c.json({});
   },
 );
 
+app.post(
+  "/addLogs",
+  zValidator(
+    "json",
+    z.object({
+      ledger: z.string(),
+      logs: z
+        .array(
+          z.object({
+            ipAddress: z.string(),
+            threatType: z.string(),
+            actionTaken: z.string(),
+          }),
+        )
+        .min(1),
+    }),
+  ),
+  async (c) => {
+    const { ledger, logs } = c.req.valid("json");
+
+    for (const log of logs) channel.broadcast({ ledger, ...log }, "message");
+
+    const ledgerPubkey = new PublicKey(ledger);
+
+    // Instruction k of a transaction runs after k-1 bumped ledger.count, so it
+    // writes log PDA count+k and links to the previous entry's hash as usual.
+    // Each transaction takes as many logs as fit in one packet.
+    const signatures = await withLedgerLock(ledger, async () => {
+      const sent: string[] = [];
+      let limit = MAX_LOGS_PER_TX;
+      for (let start = 0; start < logs.length; ) {
+        const { count } = await program.account.ledger.fetch(
+          ledgerPubkey,
+          "processed",
+        );
+
+        const pdas: PublicKey[] = [];
+        const ixs: TransactionInstruction[] = [];
+        for (const log of logs.slice(start, start + limit)) {
+          const pda = logPda(ledgerPubkey, count.addn(ixs.length));
+          const ix = await program.methods
+            .addLog(log)
+            .accountsPartial({
+              ledger: ledgerPubkey,
+              log: pda,
+              authority: provider.publicKey,
+            })
+            .instruction();
+          if (ixs.length > 0 && transactionSize([...ixs, ix]) > PACKET_DATA_SIZE)
+            break;
+          pdas.push(pda);
+          ixs.push(ix);
+        }
+        const chunk = logs.slice(start, start + ixs.length);
+
+        let signature: string;
+        try {
+          signature = await provider.sendAndConfirm(
+            new Transaction().add(...ixs),
+            [],
+            {
+              skipPreflight: true,
+              preflightCommitment: "processed",
+              commitment: "processed",
+            },
+          );
+        } catch (e) {
+          // Nothing landed: send the same logs again in smaller transactions
+          if (ixs.length > 1 && isTooLarge(e)) {
+            limit = Math.floor(ixs.length / 2);
+            continue;
+          }
+          throw e;
+        }
+        sent.push(signature);
+        start += ixs.length;
+
+        chunk.forEach((log, offset) =>
+          indexLog(
+            indexKey(ledger, log.ipAddress, log.threatType, log.actionTaken),
+            {
+              log: pdas[offset].toBase58(),
+              signature,
+              index: count.toNumber() + offset,
+            },
+          ),
+        );
+      }
+      return sent;
+    });
+
+    return c.json({ signatures });
+  },
+);
+
 app.post(
   "/verify",
   zValidator(
@@ -111,21 +299,52 @@ app.post(
 
     try {
       const ledgerPubkey = new PublicKey(ledger);
+      const key = indexKey(ledger, ipAddress, threatType, actionTaken);
 
-      const logs = await program.account.log.all();
+      let hit = verifyIndex.get(key);
+      if (!hit) {
+        // Targeted lookup: only this ledger's log PDAs that are not indexed yet
+        const count = (
+          await program.account.ledger.fetch(ledgerPubkey)
+        ).count.toNumber();
+        for (
+          let start = scannedThrough.get(ledger) ?? 0;
+          start < count;
+          start += FETCH_BATCH_SIZE
+        ) {
+          const pdas: PublicKey[] = [];
+          for (let i = start; i < Math.min(start + FETCH_BATCH_SIZE, count); i++)
+            pdas.push(logPda(ledgerPubkey, new BN(i)));
 
-      const isVerified = logs.some(
-        (log) =>
-          log.account.ipAddress === ipAddress &&
-          log.account.threatType === threatType &&
-          log.account.actionTaken === actionTaken,
-      );
+          const accounts = await program.account.log.fetchMultiple(pdas);
+          accounts.forEach((log, j) => {
+            if (!log) return;
+            indexLog(
+              indexKey(ledger, log.ipAddress, log.threatType, log.actionTaken),
+              { log: pdas[j].toBase58(), signature: null, index: start + j },
+            );
+          });
+          scannedThrough.set(ledger, start + pdas.length);
+        }
+        hit = verifyIndex.get(key);
+      }
+
+      if (hit && !hit.signature) {
+        // A log PDA is only ever touched by the transaction that created it
+        const [first] = await connection.getSignaturesForAddress(
+          new PublicKey(hit.log),
+          { limit: 1 },
+        );
+        hit.signature = first?.signature ?? null;
+      }
 
-      if (isVerified) {
+      if (hit) {
         return c.json({
           success: true,
           message: "Log verified on-chain",
           verified: true,
+          log: hit.log,
+          proof: hit.signature,
         });
       } else {
         return c.json({
@@ -0,0 +1,659 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# preprocessing.py and forest.py are shared with the server
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Frontend"))
+from preprocessing import Preprocessor, target_column
+
+# ---------------------------------------------------------
+# TRAINING PIPELINE
+# ---------------------------------------------------------
+# model.ipynb as a cached, parallel script, run from the repo root. A stage
+# re-runs only when its parameters or inputs change; --stream trains on CSVs
+# larger than memory. Usage is in Frontend/README.md.
+
+STAGE_VERSIONS = {"preprocess": 3, "smote": 1, "tune": 1, "model": 1, "distill": 1}
+
+DEFAULTS = {
+    "split": {"test_size": 0.20, "val_size": 0.25, "seed": 42},
+    "smote": {"k_neighbors": 5, "seed": 42},
+    "rf": {"n_estimators": 100, "max_depth": 20, "min_samples_split": 5, "min_samples_leaf": 2,
+           "random_state": 42, "class_weight": "balanced"},
+    "xgb": {"n_estimators": 100, "max_depth": 6, "learning_rate": 0.1, "subsample": 0.8,
+            "colsample_bytree": 0.8, "random_state": 42, "eval_metric": "logloss", "tree_method": "hist"},
+    "mlp": {"hidden_layer_sizes": [128, 64, 32], "activation": "relu", "solver": "adam", "alpha": 0.001,
+            "batch_size": 256, "learning_rate": "adaptive", "max_iter": 100, "random_state": 42,
+            "early_stopping": True, "validation_fraction": 0.1},
+    "threshold": {"min_precision": 0.70, "max_recall": 0.95, "low": 0.2, "high": 0.8},
+    "distill": {"depths": [2, 4, 6, 8], "min_samples_leaf": 20, "max_disagreement": 0.005,
+                "max_rows": 200000, "latency_batch": 32, "seed": 42},
+}
+CANDIDATES = ("rf", "xgb", "mlp")
+STREAM_CANDIDATES = ("rf", "xgb")
+
+def stage_key(stage, *parts):
+    blob = json.dumps([STAGE_VERSIONS[stage], *parts], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class Cache:
+    def __init__(self, root):
+        self.root = root
+        self.hits, self.misses = [], []
+
+    def path(self, stage, key):
+        return os.path.join(self.root, f"{stage}-{key}")
+
+    def get(self, stage, key):
+        path = self.path(stage, key)
+        if os.path.isdir(path):
+            self.hits.append(stage)
+            return path
+        return None
+
+    def scratch(self, stage, key):
+        """An empty directory to build a stage's output in."""
+        tmp = f"{self.path(stage, key)}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        return tmp
+
+    def publish(self, stage, key, tmp):
+        """Moves a finished scratch directory into place in one rename."""
+        path = self.path(stage, key)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp)  # a parallel run published the same key first
+        self.misses.append(stage)
+        return path
+
+    def put(self, stage, key, build):
+        """Runs build(tmp_dir) in this process and publishes its output."""
+        tmp = self.scratch(stage, key)
+        build(tmp)
+        return self.publish(stage, key, tmp)
+
+def load_arrays(path, *names):
+    return [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in names]
+
+def read_json(path, name):
+    with open(os.path.join(path, name), "r") as f:
+        return json.load(f)
+
+def write_json(path, name, data):
+    with open(os.path.join(path, name), "w") as f:
+        json.dump(data, f, indent=2, default=float)
+
+# ---------------------------------------------------------
+# STAGES
+# ---------------------------------------------------------
+
+def read_data(data_path, chunk_rows):
+    """A callable giving the CSV as [one frame], or as a fresh iterator of chunk_rows-row frames."""
+    if not chunk_rows:
+        frame = pd.read_csv(data_path)
+        return lambda: [frame]
+    return lambda: pd.read_csv(data_path, chunksize=chunk_rows)
+
+def preprocess(data_path, split, chunk_rows, out):
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    chunks = read_data(data_path, chunk_rows)
+    pre = Preprocessor().fit(chunks())
+
+    # Second pass: each chunk is encoded straight into one float32 matrix, so
+    # no DataFrame outlives its chunk
+    all_path = os.path.join(out, "X_all.npy")
+    X = np.lib.format.open_memmap(all_path, mode="w+", dtype=np.float32, shape=(pre.n_rows, len(pre.features)))
+    y = np.empty(pre.n_rows, dtype=np.int8)
+    row = 0
+    for chunk in chunks():
+        pre.encode(chunk, out=X[row:row + len(chunk)])
+        y[row:row + len(chunk)] = pre.labels(chunk[pre.target])
+        row += len(chunk)
+
+    # Splitting row numbers shuffles exactly as splitting the frame did
+    idx_temp, idx_test = train_test_split(
+        np.arange(pre.n_rows), test_size=split["test_size"], random_state=split["seed"], stratify=y)
+    idx_train, idx_val = train_test_split(
+        idx_temp, test_size=split["val_size"], random_state=split["seed"], stratify=y[idx_temp])
+
+    X_train = X[idx_train]
+    scaler = StandardScaler().fit(X_train)
+    pre.set_scaler(scaler.mean_, scaler.scale_)
+    # Scaled by pre.scale, the same float32 arithmetic the server's vectorizer does
+    for name, idx, features in (("train", idx_train, X_train), ("val", idx_val, None), ("test", idx_test, None)):
+        features = X[idx] if features is None else features
+        np.save(os.path.join(out, f"X_{name}.npy"), pre.scale(features))
+        np.save(os.path.join(out, f"y_{name}.npy"), y[idx])
+    del X, X_train
+    os.remove(all_path)
+
+    pre.save(os.path.join(out, "preprocessing.json"))
+
+SPLITS = ("train", "val", "test")
+
+def compact_dtypes(data_path, sample_rows=10000):
+    """float32 for numeric columns and category for the rest, from a sample of the file."""
+    sample = pd.read_csv(data_path, nrows=sample_rows)
+    dtypes = {col: np.float32 if pd.api.types.is_numeric_dtype(sample[col]) else "category"
+              for col in sample.columns}
+    # Labels stay strings: a float32 0 would read as "0.0", not benign
+    dtypes[target_column(sample.columns)] = "category"
+    return dtypes
+
+def split_rows(chunk_index, n, split):
+    """0/1/2 (train/val/test) per row of one chunk; the same on every pass."""
+    u = np.random.default_rng([split["seed"], chunk_index]).random(n)
+    val_cut = split["test_size"] + (1 - split["test_size"]) * split["val_size"]
+    return (u < val_cut).astype(np.int8) + (u < split["test_size"])
+
+def preprocess_stream(data_path, split, chunk_rows, out):
+    """
+    preprocess() for files larger than memory: three passes, at most one
+    chunk of rows in memory at a time.
+      1. Preprocessor.fit over the chunks, counting each split's rows
+      2. encode each chunk and append its rows to the split's .npy memmap,
+         partial_fit'ing the scaler on the training rows
+      3. scale the memmaps in place, chunk_rows at a time
+    Rows are assigned to splits by a per-chunk seeded draw, so the split
+    proportions hold per class in expectation rather than exactly.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    dtypes = compact_dtypes(data_path)
+    def chunks():
+        return pd.read_csv(data_path, chunksize=chunk_rows, dtype=dtypes)
+
+    sizes = np.zeros(len(SPLITS), dtype=np.int64)
+    def counted(frames):
+        for i, chunk in enumerate(frames):
+            sizes[:] += np.bincount(split_rows(i, len(chunk), split), minlength=len(SPLITS))
+            yield chunk
+
+    pre = Preprocessor().fit(counted(chunks()))
+    n_features = len(pre.features)
+    arrays = [
+        (np.lib.format.open_memmap(os.path.join(out, f"X_{name}.npy"), mode="w+", dtype=np.float32,
+                                   shape=(int(size), n_features)),
+         np.lib.format.open_memmap(os.path.join(out, f"y_{name}.npy"), mode="w+", dtype=np.int8,
+                                   shape=(int(size),)))
+        for name, size in zip(SPLITS, sizes)
+    ]
+
+    scaler = StandardScaler()
+    filled = [0] * len(SPLITS)
+    for i, chunk in enumerate(chunks()):
+        X, y = pre.encode(chunk), pre.labels(chunk[pre.target])
+        part = split_rows(i, len(chunk), split)
+        for k, (X_split, y_split) in enumerate(arrays):
+            mask = part == k
+            rows = int(mask.sum())
+            if not rows:
+                continue
+            X_split[filled[k]:filled[k] + rows] = X[mask]
+            y_split[filled[k]:filled[k] + rows] = y[mask]
+            filled[k] += rows
+            if k == 0:
+                scaler.partial_fit(X[mask])
+
+    pre.set_scaler(scaler.mean_, scaler.scale_)
+    for X_split, y_split in arrays:
+        for start in range(0, len(X_split), chunk_rows):
+            pre.scale(X_split[start:start + chunk_rows])
+        X_split.flush()
+        y_split.flush()
+    del arrays
+
+    pre.save(os.path.join(out, "preprocessing.json"))
+
+def smote(preprocessed, params, out):
+    from imblearn.over_sampling import SMOTE
+
+    X_train, y_train = load_arrays(preprocessed, "X_train", "y_train")
+    X_bal, y_bal = SMOTE(random_state=params["seed"], k_neighbors=params["k_neighbors"]).fit_resample(
+        np.asarray(X_train), np.asarray(y_train))
+    np.save(os.path.join(out, "X.npy"), X_bal)
+    np.save(os.path.join(out, "y.npy"), y_bal)
+
+def build_model(name, params, n_jobs):
+    params = dict(params)
+    if name == "rf":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_jobs=n_jobs, **params)
+    if name == "xgb":
+        import xgboost as xgb
+        return xgb.XGBClassifier(n_jobs=n_jobs, **params)
+    if name == "mlp":
+        from sklearn.neural_network import MLPClassifier
+        params["hidden_layer_sizes"] = tuple(params["hidden_layer_sizes"])
+        return MLPClassifier(**params)
+    raise ValueError(f"Unknown candidate '{name}', expected one of {CANDIDATES}")
+
+def fit_out_of_core(name, params, n_jobs, X, y, block_rows, out):
+    """
+    Fits on memmapped training rows without loading them. No SMOTE here:
+    the forest keeps class_weight="balanced" and XGBoost gets scale_pos_weight.
+      rf   warm-start forest: each fit adds its share of the trees, grown on
+           a fresh random sample of block_rows rows (spread over the whole
+           file, not one contiguous stretch of it)
+      xgb  XGBoost external memory: a DataIter hands it block_rows rows at a
+           time and it pages its own quantized copy under `out`
+    """
+    n = len(y)
+    if name == "rf":
+        n_trees = params["n_estimators"]
+        fits = max(1, min(n_trees, -(-n // block_rows)))
+        rng = np.random.default_rng(params.get("random_state"))
+        model = build_model(name, dict(params, n_estimators=0, warm_start=True), n_jobs)
+        for i in range(fits):
+            rows = np.sort(rng.choice(n, size=min(block_rows, n), replace=False))
+            model.n_estimators = n_trees * (i + 1) // fits
+            model.fit(X[rows], y[rows])
+        return model
+
+    if name == "xgb":
+        import glob
+        import xgboost as xgb
+
+        class Blocks(xgb.DataIter):
+            def __init__(self):
+                self.start = 0
+                super().__init__(cache_prefix=os.path.join(out, "xgb-cache"))
+
+            def next(self, input_data):
+                if self.start >= n:
+                    return 0
+                stop = self.start + block_rows
+                input_data(data=np.asarray(X[self.start:stop]), label=np.asarray(y[self.start:stop]))
+                self.start = stop
+                return 1
+
+            def reset(self):
+                self.start = 0
+
+        positives = sum(int(y[i:i + block_rows].sum()) for i in range(0, n, block_rows))
+        booster_params = {k: v for k, v in params.items() if k not in ("n_estimators", "random_state")}
+        booster_params.update({"objective": "binary:logistic", "seed": params.get("random_state", 0),
+                               "nthread": n_jobs, "scale_pos_weight": (n - positives) / max(positives, 1)})
+        booster = xgb.train(booster_params, xgb.DMatrix(Blocks()), num_boost_round=params["n_estimators"])
+        # Saved and reloaded as an XGBClassifier: the server calls predict_proba and classes_
+        booster_path = os.path.join(out, "booster.json")
+        booster.save_model(booster_path)
+        model = xgb.XGBClassifier()
+        model.load_model(booster_path)
+        for path in glob.glob(os.path.join(out, "xgb-cache*")) + [booster_path]:
+            os.remove(path)
+        return model
+
+    raise ValueError(f"'{name}' has no out-of-core fit; --stream supports {STREAM_CANDIDATES}")
+
+def rates(tp, fp, fn):
+    """recall, precision and f1 from confusion counts (0 where undefined, like sklearn's zero_division)."""
+    return {"recall": tp / (tp + fn) if tp + fn else 0.0,
+            "precision": tp / (tp + fp) if tp + fp else 0.0,
+            "f1": 2 * tp / (2 * tp + fp + fn) if tp else 0.0}
+
+def validation_metrics(model, X_val, y_val, block_rows=None):
+    """Validation recall/precision/f1, predicted block_rows rows at a time."""
+    block_rows = block_rows or max(len(y_val), 1)
+    tp = fp = fn = 0
+    for start in range(0, len(y_val), block_rows):
+        pred = model.predict(np.asarray(X_val[start:start + block_rows])) == 1
+        truth = np.asarray(y_val[start:start + block_rows]) == 1
+        tp += int(np.sum(pred & truth))
+        fp += int(np.sum(pred & ~truth))
+        fn += int(np.sum(~pred & truth))
+    return rates(tp, fp, fn)
+
+def train_candidate(name, params, n_jobs, balanced, preprocessed, block_rows, out):
+    """
+    Worker process: fits one candidate from the cached matrices. With
+    block_rows (--stream) it fits out of core on the unbalanced training split.
+    """
+    start = time.perf_counter()
+    if block_rows:
+        X, y = load_arrays(preprocessed, "X_train", "y_train")
+        model = fit_out_of_core(name, params, n_jobs, X, y, block_rows, out)
+    else:
+        X, y = load_arrays(balanced, "X", "y")
+        model = build_model(name, params, n_jobs).fit(np.asarray(X), np.asarray(y))
+    X_val, y_val = load_arrays(preprocessed, "X_val", "y_val")
+    metrics = validation_metrics(model, X_val, y_val, block_rows)
+    metrics["fit_seconds"] = round(time.perf_counter() - start, 2)
+    joblib.dump(model, os.path.join(out, "model.pkl"))
+    write_json(out, "metrics.json", metrics)
+    return out
+
+def tune(balanced, preprocessed, base, n_trials, n_jobs, out):
+    """Optuna search over the forest's main parameters, maximizing validation F1."""
+    import optuna
+    from optuna.samplers import TPESampler
+
+    X, y = (np.asarray(a) for a in load_arrays(balanced, "X", "y"))
+    X_val, y_val = (np.asarray(a) for a in load_arrays(preprocessed, "X_val", "y_val"))
+
+    def objective(trial):
+        params = dict(base)
+        params.update({
+            "n_estimators": trial.suggest_int("n_estimators", 50, 300, step=25),
+            "max_depth": trial.suggest_int("max_depth", 8, 32),
+            "min_samples_split": trial.suggest_int("min_samples_split", 2, 10),
+            "min_samples_leaf": trial.suggest_int("min_samples_leaf", 1, 5),
+        })
+        model = build_model("rf", params, n_jobs=1).fit(X, y)
+        return validation_metrics(model, X_val, y_val)["f1"]
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.create_study(direction="maximize", sampler=TPESampler(seed=base.get("random_state", 42)))
+    study.optimize(objective, n_trials=n_trials, n_jobs=n_jobs)
+    write_json(out, "best.json", {"params": study.best_params, "f1": study.best_value, "trials": n_trials})
+
+THRESHOLDS = np.arange(0.1, 0.9, 0.05)
+
+def pick_threshold(model, X_val, y_val, rules, block_rows=None):
+    """The notebook's "REALISTIC Threshold Optimization": best recall within the precision rules."""
+    block_rows = block_rows or max(len(y_val), 1)
+    tp, fp, fn = (np.zeros(len(THRESHOLDS), dtype=np.int64) for _ in range(3))
+    for start in range(0, len(y_val), block_rows):
+        proba = model.predict_proba(np.asarray(X_val[start:start + block_rows]))[:, 1]
+        pred = proba[:, None] >= THRESHOLDS[None, :]
+        truth = (np.asarray(y_val[start:start + block_rows]) == 1)[:, None]
+        tp += np.sum(pred & truth, axis=0)
+        fp += np.sum(pred & ~truth, axis=0)
+        fn += np.sum(~pred & truth, axis=0)
+
+    table = pd.DataFrame([
+        {"threshold": float(t), **rates(int(a), int(b), int(c)), "tp": int(a), "fp": int(b), "fn": int(c)}
+        for t, a, b, c in zip(THRESHOLDS, tp, fp, fn)
+    ])
+    valid = table[(table.precision >= rules["min_precision"]) & (table.recall <= rules["max_recall"])
+                  & (table.threshold >= rules["low"]) & (table.threshold <= rules["high"])]
+    best = valid.loc[valid.recall.idxmax()] if len(valid) else table.loc[table.f1.idxmax()]
+    return float(round(best.threshold, 2)), best.to_dict()
+
+def export(model_path, preprocessed, config, results, out_dir, block_rows=None):
+    from forest import export_forest
+
+    model = joblib.load(model_path)
+    X_val, y_val = load_arrays(preprocessed, "X_val", "y_val")
+    threshold, at_threshold = pick_threshold(model, X_val, y_val, config["threshold"], block_rows)
+
+    os.makedirs(out_dir, exist_ok=True)
+    shutil.copyfile(model_path, os.path.join(out_dir, "best_intrusion_model.pkl"))
+    shutil.copyfile(os.path.join(preprocessed, "preprocessing.json"), os.path.join(out_dir, "preprocessing.json"))
+    write_json(out_dir, "threshold_config.json", {"optimal_threshold": threshold})
+    write_json(out_dir, "model_metadata.json", {
+        "model_type": type(model).__name__,
+        "training_date": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "optimal_threshold": threshold,
+        "performance": at_threshold,
+        "candidates": results,
+        "config": config,
+    })
+    if hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        export_forest(model, os.path.join(out_dir, "forest"))
+    return threshold
+
+def latency(model, X, batch, rows=4096):
+    """predict_proba µs per row, `batch` rows per call (the server's batch size)."""
+    X = X[:rows]
+    start = time.perf_counter()
+    for i in range(0, len(X), batch):
+        model.predict_proba(X[i:i + batch])
+    return round((time.perf_counter() - start) / max(len(X), 1) * 1e6, 2)
+
+def pick_band(score, teacher, max_disagreement):
+    """
+    (low, high) for the fast tier: rows scoring below low are called benign,
+    rows at or above high intrusions, each side disagreeing with the teacher
+    on at most max_disagreement of its rows. low is as high and high as low
+    as that allows; high is None when no cut qualifies.
+    """
+    order = np.argsort(score, kind="stable")
+    ordered, positives = score[order], np.concatenate([[0], np.cumsum(teacher[order])])
+    cuts = np.unique(score)
+    below = np.searchsorted(ordered, cuts, side="left")  # rows with score < cut
+    above = len(score) - below
+
+    benign_ok = (below == 0) | (positives[below] <= max_disagreement * below)
+    low = float(cuts[np.flatnonzero(benign_ok)[-1]]) if benign_ok.any() else 0.0
+    negatives_above = above - (positives[-1] - positives[below])
+    intrusion_ok = (above > 0) & (negatives_above <= max_disagreement * above) & (cuts >= low)
+    high = float(cuts[np.flatnonzero(intrusion_ok)[0]]) if intrusion_ok.any() else None
+    return low, high
+
+def distill(model_path, preprocessed, threshold, params, out):
+    """
+    The cascade's fast tier. Shallow trees of each depth in params["depths"]
+    learn the deployed model's verdicts (proba >= threshold) on the training
+    split. Each gets a band from pick_band on the validation split and is
+    timed against the full model as the server runs it (a FlatForest). The
+    depth with the lowest expected cost, fast + escalation rate x full, is
+    exported; cascade.json keeps the whole table.
+    """
+    from sklearn.tree import DecisionTreeClassifier
+    from forest import FlatForest, export_forest
+
+    teacher = joblib.load(model_path)
+    served = FlatForest.from_model(teacher) if hasattr(teacher, "estimators_") else teacher
+    rng = np.random.default_rng(params["seed"])
+
+    def sample(name):
+        X, y = load_arrays(preprocessed, f"X_{name}", f"y_{name}")
+        rows = np.sort(rng.choice(len(y), size=min(params["max_rows"], len(y)), replace=False))
+        return np.asarray(X[rows], dtype=np.float32), np.asarray(y[rows])
+
+    X_train, _ = sample("train")
+    X_val, y_val = sample("val")
+    taught = (served.predict_proba(X_train)[:, 1] >= threshold).astype(np.int8)
+    teacher_val = (served.predict_proba(X_val)[:, 1] >= threshold).astype(np.int8)
+    full_us = latency(served, X_val, params["latency_batch"])
+
+    tradeoff, best = [], None
+    for depth in params["depths"]:
+        tree = DecisionTreeClassifier(max_depth=depth, min_samples_leaf=params["min_samples_leaf"],
+                                      random_state=params["seed"]).fit(X_train, taught)
+        fast = FlatForest.from_model(tree)
+        score = fast.predict_proba(X_val)[:, list(fast.classes_).index(1)]
+        low, high = pick_band(score, teacher_val, params["max_disagreement"])
+        fast_intrusion = score >= high if high is not None else np.zeros(len(score), dtype=bool)
+        escalated = ~((score < low) | fast_intrusion)
+        verdict = np.where(escalated, teacher_val == 1, fast_intrusion)
+        truth = y_val == 1
+        fast_us = latency(fast, X_val, params["latency_batch"])
+        row = {
+            "max_depth": depth, "nodes": int(tree.tree_.node_count), "low": low, "high": high,
+            "escalation_rate": round(float(escalated.mean()), 4),
+            "agreement": round(float(np.mean(verdict == (teacher_val == 1))), 4),
+            **{k: round(v, 4) for k, v in rates(int(np.sum(verdict & truth)), int(np.sum(verdict & ~truth)),
+                                                int(np.sum(~verdict & truth))).items()},
+            "fast_us_per_row": fast_us,
+            "cascade_us_per_row": round(fast_us + float(escalated.mean()) * full_us, 2),
+        }
+        tradeoff.append(row)
+        if best is None or row["cascade_us_per_row"] < best[1]["cascade_us_per_row"]:
+            best = (tree, row)
+
+    tree, row = best
+    export_forest(tree, out)
+    write_json(out, "cascade.json", {
+        **row, "full_us_per_row": full_us, "threshold": threshold,
+        "max_disagreement": params["max_disagreement"], "tradeoff": tradeoff,
+    })
+
+# ---------------------------------------------------------
+# DRIVER
+# ---------------------------------------------------------
+
+def apply_overrides(config, assignments):
+    """--set stage.param=value, value parsed as JSON when it can be."""
+    for assignment in assignments:
+        name, _, raw = assignment.partition("=")
+        stage, _, param = name.partition(".")
+        if stage not in config or not param:
+            raise SystemExit(f"--set {assignment}: expected <stage>.<param>=<value>, stage one of {list(config)}")
+        try:
+            config[stage][param] = json.loads(raw)
+        except ValueError:
+            config[stage][param] = raw
+    return config
+
+def run(args):
+    config = copy.deepcopy(DEFAULTS)
+    if args.config:
+        with open(args.config, "r") as f:
+            for stage, params in json.load(f).items():
+                config.setdefault(stage, {}).update(params)
+    apply_overrides(config, args.set)
+    cache = Cache(args.cache)
+    cores = args.jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    block_rows = args.chunk_rows if args.stream else 0
+
+    data_key = file_digest(args.data)
+    if args.stream:
+        # The per-chunk split draw depends on the chunk size, so it is part of the key
+        pre_key = stage_key("preprocess", data_key, config["split"], "stream", block_rows)
+        build = lambda out: preprocess_stream(args.data, config["split"], block_rows, out)
+    else:
+        pre_key = stage_key("preprocess", data_key, config["split"])
+        build = lambda out: preprocess(args.data, config["split"], args.chunk_rows, out)
+    preprocessed = cache.get("preprocess", pre_key) or cache.put("preprocess", pre_key, build)
+
+    if args.stream:
+        # SMOTE needs the whole training split in memory: out-of-core fits weight classes instead
+        smote_key, balanced = stage_key("model", pre_key, "out-of-core", block_rows), None
+    else:
+        smote_key = stage_key("smote", pre_key, config["smote"])
+        balanced = cache.get("smote", smote_key) or cache.put(
+            "smote", smote_key, lambda out: smote(preprocessed, config["smote"], out))
+
+    candidates = [c for c in args.candidates if c in CANDIDATES]
+    if args.deploy not in candidates:
+        candidates.append(args.deploy)
+    per_job = max(1, cores // len(candidates))
+    paths, pending = {}, {}
+
+    with ProcessPoolExecutor(max_workers=min(cores, len(candidates) + 1)) as pool:
+        def submit(stage, key, fn, *fn_args):
+            tmp = cache.scratch(stage, key)
+            pending[stage] = (pool.submit(fn, *fn_args, tmp), key, tmp)
+
+        def submit_candidate(name):
+            key = stage_key("model", smote_key, name, config[name])
+            paths[name] = cache.get(name, key)
+            if paths[name] is None:
+                submit(name, key, train_candidate, name, config[name], per_job, balanced, preprocessed,
+                       block_rows)
+
+        tuning = None
+        if args.tune and "rf" in candidates:
+            tune_key = stage_key("tune", smote_key, config["rf"], args.tune)
+            tuned = cache.get("tune", tune_key)
+            if tuned is None:
+                # Runs beside the other candidates; rf is submitted once it is done
+                submit("tune", tune_key, tune, balanced, preprocessed, config["rf"], args.tune,
+                       args.tune_jobs or per_job)
+                tuning = pending.pop("tune")
+            else:
+                config["rf"].update(read_json(tuned, "best.json")["params"])
+
+        for name in candidates:
+            if name != "rf" or tuning is None:
+                submit_candidate(name)
+
+        if tuning is not None:
+            future, key, tmp = tuning
+            future.result()
+            best = read_json(cache.publish("tune", key, tmp), "best.json")
+            config["rf"].update(best["params"])
+            print(f"🔧 Tuned forest: {best}")
+            submit_candidate("rf")
+
+        for name, (future, key, tmp) in pending.items():
+            future.result()
+            paths[name] = cache.publish(name, key, tmp)
+
+    results = {name: read_json(paths[name], "metrics.json") for name in candidates}
+    threshold = export(os.path.join(paths[args.deploy], "model.pkl"), preprocessed, config, results, args.out,
+                       block_rows)
+
+    cascade = None
+    if not args.no_cascade:
+        distill_key = stage_key("distill", os.path.basename(paths[args.deploy]), threshold, config["distill"])
+        distilled = cache.get("distill", distill_key) or cache.put(
+            "distill", distill_key,
+            lambda out: distill(os.path.join(paths[args.deploy], "model.pkl"), preprocessed, threshold,
+                                config["distill"], out))
+        fast_dir = os.path.join(args.out, "fast")
+        shutil.rmtree(fast_dir, ignore_errors=True)
+        shutil.copytree(distilled, fast_dir)
+        cascade = read_json(distilled, "cascade.json")
+
+    print("📊 Validation metrics:")
+    for name, metrics in results.items():
+        print(f"   {name:<4} recall {metrics['recall']:.4f}  precision {metrics['precision']:.4f}  "
+              f"f1 {metrics['f1']:.4f}  ({metrics['fit_seconds']}s)")
+    if cascade is not None:
+        print("⚡ Fast tier (validation):")
+        for row in cascade["tradeoff"]:
+            chosen = " <- deployed" if row["max_depth"] == cascade["max_depth"] else ""
+            print(f"   depth {row['max_depth']:<2} band {row['low']:.3f}..{row['high'] if row['high'] is not None else '-'}  "
+                  f"escalated {row['escalation_rate']:.1%}  agreement {row['agreement']:.4f}  "
+                  f"recall {row['recall']:.4f}  {row['cascade_us_per_row']} µs/row "
+                  f"(full {cascade['full_us_per_row']}){chosen}")
+    print(f"✅ Deployed {args.deploy} to {args.out} with threshold {threshold:.2f} "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(f"   cached: {cache.hits or '-'}  rebuilt: {cache.misses or '-'}")
+
+def main():
+    parser = argparse.ArgumentParser(prog="rayguard train", description="Train and export the intrusion model.")
+    parser.add_argument("--data", default="nsl_kdd_dataset.csv", help="NSL-KDD style CSV with a label column")
+    parser.add_argument("--chunk-rows", type=int, default=0,
+                        help="read the CSV in chunks of this many rows (default: all at once)")
+    parser.add_argument("--out", default="models", help="directory for the deployable artifacts")
+    parser.add_argument("--cache", default=".train-cache", help="stage cache directory")
+    parser.add_argument("--config", help="JSON file of {stage: {param: value}} overrides")
+    parser.add_argument("--set", action="append", default=[], metavar="STAGE.PARAM=VALUE")
+    parser.add_argument("--candidates", nargs="+", default=list(CANDIDATES), choices=CANDIDATES)
+    parser.add_argument("--deploy", default="rf", choices=CANDIDATES, help="candidate exported for the server")
+    parser.add_argument("--tune", type=int, default=0, metavar="TRIALS", help="Optuna trials for the forest (0: off)")
+    parser.add_argument("--tune-jobs", type=int, default=0, help="concurrent Optuna trials (default: cores / candidates)")
+    parser.add_argument("--jobs", type=int, default=0, help="cores to use (default: all)")
+    parser.add_argument("--no-cascade", action="store_true", help="don't distill the server's fast tier")
+    parser.add_argument("--stream", action="store_true",
+                        help="out-of-core: bounded memory for CSVs larger than RAM (rf and xgb only)")
+    args = parser.parse_args()
+
+    if args.stream:
+        args.chunk_rows = args.chunk_rows or 100000
+        if args.tune:
+            parser.error("--tune needs the training split in memory; it can't be combined with --stream")
+        if args.deploy not in STREAM_CANDIDATES:
+            parser.error(f"--stream can deploy one of {STREAM_CANDIDATES}")
+        args.candidates = [c for c in args.candidates if c in STREAM_CANDIDATES]
+    run(args)
+
+if __name__ == "__main__":
+    main()
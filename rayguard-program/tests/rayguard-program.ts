@@ -1,6 +1,7 @@
 import * as anchor from "@coral-xyz/anchor";
 import { Program } from "@coral-xyz/anchor";
 import { RayguardProgram } from "../target/types/rayguard_program";
+import { expect } from "chai";
 
 describe("rayguard-program", () => {
   // Configure the client to use the local cluster.
@@ -14,3 +15,61 @@ describe("rayguard-program", () => {
     console.log("Your transaction signature", tx);
   });
 });
+
+describe("batched add_log", () => {
+  const provider = anchor.AnchorProvider.env();
+  anchor.setProvider(provider);
+
+  const program = anchor.workspace.rayguardProgram as Program<RayguardProgram>;
+
+  const logPda = (ledger: anchor.web3.PublicKey, index: number) =>
+    anchor.web3.PublicKey.findProgramAddressSync(
+      [
+        Buffer.from("log"),
+        ledger.toBuffer(),
+        new anchor.BN(index).toArrayLike(Buffer, "le", 8),
+      ],
+      program.programId,
+    )[0];
+
+  it("chains several add_log instructions sent in one transaction", async () => {
+    const seed = Math.floor(Math.random() * 65535) + 1;
+    const [ledger] = anchor.web3.PublicKey.findProgramAddressSync(
+      [Buffer.from("state"), new anchor.BN(seed).toArrayLike(Buffer, "le", 2)],
+      program.programId,
+    );
+    await program.methods.createLedger(seed).rpc();
+
+    const entries = ["10.0.0.1", "10.0.0.2", "10.0.0.3"].map((ipAddress) => ({
+      ipAddress,
+      threatType: "DOS",
+      actionTaken: "Blocked/Alerted",
+    }));
+
+    const ixs = await Promise.all(
+      entries.map((entry, i) =>
+        program.methods
+          .addLog(entry)
+          .accountsPartial({
+            ledger,
+            log: logPda(ledger, i),
+            authority: provider.wallet.publicKey,
+          })
+          .instruction(),
+      ),
+    );
+    await provider.sendAndConfirm(new anchor.web3.Transaction().add(...ixs));
+
+    const ledgerAccount = await program.account.ledger.fetch(ledger);
+    expect(ledgerAccount.count.toNumber()).to.equal(entries.length);
+
+    let previous = Buffer.alloc(32);
+    for (let i = 0; i < entries.length; i++) {
+      const log = await program.account.log.fetch(logPda(ledger, i));
+      expect(log.ipAddress).to.equal(entries[i].ipAddress);
+      expect(Buffer.from(log.previousHash).equals(previous)).to.be.true;
+      previous = Buffer.from(log.currentHash);
+    }
+    expect(Buffer.from(ledgerAccount.lastHash).equals(previous)).to.be.true;
+  });
+});
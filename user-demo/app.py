@@ -6,6 +6,8 @@ import random
 import time
 import io
 
+from utils.http_client import HttpClient
+
 # ==========================================
 # 0. DATA LOADING & UTILS
 # ==========================================
@@ -43,6 +45,12 @@ def load_nsl_data():
         
     return df
 
+@st.cache_resource
+def get_http_client():
+    # One keep-alive pool per Streamlit process, so repeated "Book Now" clicks
+    # reuse the TLS connection to the predict endpoint instead of reconnecting
+    return HttpClient(timeouts={"predict": 5})
+
 def get_random_ip_from_pool():
     # Returns a random IP from the pool (excluding the first one reserved for demo if needed, 
     # but for simplicity we pick from the last 4)
@@ -382,6 +390,8 @@ class ModernTicketApp:
             with st.expander("ℹ️ Debug: Payload & Network Settings", expanded=True):
                 st.write(f"**Target URL:** `{url}`")
                 st.write(f"**Headers:** `{headers}`") 
+                http_stats = get_http_client().stats()
+                st.write(f"**Connections:** {http_stats['handshakes']} opened, {http_stats['pool_hits']} reused")
                 st.json(payload)
                 
                 use_mock = st.checkbox("🛠️ Enable Mock Mode (Simulate Success)", value=False)
@@ -393,7 +403,7 @@ class ModernTicketApp:
                 return
 
             with st.spinner("Sending data to server..."):
-                response = requests.post(url, json=payload, headers=headers, timeout=5)
+                response = get_http_client().post(url, endpoint="predict", json=payload, headers=headers)
             
             if response.status_code == 200:
                 print(response.json()) 
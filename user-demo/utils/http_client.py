@@ -0,0 +1,92 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ---------------------------------------------------------
+# POOLED HTTP CLIENT
+# ---------------------------------------------------------
+# The demo's own copy of Frontend/http_client.py (it deploys alone): one
+# keep-alive Session with retries and per-endpoint timeouts.
+
+DEFAULT_TIMEOUT = 5
+
+class HttpClient:
+    def __init__(self, timeouts=None, default_timeout=DEFAULT_TIMEOUT, retries=3,
+                 backoff_factor=0.3, pool_connections=10, pool_maxsize=20):
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+
+        # Only retry when the request surely did not reach the backend (connect
+        # errors), or the backend asked us to (429/503) on a GET. /predict
+        # answers 503 on purpose for DOS and banned sources, so a POST that got
+        # one is never replayed; neither is a read timeout.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=(429, 503),
+            allowed_methods=("GET",),
+            backoff_factor=backoff_factor,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._lock = threading.Lock()
+        self._errors = 0
+
+    def request(self, method, url, endpoint=None, **kwargs):
+        """
+        Sends a request through the shared pool.
+        `endpoint` names an entry in `timeouts` (e.g. "addLog") to pick its timeout.
+        """
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, self.default_timeout))
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def get(self, url, endpoint=None, **kwargs):
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def post(self, url, endpoint=None, **kwargs):
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
+
+    def stats(self):
+        """
+        Per-host connection counters from urllib3's pools.
+        `handshakes` counts new TCP(+TLS) connections, `pool_hits` counts requests
+        served on an already open keep-alive connection.
+        """
+        hosts = {}
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "requests": pool.num_requests,
+                "handshakes": pool.num_connections,
+                "pool_hits": max(0, pool.num_requests - pool.num_connections),
+            }
+        return {
+            "requests": sum(h["requests"] for h in hosts.values()),
+            "handshakes": sum(h["handshakes"] for h in hosts.values()),
+            "pool_hits": sum(h["pool_hits"] for h in hosts.values()),
+            "errors": self._errors,
+            "hosts": hosts,
+        }
+
+    def close(self):
+        self.session.close()